@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from job_leases import acquire_lease, lease_holder_id
+
+logger = logging.getLogger(__name__)
+
+# Counter writes are spread over several documents to avoid a single hot document
+COUNTER_SHARDS = int(os.environ.get('ANALYTICS_COUNTER_SHARDS', '8'))
+COUNTER_PREFIX = "dashboard:"
+# app_settings document recording that existing data was folded into the counters
+SEED_MARKER_ID = "analytics_counters_seeded"
+
+def _flatten(doc: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in doc.items():
+        if key == "_id":
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+async def increment(db, inc: Dict[str, float]) -> None:
+    """Atomically apply $inc deltas to a random counter shard"""
+    inc = {key: value for key, value in inc.items() if value}
+    if not inc:
+        return
+    shard = random.randrange(COUNTER_SHARDS)
+    await db.analytics_counters.update_one(
+        {"_id": f"{COUNTER_PREFIX}{shard}"},
+        {"$inc": inc},
+        upsert=True
+    )
+
+
+async def record_request_created(db) -> None:
+    await increment(db, {"requests_total": 1, "status.pending": 1})
+
+
+async def record_status_transition(db, from_status: Optional[str], to_status: str,
+                                   people_count: int = 0) -> None:
+    """Move one request between status buckets; completions also add people fed"""
+    if from_status == to_status:
+        return
+    inc = {f"status.{to_status}": 1}
+    if from_status:
+        inc[f"status.{from_status}"] = -1
+    if to_status == "completed":
+        inc["people_fed"] = people_count or 0
+    await increment(db, inc)
+
+
+async def record_user_registered(db, role: str) -> None:
+    await increment(db, {f"users.{role}": 1})
+
+
+async def read_counters(db) -> Optional[Dict[str, float]]:
+    """Sum every shard into flat counters, or None if none exist yet"""
+    shards = await db.analytics_counters.find(
+        {"_id": {"$regex": f"^{COUNTER_PREFIX}"}}
+    ).to_list(None)
+    if not shards:
+        return None
+
+    totals: Dict[str, float] = {}
+    for shard in shards:
+        for key, value in _flatten(shard).items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+async def aggregate_source_counters(db) -> Dict[str, float]:
+    """Recompute the counters from food_requests and users"""
+    request_pipeline = [
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "people_fed": [
+                {"$match": {"status": "completed"}},
+                {"$group": {"_id": None, "total": {"$sum": {"$ifNull": ["$people_count", 0]}}}}
+            ]
+        }}
+    ]
+    user_pipeline = [{"$group": {"_id": "$role", "count": {"$sum": 1}}}]
+
+    request_facets, user_groups = await asyncio.gather(
+        db.food_requests.aggregate(request_pipeline).to_list(1),
+        db.users.aggregate(user_pipeline).to_list(None)
+    )
+
+    facets = request_facets[0] if request_facets else {"by_status": [], "people_fed": []}
+    counters: Dict[str, float] = {}
+    for row in facets["by_status"]:
+        if row["_id"]:
+            counters[f"status.{row['_id']}"] = row["count"]
+    counters["requests_total"] = sum(row["count"] for row in facets["by_status"])
+    counters["people_fed"] = facets["people_fed"][0]["total"] if facets["people_fed"] else 0
+    for row in user_groups:
+        if row["_id"]:
+            counters[f"users.{row['_id']}"] = row["count"]
+    return counters
+
+
+def counters_to_dashboard(counters: Dict[str, float], statuses: list) -> dict:
+    """Shape flat counters like the /analytics/dashboard response"""
+    total_requests = counters.get("requests_total", 0)
+    completed_requests = counters.get("status.completed", 0)
+    success_rate = (completed_requests / total_requests * 100) if total_requests > 0 else 0
+
+    return {
+        "total_requests": total_requests,
+        "completed_requests": completed_requests,
+        "total_people_fed": counters.get("people_fed", 0),
+        "ngo_count": counters.get("users.ngo", 0),
+        "donor_count": counters.get("users.donor", 0),
+        "volunteer_count": counters.get("users.volunteer", 0),
+        "success_rate": round(success_rate, 2),
+        "status_distribution": {status: counters.get(f"status.{status}", 0) for status in statuses}
+    }
+
+
+async def reconcile_counters(db, apply: bool = True, settle_seconds: float = 2.0,
+                             attempts: int = 3) -> dict:
+    """
+    Compare the counters with the source collections and report any drift.
+
+    The source aggregation is bracketed by two reads of the counters, the
+    second settle_seconds after it finishes. Every counter increment follows
+    its source write within a request, so if the two reads agree, the
+    aggregation and the counters describe the same moment. Otherwise an
+    increment was in flight; it would have been counted as drift and then
+    applied twice, so the comparison is retried up to attempts times and
+    nothing is applied unless a stable snapshot was found.
+
+    With apply=True a stable drift is folded back in as an $inc on shard 0.
+
+    Returns:
+        {"drift": {counter: source - counted}, "applied": bool, "stable": bool}
+    """
+    stable = False
+    for _ in range(attempts):
+        before = await read_counters(db)
+        source = await aggregate_source_counters(db)
+        await asyncio.sleep(settle_seconds)
+        current = await read_counters(db)
+        if current == before:
+            stable = True
+            break
+    current = current or {}
+
+    drift = {}
+    for key in set(source) | set(current):
+        delta = source.get(key, 0) - current.get(key, 0)
+        if delta:
+            drift[key] = delta
+
+    if drift:
+        logger.warning(f"Analytics counter drift detected: {drift}")
+    if not stable:
+        logger.warning("Analytics counters kept changing during reconciliation; nothing applied")
+        return {"drift": drift, "applied": False, "stable": False}
+    if apply:
+        # Always upsert shard 0 so an empty deployment still counts as seeded
+        await db.analytics_counters.update_one(
+            {"_id": f"{COUNTER_PREFIX}0"},
+            {"$inc": drift} if drift else {"$setOnInsert": {"requests_total": 0}},
+            upsert=True
+        )
+    return {"drift": drift, "applied": bool(drift) and apply, "stable": True}
+
+
+async def seed_counters(db, holder: str, lease_seconds: float = 300) -> bool:
+    """
+    Fold the data that predates the counters into them, once per deployment.
+
+    Counters only track changes, and the first increment after a deploy
+    creates a shard, so "no shards yet" cannot tell whether existing data
+    was counted. A marker in app_settings records that instead. One worker
+    at a time runs the seeding reconcile under a lease; it is safe to repeat
+    if a worker dies before writing the marker, as a second reconcile just
+    finds no drift.
+
+    Returns:
+        True once the counters are seeded, by this worker or another
+    """
+    if await db.app_settings.find_one({"_id": SEED_MARKER_ID}, {"_id": 1}):
+        return True
+    if not await acquire_lease(db, "analytics_seed", holder, lease_seconds):
+        return False
+    report = await reconcile_counters(db, apply=True)
+    if not report["stable"]:
+        return False
+    await db.app_settings.update_one(
+        {"_id": SEED_MARKER_ID},
+        {"$setOnInsert": {"seeded_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    logger.info("Analytics counters seeded from the source collections")
+    return True
+
+
+async def run_seed_job(db, retry_seconds: float = 30) -> None:
+    """Keep trying seed_counters until the counters are seeded; started at startup"""
+    holder = lease_holder_id()
+    while True:
+        try:
+            if await seed_counters(db, holder):
+                return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analytics counter seeding failed: {str(e)}")
+        await asyncio.sleep(retry_seconds)
+
+
+async def run_reconciliation_job(db, interval_seconds: float, apply: bool = False) -> None:
+    """
+    Periodically check the counters for drift; runs until cancelled. By
+    default drift is only logged and repaired by an explicit run (the admin
+    endpoint or this module's CLI). Only the worker holding the job lease
+    reconciles.
+    """
+    holder = lease_holder_id()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            if not await acquire_lease(db, "analytics_reconciliation", holder, interval_seconds * 3):
+                continue
+            await reconcile_counters(db, apply=apply)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analytics counter reconciliation failed: {str(e)}")
+
+
+if __name__ == "__main__":
+    # python analytics_counters.py [--dry-run]
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tls=True, tlsAllowInvalidCertificates=True)
+        try:
+            report = await reconcile_counters(client[os.environ['DB_NAME']], apply="--dry-run" not in sys.argv)
+            print(report)
+        finally:
+            client.close()
+
+    asyncio.run(main())
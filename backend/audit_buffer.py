@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class AuditBuffer:
+    """
+    Write-behind buffer for audit log events.
+
+    Events are queued in memory and written with unordered insert_many once
+    batch_size events are waiting or flush_interval seconds have passed since
+    the first one arrived. The queue is bounded: when it is full, log()
+    waits for room, which pushes back on the endpoints producing events
+    instead of growing memory without limit.
+
+    Every event gets its _id when it is logged, so a retried batch can never
+    store an event twice: whatever already landed fails with a duplicate key
+    and is counted as written.
+    """
+
+    def __init__(self, collection, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_retries: int = 3):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._interrupted: List[dict] = []
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background flusher and write out everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def log(self, event: dict) -> None:
+        event.setdefault("_id", ObjectId())
+        if self._task is None:
+            # Buffer not running (e.g. scripts or tests): write straight through
+            await self.collection.insert_one(event)
+            return
+        await self._queue.put(event)
+
+    async def flush(self) -> None:
+        """Write every queued event now"""
+        if self._interrupted:
+            batch, self._interrupted = self._interrupted, []
+            await self._write(batch)
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            try:
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Keep what was already dequeued so stop() can still flush it
+                self._interrupted.extend(batch)
+                raise
+            await self._write(batch)
+
+    async def _write(self, batch: List[dict]) -> None:
+        start = time.perf_counter()
+        written = len(batch)
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                break
+            except asyncio.CancelledError:
+                # Keep the batch so stop() can still flush it
+                self._interrupted.extend(batch)
+                raise
+            except Exception as e:
+                if isinstance(e, BulkWriteError):
+                    # Unordered: everything without a write error landed, and a
+                    # duplicate key means an earlier attempt already wrote it
+                    batch = [batch[error["index"]] for error in e.details.get("writeErrors", ())
+                             if error.get("code") != DUPLICATE_KEY_ERROR]
+                    if not batch:
+                        break
+                if attempt == self.max_retries:
+                    self.dropped += len(batch)
+                    self.flushed += written - len(batch)
+                    logger.error(f"Dropped {len(batch)} audit events after {attempt} attempts: {str(e)}")
+                    return
+                logger.warning(f"Audit flush attempt {attempt} failed: {str(e)}")
+                try:
+                    await asyncio.sleep(0.1 * (2 ** attempt))
+                except asyncio.CancelledError:
+                    self._interrupted.extend(batch)
+                    raise
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushed += written
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
@@ -0,0 +1,399 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from analytics_counters import increment
+from geo_utlis import haversine_matrix, haversine_pairs
+from job_leases import acquire_lease, lease_holder_id
+from request_transitions import TransitionError, transition_request
+
+try:
+    from scipy.sparse import coo_matrix, csr_matrix
+    from scipy.sparse.csgraph import connected_components, min_weight_full_bipartite_matching
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Load a volunteer can carry, by transport mode
+TRANSPORT_CAPACITY = {"van": 10, "car": 7, "two_wheeler": 5, "bicycle": 3, "on_foot": 2}
+DEFAULT_CAPACITY = 5
+
+KM_PER_DEG_LAT = 111.0
+
+ACTIVE_TASK_STATUSES = ["assigned_to_volunteer", "picked_up", "in_transit"]
+
+# Scores are turned into strictly positive costs (sparse solvers drop zeros).
+# A pairing is only worth making if it beats MIN_SCORE, the same bar the
+# greedy assignment in accept_donation uses.
+SCORE_CEILING = 16.0
+MIN_SCORE = -1.0
+UNASSIGNED_COST = SCORE_CEILING - MIN_SCORE
+
+
+def capacity_score(capacity, distance, quantity):
+    """Capacity left after distance and load penalties; scalars or arrays"""
+    distance_penalty = np.minimum(distance / 10, 3)
+    quantity_penalty = np.maximum(0, (quantity - 50) / 20)
+    return capacity - distance_penalty - quantity_penalty
+
+
+def extra_volunteer_reason(quantity: float, distance: float) -> str:
+    if quantity > 100:
+        return "heavy_load"
+    if distance > 30:
+        return "long_distance"
+    return "capacity_constraint"
+
+
+def candidate_edges(req_coords: np.ndarray, vol_coords: np.ndarray, k: int,
+                    radius_km: float, chunk_rows: int = 512):
+    """
+    The k nearest volunteers within radius_km of each request.
+
+    Requests are handled in latitude order, chunk_rows at a time, and each
+    chunk is only compared with volunteers in its latitude band widened by
+    radius_km, so memory stays at O(chunk_rows * volunteers) and most
+    far-away pairs are never computed.
+
+    Returns:
+        (rows, cols, distances) arrays describing the candidate edges
+    """
+    rows, cols, dists = [], [], []
+    if not len(req_coords) or not len(vol_coords) or k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+
+    req_order = np.argsort(req_coords[:, 0], kind="stable")
+    vol_order = np.argsort(vol_coords[:, 0], kind="stable")
+    vol_lats = vol_coords[vol_order, 0]
+    band_deg = radius_km / KM_PER_DEG_LAT
+
+    for start in range(0, len(req_order), chunk_rows):
+        chunk = req_order[start:start + chunk_rows]
+        lats = req_coords[chunk, 0]
+        lo = np.searchsorted(vol_lats, lats.min() - band_deg, side="left")
+        hi = np.searchsorted(vol_lats, lats.max() + band_deg, side="right")
+        band = vol_order[lo:hi]
+        if not len(band):
+            continue
+
+        distances = haversine_matrix(req_coords[chunk], vol_coords[band])
+        distances[~(distances <= radius_km)] = np.inf
+        chunk_k = min(k, len(band))
+        nearest = np.argpartition(distances, chunk_k - 1, axis=1)[:, :chunk_k]
+        nearest_dist = np.take_along_axis(distances, nearest, axis=1)
+        keep = np.isfinite(nearest_dist)
+        rows.append(np.broadcast_to(chunk[:, None], nearest.shape)[keep])
+        cols.append(band[nearest[keep]])
+        dists.append(nearest_dist[keep])
+
+    if not rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+
+def _sparse_matching(n_rows: int, n_cols: int, rows: np.ndarray, cols: np.ndarray,
+                     costs: np.ndarray) -> np.ndarray:
+    match = np.full(n_rows, -1, dtype=np.intp)
+    # One private "unassigned" column per row guarantees a full matching exists
+    dummy_rows = np.arange(n_rows)
+    graph = csr_matrix(
+        (np.concatenate([costs, np.full(n_rows, UNASSIGNED_COST)]),
+         (np.concatenate([rows, dummy_rows]), np.concatenate([cols, n_cols + dummy_rows]))),
+        shape=(n_rows, n_cols + n_rows)
+    )
+    matched_rows, matched_cols = min_weight_full_bipartite_matching(graph)
+    real = matched_cols < n_cols
+    match[matched_rows[real]] = matched_cols[real]
+    return match
+
+
+def solve_matching(n_rows: int, n_cols: int, rows: np.ndarray, cols: np.ndarray,
+                   costs: np.ndarray) -> np.ndarray:
+    """
+    Min-cost matching of rows to columns over the given edges, where leaving
+    a row unmatched costs UNASSIGNED_COST.
+
+    Uses SciPy's sparse LAPJV on each connected component when available,
+    otherwise a greedy pass over the edges cheapest first.
+
+    Returns:
+        Column matched to each row, or -1
+    """
+    match = np.full(n_rows, -1, dtype=np.intp)
+    useful = costs < UNASSIGNED_COST
+    rows, cols, costs = rows[useful], cols[useful], costs[useful]
+    if not len(rows):
+        return match
+
+    if SCIPY_AVAILABLE:
+        # Requests and volunteers in different regions never share an edge;
+        # solving each connected component on its own gives the same optimum
+        # far faster than one large problem
+        graph = coo_matrix((np.ones(len(rows)), (rows, n_rows + cols)), shape=(n_rows + n_cols,) * 2)
+        n_components, labels = connected_components(graph, directed=False)
+        edge_labels = labels[rows]
+        order = np.argsort(edge_labels, kind="stable")
+        bounds = np.searchsorted(edge_labels[order], np.arange(n_components + 1))
+        for component in range(n_components):
+            edges = order[bounds[component]:bounds[component + 1]]
+            if not len(edges):
+                continue
+            row_ids, local_rows = np.unique(rows[edges], return_inverse=True)
+            col_ids, local_cols = np.unique(cols[edges], return_inverse=True)
+            local = _sparse_matching(len(row_ids), len(col_ids), local_rows, local_cols, costs[edges])
+            matched = local >= 0
+            match[row_ids[matched]] = col_ids[local[matched]]
+        return match
+
+    taken = np.zeros(n_cols, dtype=bool)
+    for i in np.argsort(costs, kind="stable"):
+        row, col = rows[i], cols[i]
+        if match[row] < 0 and not taken[col]:
+            match[row] = col
+            taken[col] = True
+    return match
+
+
+def plan_assignments(requests: Sequence[dict], volunteers: Sequence, workload: Dict[str, int],
+                     radius_km: float = 50.0, candidates_per_request: int = 50,
+                     workload_penalty: float = 2.0, max_active_tasks: int = 3) -> List[dict]:
+    """
+    Assign volunteers to a batch of requests so the total score is maximised.
+
+    The per-pair score is the one accept_donation uses (capacity score plus
+    half the reliability, minus a tenth of the distance), less
+    workload_penalty for each task the volunteer is already carrying. Each
+    volunteer takes at most one request per batch, and volunteers at
+    max_active_tasks are left out. Requests that need an extra volunteer get
+    one in a second matching round over the volunteers still free.
+
+    Args:
+        requests: Dicts with request_id, latitude, longitude, quantity, version
+        volunteers: VolunteerRecord-like objects with coordinates
+        workload: Active task count per volunteer user_id
+
+    Returns:
+        One dict per assigned request with the fields to write
+    """
+    requests = [r for r in requests if has_coordinates(r)]
+    volunteers = [v for v in volunteers if v.has_coordinates and workload.get(v.user_id, 0) < max_active_tasks]
+    if not requests or not volunteers:
+        return []
+
+    req_coords = np.array([(r["latitude"], r["longitude"]) for r in requests], dtype=np.float64)
+    vol_coords = np.array([(v.latitude, v.longitude) for v in volunteers], dtype=np.float64)
+    quantity = np.array([r.get("quantity") or 0 for r in requests], dtype=np.float64)
+    capacity = np.array([TRANSPORT_CAPACITY.get(v.transport_mode, DEFAULT_CAPACITY) for v in volunteers], dtype=np.float64)
+    reliability = np.array([v.reliability_score for v in volunteers], dtype=np.float64)
+    load = np.array([workload.get(v.user_id, 0) for v in volunteers], dtype=np.float64)
+
+    rows, cols, dist = candidate_edges(req_coords, vol_coords, candidates_per_request, radius_km)
+    load_cost = workload_penalty * load[cols]
+
+    # Round 1: lead volunteers
+    scores = capacity_score(capacity[cols], dist, quantity[rows]) + reliability[cols] / 2 - dist / 10
+    lead = solve_matching(len(requests), len(volunteers), rows, cols, SCORE_CEILING - scores + load_cost)
+
+    assigned = np.flatnonzero(lead >= 0)
+    lead_dist = haversine_pairs(req_coords[assigned], vol_coords[lead[assigned]])
+
+    # Round 2: co-volunteers where the lead volunteer cannot manage alone
+    needs_extra = assigned[capacity_score(capacity[lead[assigned]], lead_dist, quantity[assigned]) < 2]
+    co = np.full(len(requests), -1, dtype=np.intp)
+    if len(needs_extra):
+        wanted = np.zeros(len(requests), dtype=bool)
+        wanted[needs_extra] = True
+        free = np.ones(len(volunteers), dtype=bool)
+        free[lead[assigned]] = False
+        eligible = wanted[rows] & free[cols]
+        co_scores = reliability[cols[eligible]] - dist[eligible] / 10
+        co = solve_matching(len(requests), len(volunteers), rows[eligible], cols[eligible],
+                            SCORE_CEILING - co_scores + load_cost[eligible])
+
+    plan = []
+    for r, d in zip(assigned.tolist(), lead_dist.tolist()):
+        volunteer = volunteers[lead[r]]
+        entry = {
+            "request_id": requests[r]["request_id"],
+            "version": requests[r].get("version", 0),
+            "volunteer_id": volunteer.user_id,
+            "volunteer_name": volunteer.name,
+            "distance_km": round(d, 2),
+        }
+        if co[r] >= 0:
+            co_volunteer = volunteers[co[r]]
+            entry.update({
+                "co_volunteer_id": co_volunteer.user_id,
+                "co_volunteer_name": co_volunteer.name,
+                "extra_volunteer_reason": extra_volunteer_reason(quantity[r], d),
+                "auto_triggered": True
+            })
+        plan.append(entry)
+    return plan
+
+
+def has_coordinates(request: dict) -> bool:
+    return request.get("latitude") is not None and request.get("longitude") is not None
+
+
+async def plan_without_coordinates(requests: Sequence[dict], find_candidates, workload: Dict[str, int],
+                                   taken: set, workload_penalty: float = 2.0,
+                                   max_active_tasks: int = 3) -> List[dict]:
+    """
+    Assign requests the optimizer cannot place because they have no pickup
+    coordinates, one at a time, scoring find_candidates' (volunteer,
+    distance_km) pairs like plan_assignments does. Volunteers in taken (and
+    those chosen here, which are added to it) are not used again.
+
+    Args:
+        find_candidates: Coroutine function (request, exclude_ids) returning
+            candidate pairs, e.g. the roster scan used by accept_donation
+    """
+    plan = []
+    for request in requests:
+        candidates = [
+            (vol, distance) for vol, distance in await find_candidates(request, tuple(taken))
+            if workload.get(vol.user_id, 0) < max_active_tasks and vol.user_id not in taken
+        ]
+        quantity = request.get("quantity") or 0
+        best, best_distance, best_score = None, 0.0, MIN_SCORE
+        for vol, distance in candidates:
+            score = (capacity_score(TRANSPORT_CAPACITY.get(vol.transport_mode, DEFAULT_CAPACITY), distance, quantity)
+                     + vol.reliability_score / 2 - distance / 10
+                     - workload_penalty * workload.get(vol.user_id, 0))
+            if score > best_score:
+                best, best_distance, best_score = vol, distance, score
+        if best is None:
+            continue
+        taken.add(best.user_id)
+        entry = {
+            "request_id": request["request_id"],
+            "version": request.get("version", 0),
+            "volunteer_id": best.user_id,
+            "volunteer_name": best.name,
+            "distance_km": round(best_distance, 2),
+        }
+        lead_capacity = TRANSPORT_CAPACITY.get(best.transport_mode, DEFAULT_CAPACITY)
+        others = [(vol, distance) for vol, distance in candidates if vol.user_id not in taken]
+        if capacity_score(lead_capacity, best_distance, quantity) < 2 and others:
+            co_volunteer, _ = max(others, key=lambda pair: pair[0].reliability_score - pair[1] / 10
+                                  - workload_penalty * workload.get(pair[0].user_id, 0))
+            taken.add(co_volunteer.user_id)
+            entry.update({
+                "co_volunteer_id": co_volunteer.user_id,
+                "co_volunteer_name": co_volunteer.name,
+                "extra_volunteer_reason": extra_volunteer_reason(quantity, best_distance),
+                "auto_triggered": True
+            })
+        plan.append(entry)
+    return plan
+
+
+async def active_workload(db) -> Dict[str, int]:
+    """Active tasks per volunteer, counting co-volunteer slots"""
+    pipeline = [
+        {"$match": {"status": {"$in": ACTIVE_TASK_STATUSES}}},
+        {"$project": {"_id": 0, "assignees": ["$volunteer_id", "$co_volunteer_id"]}},
+        {"$unwind": "$assignees"},
+        {"$match": {"assignees": {"$ne": None}}},
+        {"$group": {"_id": "$assignees", "count": {"$sum": 1}}}
+    ]
+    return {row["_id"]: row["count"] async for row in db.food_requests.aggregate(pipeline)}
+
+
+async def run_batch_assignment(db, roster, dry_run: bool = False,
+                               on_assigned: Optional[Callable[[dict, dict], None]] = None,
+                               find_candidates: Optional[Callable[[dict, tuple], Awaitable[list]]] = None,
+                               concurrency: int = 16, **plan_options) -> dict:
+    """
+    Collect accepted_by_donor requests, plan assignments and write them.
+
+    Requests without pickup coordinates cannot be placed by the optimizer;
+    they go through find_candidates (the same candidate search the greedy
+    mode uses) afterwards, and are counted in the report either way.
+    Each write is a conditional transition at the version that was planned,
+    so requests changed in the meantime are skipped rather than overwritten.
+    on_assigned(previous_request, fields) is called for every write that lands.
+    """
+    requests, workload = await asyncio.gather(
+        db.food_requests.find(
+            {"status": "accepted_by_donor"},
+            {"_id": 0, "request_id": 1, "latitude": 1, "longitude": 1, "pickup_location": 1,
+             "quantity": 1, "version": 1}
+        ).to_list(None),
+        active_workload(db)
+    )
+    unlocated = [r for r in requests if not has_coordinates(r)]
+    # Planning is seconds of CPU at scale; keep it off the event loop. The
+    # roster is copied since it keeps changing while the plan is computed.
+    volunteers = list(roster.records())
+    plan = await asyncio.to_thread(plan_assignments, requests, volunteers, workload, **plan_options)
+    if unlocated and find_candidates:
+        plan += await plan_without_coordinates(
+            unlocated, find_candidates, workload, {entry["volunteer_id"] for entry in plan}
+            | {entry["co_volunteer_id"] for entry in plan if "co_volunteer_id" in entry},
+            workload_penalty=plan_options.get("workload_penalty", 2.0),
+            max_active_tasks=plan_options.get("max_active_tasks", 3)
+        )
+    report = {"pending": len(requests), "planned": len(plan), "assigned": 0, "conflicts": 0,
+              "without_coordinates": len(unlocated),
+              "volunteers_without_coordinates": sum(1 for v in volunteers if not v.has_coordinates),
+              "solver": "scipy" if SCIPY_AVAILABLE else "greedy"}
+    if unlocated and not find_candidates:
+        logger.warning(f"Batch assignment: {len(unlocated)} request(s) without pickup coordinates "
+                       "cannot be placed by the optimizer")
+    if dry_run:
+        report["plan"] = plan
+        return report
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def apply(entry: dict) -> None:
+        fields = {key: value for key, value in entry.items() if key not in ("request_id", "version", "distance_km")}
+        async with semaphore:
+            try:
+                previous = await transition_request(
+                    db, entry["request_id"], "assigned_to_volunteer", fields,
+                    from_statuses=["accepted_by_donor"], expected_version=entry["version"]
+                )
+            except TransitionError:
+                report["conflicts"] += 1
+                return
+        report["assigned"] += 1
+        if on_assigned:
+            on_assigned(previous, fields)
+
+    await asyncio.gather(*(apply(entry) for entry in plan))
+    await increment(db, {"status.accepted_by_donor": -report["assigned"],
+                         "status.assigned_to_volunteer": report["assigned"]})
+    logger.info(f"Batch assignment: {report['assigned']} assigned, {report['conflicts']} conflicts, "
+                f"{report['pending'] - report['planned']} left waiting "
+                f"({report['without_coordinates']} without pickup coordinates)")
+    return report
+
+
+async def run_batch_assignment_job(db, roster, interval_seconds: float,
+                                   on_assigned: Optional[Callable[[dict, dict], None]] = None,
+                                   find_candidates: Optional[Callable[[dict, tuple], Awaitable[list]]] = None,
+                                   **plan_options) -> None:
+    """
+    Run batch assignment every interval_seconds; runs until cancelled.
+    Every worker runs this loop, but only the holder of the job lease plans,
+    so one optimizer run covers the whole deployment.
+    """
+    holder = lease_holder_id()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            if not await acquire_lease(db, "batch_assignment", holder, interval_seconds * 3):
+                continue
+            await run_batch_assignment(db, roster, on_assigned=on_assigned, find_candidates=find_candidates,
+                                       **plan_options)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch assignment failed: {str(e)}")
@@ -0,0 +1,81 @@
+"""
+Batch volunteer assignment benchmark.
+
+Generates random requests and volunteers clustered around a few cities and
+times each stage of batch_assignment.plan_assignments.
+
+Usage (from backend/):
+    python benchmarks/bench_batch_assignment.py [--requests 10000] [--volunteers 10000] [--greedy]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import batch_assignment  # noqa: E402
+from volunteer_roster import VolunteerRecord  # noqa: E402
+
+# Chennai, Bengaluru, Mumbai, Delhi, Kolkata, Hyderabad
+CITIES = np.array([(13.08, 80.27), (12.97, 77.59), (19.08, 72.88),
+                   (28.61, 77.21), (22.57, 88.36), (17.39, 78.49)])
+TRANSPORT_MODES = list(batch_assignment.TRANSPORT_CAPACITY)
+
+
+def scatter(rng, n: int) -> np.ndarray:
+    # Roughly a 30 km spread around each city centre
+    return CITIES[rng.integers(len(CITIES), size=n)] + rng.normal(scale=0.15, size=(n, 2))
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:>10,.0f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--greedy", action="store_true", help="use the NumPy fallback instead of SciPy")
+    args = parser.parse_args()
+
+    if args.greedy:
+        batch_assignment.SCIPY_AVAILABLE = False
+
+    rng = np.random.default_rng(7)
+    req_coords = scatter(rng, args.requests)
+    vol_coords = scatter(rng, args.volunteers)
+    requests = [
+        {"request_id": f"r{i}", "latitude": lat, "longitude": lon,
+         "quantity": int(rng.integers(5, 200)), "version": 0}
+        for i, (lat, lon) in enumerate(req_coords)
+    ]
+    volunteers = [
+        VolunteerRecord(f"v{i}", f"Volunteer {i}", latitude=lat, longitude=lon,
+                        transport_mode=TRANSPORT_MODES[i % len(TRANSPORT_MODES)],
+                        reliability_score=float(rng.uniform(3, 10)))
+        for i, (lat, lon) in enumerate(vol_coords)
+    ]
+    workload = {f"v{i}": int(n) for i, n in enumerate(rng.integers(0, 3, size=args.volunteers))}
+
+    print(f"{args.requests:,} requests x {args.volunteers:,} volunteers, "
+          f"solver={'scipy' if batch_assignment.SCIPY_AVAILABLE else 'greedy'}")
+    rows, cols, dist = timed("candidate edges", lambda: batch_assignment.candidate_edges(
+        req_coords, vol_coords, args.candidates, 50.0))
+    print(f"{'':<32} {len(rows):>10,} edges")
+    plan = timed("plan_assignments (end to end)", lambda: batch_assignment.plan_assignments(
+        requests, volunteers, workload, candidates_per_request=args.candidates))
+
+    co = sum(1 for entry in plan if "co_volunteer_id" in entry)
+    print(f"assigned {len(plan):,} requests ({co:,} with a co-volunteer), "
+          f"mean distance {np.mean([entry['distance_km'] for entry in plan]):.2f} km")
+
+
+if __name__ == "__main__":
+    main()
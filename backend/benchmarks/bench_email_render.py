@@ -0,0 +1,46 @@
+"""
+Email render throughput benchmark.
+
+Usage (from backend/):
+    python benchmarks/bench_email_render.py [--count 20000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import email_service  # noqa: E402
+
+
+def run(label: str, count: int, make_params) -> None:
+    email_service._render_cached.cache_clear()
+    start = time.perf_counter()
+    for i in range(count):
+        kind, params = make_params(i)
+        email_service.render_email(kind, params)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {count / elapsed:>12,.0f} renders/s  ({elapsed * 1000 / count:.3f} ms each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    roles = email_service.KNOWN_ROLES
+
+    # Every recipient distinct: measures raw template rendering
+    run("welcome, unique names (cold)", args.count,
+        lambda i: ("welcome", {"user_name": f"User {i}", "role": roles[i % len(roles)]}))
+    run("verification, unique names (cold)", args.count,
+        lambda i: ("verification_approved", {"user_name": f"User {i}", "role": "ngo"}))
+
+    # Repeated parameters: measures the render cache
+    run("welcome, 100 repeated names (cached)", args.count,
+        lambda i: ("welcome", {"user_name": f"User {i % 100}", "role": roles[i % len(roles)]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+import aiofiles
+from pymongo.errors import DuplicateKeyError
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 256 * 1024
+
+# Garbage collection tombstones a blob (state "deleting") before removing
+# its content; one older than this was left by a collector that died and
+# may be taken over
+TOMBSTONE_STALE_SECONDS = 60
+
+
+def shard_path(key: str) -> str:
+    """ab/cd/abcd... - two levels of fan-out keep directories small"""
+    return f"{key[:2]}/{key[2:4]}/{key}"
+
+
+async def read_file(path: str, start: int = 0, end: Optional[int] = None,
+                    chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield bytes start..end (inclusive; end=None reads to the end)"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class LocalBlobStore:
+    """Content-addressed blobs on the local filesystem"""
+
+    def __init__(self, root: str):
+        self.root = root
+        # Uploads are staged on the same filesystem so put_file is a rename
+        self.staging_dir = os.path.join(root, ".incoming")
+
+    def local_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.root, shard_path(key))
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.local_path(key))
+
+    async def put_file(self, key: str, source_path: str, content_type: str) -> None:
+        """Move source_path into the store; the source is consumed either way"""
+        await asyncio.to_thread(self._put_file, self.local_path(key), source_path)
+
+    @staticmethod
+    def _put_file(dest: str, source_path: str) -> None:
+        if os.path.exists(dest):
+            os.remove(source_path)
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(source_path, dest)
+
+    async def stat(self, key: str) -> Optional[Tuple[int, float]]:
+        """(size, modified timestamp) or None if missing"""
+        try:
+            st = await asyncio.to_thread(os.stat, self.local_path(key))
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async for chunk in read_file(self.local_path(key), start, end, chunk_size):
+            yield chunk
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(remove_if_exists, self.local_path(key))
+
+
+class S3BlobStore:
+    """
+    Content-addressed blobs in an S3-compatible bucket. endpoint_url points
+    it at MinIO or another local stand-in. boto3 is blocking, so every call
+    runs in a worker thread.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "blobs/", endpoint_url: Optional[str] = None,
+                 staging_dir: Optional[str] = None, **client_options):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("boto3 is required for the S3 blob store")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, **client_options)
+        self.staging_dir = staging_dir or tempfile.gettempdir()
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{shard_path(key)}"
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    async def _head(self, key: str) -> Optional[dict]:
+        try:
+            return await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await self._head(key) is not None
+
+    async def put_file(self, key: str, source_path: str, content_type: str) -> None:
+        try:
+            if not await self.exists(key):
+                await asyncio.to_thread(
+                    self.client.upload_file, source_path, self.bucket, self._object_key(key),
+                    ExtraArgs={"ContentType": content_type}
+                )
+        finally:
+            await asyncio.to_thread(os.remove, source_path)
+
+    async def stat(self, key: str) -> Optional[Tuple[int, float]]:
+        head = await self._head(key)
+        if head is None:
+            return None
+        return head["ContentLength"], head["LastModified"].timestamp()
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self._object_key(key), Range=byte_range
+        )
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._object_key(key))
+
+
+def blob_url(key: str, file_type: str) -> str:
+    """Reference stored on documents; it ends in the real extension"""
+    return f"blob:{key}.{file_type}"
+
+
+def get_blob_store(upload_root: str):
+    """Blob store selected by BLOB_BACKEND (local or s3)"""
+    backend = os.environ.get('BLOB_BACKEND', 'local').lower()
+    if backend == "s3":
+        return S3BlobStore(
+            bucket=os.environ['BLOB_S3_BUCKET'],
+            prefix=os.environ.get('BLOB_S3_PREFIX', 'blobs/'),
+            endpoint_url=os.environ.get('BLOB_S3_ENDPOINT_URL'),
+            staging_dir=os.path.join(upload_root, ".incoming"),
+        )
+    return LocalBlobStore(os.environ.get('BLOB_ROOT', os.path.join(upload_root, "blobs")))
+
+
+async def put_blob(db, store, stored, retry_delay: float = 0.1) -> str:
+    """
+    Add a reference to an upload's content, storing it if it is new.
+
+    A blob tombstoned by collect_garbage is never re-referenced: its content
+    may be going away, so this waits until the collector has finished and
+    then creates the blob afresh from the staged copy.
+
+    Args:
+        stored: StoredUpload staged in store.staging_dir; it is consumed
+
+    Returns:
+        The blob key (the content's SHA-256)
+    """
+    key = stored.sha256
+    try:
+        while True:
+            now = datetime.now(timezone.utc)
+            stale = (now - timedelta(seconds=TOMBSTONE_STALE_SECONDS)).isoformat()
+            try:
+                await db.blobs.update_one(
+                    {"_id": key, "$or": [{"state": {"$ne": "deleting"}}, {"deleting_at": {"$lte": stale}}]},
+                    {"$inc": {"refs": 1},
+                     "$set": {"last_referenced_at": now.isoformat()},
+                     "$unset": {"released_at": "", "state": "", "deleting_at": ""},
+                     "$setOnInsert": {"size": stored.size, "content_type": stored.content_type,
+                                      "file_type": stored.file_type, "created_at": now.isoformat()}},
+                    upsert=True
+                )
+                break
+            except DuplicateKeyError:
+                # Tombstoned: the upsert missed and collided with the doc being collected
+                await asyncio.sleep(retry_delay)
+    except BaseException:
+        await asyncio.to_thread(remove_if_exists, stored.path)
+        raise
+    try:
+        await store.put_file(key, stored.path, stored.content_type)
+    except BaseException:
+        # Give back the reference taken above so a failed store doesn't pin the blob
+        await release_blob(db, key)
+        await asyncio.to_thread(remove_if_exists, stored.path)
+        raise
+    return key
+
+
+async def release_blob(db, key: Optional[str]) -> None:
+    """Drop one reference; unreferenced blobs are removed by collect_garbage"""
+    if not key:
+        return
+    await db.blobs.update_one(
+        {"_id": key, "refs": {"$gt": 0}},
+        [{"$set": {
+            "refs": {"$subtract": ["$refs", 1]},
+            "released_at": {"$cond": [{"$lte": ["$refs", 1]}, datetime.now(timezone.utc).isoformat(), "$$REMOVE"]}
+        }}]
+    )
+
+
+async def collect_garbage(db, store, grace_seconds: float = 3600,
+                          on_delete: Optional[Callable[[str], Awaitable[None]]] = None) -> int:
+    """
+    Delete blobs that have had no references for grace_seconds.
+
+    Each blob is tombstoned before its content is removed and the record is
+    dropped only afterwards, so put_blob can never add a reference to
+    content that is about to disappear. on_delete(key) runs for each removed
+    blob, e.g. to drop derived files such as thumbnails.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(seconds=grace_seconds)).isoformat()
+    stale = (now - timedelta(seconds=TOMBSTONE_STALE_SECONDS)).isoformat()
+    removed = 0
+    async for blob in db.blobs.find({"refs": {"$lte": 0}, "released_at": {"$lte": cutoff}}, {"_id": 1}):
+        key = blob["_id"]
+        claimed = await db.blobs.update_one(
+            {"_id": key, "refs": {"$lte": 0},
+             "$or": [{"state": {"$ne": "deleting"}}, {"deleting_at": {"$lte": stale}}]},
+            {"$set": {"state": "deleting", "deleting_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        if not claimed.modified_count:
+            # Re-referenced since it was listed, or another collector has it
+            continue
+        await store.delete(key)
+        if on_delete:
+            await on_delete(key)
+        await db.blobs.delete_one({"_id": key, "state": "deleting"})
+        removed += 1
+    logger.info(f"Blob garbage collection removed {removed} blob(s)")
+    return removed
+
+
+if __name__ == "__main__":
+    # python blob_store.py --gc  -> delete blobs unreferenced for over an hour, with their thumbnails
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from thumbnails import ThumbnailCache
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tls=True, tlsAllowInvalidCertificates=True)
+        try:
+            if "--gc" in sys.argv:
+                upload_root = os.environ.get('UPLOAD_ROOT', '/app/uploads')
+                store = get_blob_store(upload_root)
+                # Same location as the server's cache, so derived files go with their blob
+                thumbnails = ThumbnailCache(
+                    os.environ.get('THUMBNAIL_ROOT', os.path.join(upload_root, "thumbnails")), store
+                )
+                try:
+                    print(await collect_garbage(client[os.environ['DB_NAME']], store,
+                                                on_delete=thumbnails.discard))
+                finally:
+                    thumbnails.shutdown()
+        finally:
+            client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import logging
+from datetime import date, timedelta
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def _day_of(created_at: str) -> str:
+    # created_at is an ISO timestamp; the first 10 characters are the date
+    return created_at[:10]
+
+
+async def record_completion(db, created_at: str, people_count: int = 0) -> None:
+    """Add one completed request to the rollup for the day it was created"""
+    day = _day_of(created_at)
+    await db.daily_stats.update_one(
+        {"_id": day},
+        {"$inc": {"requests": 1, "people_fed": people_count or 0}, "$setOnInsert": {"date": day}},
+        upsert=True
+    )
+
+
+async def backfill_daily_stats(db) -> None:
+    """Rebuild daily_stats from completed food requests inside MongoDB"""
+    pipeline = [
+        {"$match": {"status": "completed", "created_at": {"$type": "string"}}},
+        {"$group": {
+            "_id": {"$substrBytes": ["$created_at", 0, 10]},
+            "requests": {"$sum": 1},
+            "people_fed": {"$sum": {"$ifNull": ["$people_count", 0]}}
+        }},
+        {"$addFields": {"date": "$_id"}},
+        {"$merge": {"into": "daily_stats", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    await db.food_requests.aggregate(pipeline).to_list(None)
+    logger.info("daily_stats backfill complete")
+
+
+def bucket_for(day: str, granularity: str) -> str:
+    """Map a YYYY-MM-DD day to its day, week (Monday) or month bucket"""
+    if granularity == "month":
+        return day[:7]
+    if granularity == "week":
+        parsed = date.fromisoformat(day)
+        return (parsed - timedelta(days=parsed.weekday())).isoformat()
+    return day
+
+
+async def read_trends(db, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      granularity: str = "day") -> List[dict]:
+    """
+    Completed requests and people fed per bucket, read only from daily_stats
+
+    Args:
+        date_from, date_to: Inclusive YYYY-MM-DD bounds (optional)
+        granularity: day, week or month
+
+    Returns:
+        List of {"date", "requests", "people_fed"} in date order
+    """
+    query = {}
+    if date_from or date_to:
+        query["_id"] = {}
+        if date_from:
+            query["_id"]["$gte"] = date_from
+        if date_to:
+            query["_id"]["$lte"] = date_to
+
+    trends = {}
+    async for row in db.daily_stats.find(query).sort("_id", 1):
+        try:
+            bucket = bucket_for(row["_id"], granularity)
+        except ValueError:
+            continue
+        if bucket not in trends:
+            trends[bucket] = {"date": bucket, "requests": 0, "people_fed": 0}
+        trends[bucket]["requests"] += row.get("requests", 0)
+        trends[bucket]["people_fed"] += row.get("people_fed", 0)
+    return list(trends.values())
+
+
+if __name__ == "__main__":
+    # python daily_stats.py  -> rebuild the rollup from food_requests
+    import asyncio
+    import os
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tls=True, tlsAllowInvalidCertificates=True)
+        try:
+            await backfill_daily_stats(client[os.environ['DB_NAME']])
+        finally:
+            client.close()
+
+    asyncio.run(main())
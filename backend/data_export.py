@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+from typing import AsyncIterator, List, Optional
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Column order for CSV exports; NDJSON rows carry every projected field
+USER_EXPORT_FIELDS = [
+    "user_id", "email", "name", "role", "location", "phone", "latitude", "longitude",
+    "organization", "donor_type", "transport_mode", "verification_status",
+    "reliability_score", "auth_provider", "created_at",
+]
+AUDIT_LOG_EXPORT_FIELDS = ["log_id", "timestamp", "action", "user_id", "details"]
+
+
+def time_range_filter(field: str, date_from: Optional[str], date_to: Optional[str]) -> dict:
+    """Filter on an ISO timestamp field; date-only bounds cover the whole day"""
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = date_from
+    if date_to:
+        if len(date_to) == 10:
+            # A bare date includes that whole day
+            bounds["$lt"] = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat()
+        else:
+            bounds["$lte"] = date_to
+    return {field: bounds} if bounds else {}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, separators=(",", ":"))
+    return value
+
+
+async def stream_ndjson(cursor, chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    """Yield one JSON document per line, chunk_rows lines at a time"""
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=str, separators=(",", ":")))
+        if len(lines) >= chunk_rows:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def stream_csv(cursor, fields: List[str], chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    """Yield a header row and then the documents as CSV, chunk_rows rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(field)) for field in fields])
+        rows += 1
+        if rows >= chunk_rows:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate(0)
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_export(cursor, export_format: str, fields: List[str]) -> AsyncIterator[bytes]:
+    if export_format == "csv":
+        return stream_csv(cursor, fields)
+    return stream_ndjson(cursor)
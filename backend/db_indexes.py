@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Every index the backend relies on, by collection. Index names are left to
+# MongoDB's default (e.g. "email_1") so indexes created before the registry
+# existed are recognised as the same index.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        # Pending verification queues and the verified volunteer roster
+        IndexModel([("role", ASCENDING), ("verification_status", ASCENDING),
+                    ("created_at", ASCENDING), ("user_id", ASCENDING)]),
+        # Admin user list and exports
+        IndexModel([("created_at", DESCENDING), ("user_id", DESCENDING)]),
+        IndexModel([("geo", GEOSPHERE)]),
+    ],
+    "food_requests": [
+        IndexModel([("request_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("urgency_score", DESCENDING),
+                    ("request_id", DESCENDING)]),
+        IndexModel([("ngo_id", ASCENDING), ("created_at", DESCENDING),
+                    ("request_id", DESCENDING)]),
+        IndexModel([("donor_id", ASCENDING), ("created_at", DESCENDING),
+                    ("request_id", DESCENDING)]),
+        IndexModel([("volunteer_id", ASCENDING), ("created_at", DESCENDING),
+                    ("request_id", DESCENDING)]),
+        IndexModel([("co_volunteer_id", ASCENDING), ("created_at", DESCENDING),
+                    ("request_id", DESCENDING)]),
+        IndexModel([("pickup_geo", GEOSPHERE)]),
+    ],
+    "audit_logs": [
+        IndexModel([("timestamp", DESCENDING), ("log_id", DESCENDING)]),
+        IndexModel([("action", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "email_outbox": [
+        IndexModel([("outbox_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("claim_id", ASCENDING)], sparse=True),
+    ],
+    "blobs": [
+        # Garbage collection of blobs nothing refers to any more
+        IndexModel([("refs", ASCENDING), ("released_at", ASCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every registered index. Safe to run repeatedly: existing indexes
+    with the same definition are left alone.
+
+    A failure on one index (e.g. duplicate emails blocking a unique index)
+    is logged and does not stop the others.
+
+    Returns:
+        {collection: [index names created or confirmed]}
+    """
+    async def apply(collection: str, model: IndexModel):
+        try:
+            await db[collection].create_indexes([model])
+            return collection, model.document["name"]
+        except OperationFailure as e:
+            logger.error(f"Index {model.document['name']} on {collection} failed: {str(e)}")
+            return collection, None
+
+    results = await asyncio.gather(*(
+        apply(collection, model) for collection, models in INDEXES.items() for model in models
+    ))
+    created: Dict[str, List[str]] = {collection: [] for collection in INDEXES}
+    for collection, name in results:
+        if name:
+            created[collection].append(name)
+    return created
+
+
+async def _index_usage(collection) -> Dict[str, int]:
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+    except OperationFailure:
+        # $indexStats needs the indexStats privilege; without it usage is unknown
+        return {}
+    return {row["name"]: row.get("accesses", {}).get("ops", 0) for row in stats}
+
+
+async def check_indexes(db) -> Dict[str, dict]:
+    """
+    Compare the live indexes with the registry.
+
+    Returns, per collection:
+        missing: registered but not present
+        unexpected: present but not registered (excluding _id_)
+        unused: present with zero recorded accesses since the server started
+    """
+    report = {}
+    for collection, models in INDEXES.items():
+        expected = {model.document["name"] for model in models}
+        existing = {index["name"] async for index in db[collection].list_indexes()}
+        usage = await _index_usage(db[collection])
+        report[collection] = {
+            "missing": sorted(expected - existing),
+            "unexpected": sorted(existing - expected - {"_id_"}),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    # python db_indexes.py [--check]
+    import json
+    import os
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tls=True, tlsAllowInvalidCertificates=True)
+        try:
+            db = client[os.environ['DB_NAME']]
+            if "--check" in sys.argv:
+                print(json.dumps(await check_indexes(db), indent=2))
+            else:
+                print(json.dumps(await ensure_indexes(db), indent=2))
+        finally:
+            client.close()
+
+    asyncio.run(main())
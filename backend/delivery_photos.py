@@ -0,0 +1,154 @@
+import asyncio
+import base64
+import binascii
+import io
+import logging
+import os
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from blob_store import put_blob, release_blob
+from thumbnails import THUMBNAIL_ERRORS
+from upload_pipeline import UploadRejected, stage_bytes
+
+logger = logging.getLogger(__name__)
+
+# Plenty for proof of delivery; phone photos are usually 3-4x this
+PHOTO_MAX_SIZE = 1600
+PHOTO_THUMBNAIL_SIZE = 320
+PHOTO_QUALITY = 80
+PHOTO_FILE_TYPE = "jpg"
+PHOTO_CONTENT_TYPE = "image/jpeg"
+
+# Fields a stored photo leaves on its food request
+PHOTO_FIELDS = ("delivery_photo_blob", "delivery_photo_thumbnail_blob")
+
+
+def decode_photo(data: str, max_bytes: int) -> bytes:
+    """
+    Bytes of a base64 photo, with or without a data: URL prefix.
+
+    Raises:
+        UploadRejected: 400 not base64, 413 too large
+    """
+    if data.startswith("data:"):
+        data = data.partition(",")[2]
+    # Checked before decoding so an oversized payload is never materialised
+    if len(data) * 3 // 4 > max_bytes:
+        raise UploadRejected(f"Photo exceeds {max_bytes // (1024 * 1024)}MB limit", 413)
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadRejected("Delivery photo must be base64 encoded")
+    if not raw:
+        raise UploadRejected("Delivery photo is empty")
+    return raw
+
+
+def _jpeg(img: Image.Image, quality: int) -> bytes:
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def encode_photo(raw: bytes, max_size: int = PHOTO_MAX_SIZE, thumbnail_size: int = PHOTO_THUMBNAIL_SIZE,
+                 quality: int = PHOTO_QUALITY) -> Tuple[bytes, bytes]:
+    """
+    Re-encode a photo as a bounded JPEG plus a thumbnail. Orientation is
+    applied and metadata (including GPS tags) is dropped. Blocking.
+    """
+    with Image.open(io.BytesIO(raw)) as img:
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_size, max_size))
+        photo = _jpeg(img, quality)
+        img.thumbnail((thumbnail_size, thumbnail_size))
+        return photo, _jpeg(img, quality)
+
+
+async def store_delivery_photo(db, store, data: str, run_blocking, max_bytes: int) -> dict:
+    """
+    Decode, re-encode and store a base64 delivery photo and its thumbnail.
+
+    Args:
+        run_blocking: Coroutine function running func(*args) off the event loop
+
+    Returns:
+        The PHOTO_FIELDS to set on the food request
+    """
+    raw = decode_photo(data, max_bytes)
+    try:
+        photo, thumbnail = await run_blocking(encode_photo, raw)
+    except THUMBNAIL_ERRORS:
+        raise UploadRejected("Delivery photo is not a readable image", 415)
+
+    photo_key = await put_blob(db, store, await stage_bytes(photo, store.staging_dir, PHOTO_FILE_TYPE))
+    try:
+        thumbnail_key = await put_blob(db, store, await stage_bytes(thumbnail, store.staging_dir, PHOTO_FILE_TYPE))
+    except BaseException:
+        await release_blob(db, photo_key)
+        raise
+    return {"delivery_photo_blob": photo_key, "delivery_photo_thumbnail_blob": thumbnail_key}
+
+
+async def release_delivery_photo(db, fields: Optional[dict]) -> None:
+    """Drop the blob references from store_delivery_photo, e.g. when the write it was for failed"""
+    if fields:
+        await asyncio.gather(*(release_blob(db, fields.get(field)) for field in PHOTO_FIELDS))
+
+
+async def migrate_legacy_photos(db, store, run_blocking, max_bytes: int) -> dict:
+    """
+    Move base64 photos stored on food requests into the blob store. Safe to
+    re-run; requests whose photo cannot be decoded are left untouched.
+    """
+    migrated = failed = 0
+    cursor = db.food_requests.find(
+        {"delivery_photo": {"$type": "string", "$ne": ""}},
+        {"_id": 0, "request_id": 1, "delivery_photo": 1}
+    )
+    async for doc in cursor:
+        try:
+            fields = await store_delivery_photo(db, store, doc["delivery_photo"], run_blocking, max_bytes)
+        except UploadRejected as e:
+            logger.warning(f"Delivery photo for {doc['request_id']} not migrated: {e.detail}")
+            failed += 1
+            continue
+        # Only if the photo is still the one that was converted
+        result = await db.food_requests.update_one(
+            {"request_id": doc["request_id"], "delivery_photo": doc["delivery_photo"]},
+            {"$set": fields, "$unset": {"delivery_photo": ""}}
+        )
+        if result.modified_count:
+            migrated += 1
+        else:
+            await release_delivery_photo(db, fields)
+    logger.info(f"Migrated {migrated} delivery photo(s), {failed} failed")
+    return {"migrated": migrated, "failed": failed}
+
+
+if __name__ == "__main__":
+    # python delivery_photos.py --migrate
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from blob_store import get_blob_store
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tls=True, tlsAllowInvalidCertificates=True)
+        try:
+            if "--migrate" in sys.argv:
+                store = get_blob_store(os.environ.get('UPLOAD_ROOT', '/app/uploads'))
+                max_bytes = int(float(os.environ.get('MAX_UPLOAD_MB', '20')) * 1024 * 1024)
+                print(await migrate_legacy_photos(client[os.environ['DB_NAME']], store, asyncio.to_thread, max_bytes))
+        finally:
+            client.close()
+
+    asyncio.run(main())
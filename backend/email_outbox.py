@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+from email_service import SENDER_EMAIL, render_email
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_email(db, kind: str, recipient_email: str, params: dict) -> str:
+    """
+    Queue an email for background delivery.
+
+    Args:
+        db: Motor database
+        kind: Renderer name from email_service.EMAIL_RENDERERS
+        recipient_email: Destination address
+        params: Keyword arguments for the renderer
+
+    Returns:
+        The outbox_id of the queued message
+    """
+    outbox_id = str(uuid.uuid4())
+    now = _now().isoformat()
+    await db.email_outbox.insert_one({
+        "outbox_id": outbox_id,
+        "kind": kind,
+        "to": recipient_email,
+        "params": params,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now
+    })
+    return outbox_id
+
+
+class EmailDispatcher:
+    """
+    Background worker that drains the email_outbox collection.
+
+    Messages are claimed in batches so several workers can share the outbox,
+    sent with bounded concurrency (batched when the transport supports it),
+    and retried with exponential backoff until max_attempts is reached.
+    A claim that is never completed (e.g. the worker died) expires after
+    lease_seconds and is picked up again.
+    """
+
+    def __init__(self, db, transport, concurrency: int = 4, batch_size: int = 50,
+                 poll_interval: float = 2.0, max_attempts: int = 5,
+                 base_backoff_seconds: float = 5.0, lease_seconds: float = 300.0):
+        self.db = db
+        self.transport = transport
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff_seconds = base_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Skip the poll delay after a local enqueue"""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        error_backoff = self.poll_interval
+        while True:
+            try:
+                batch = await self._claim_batch()
+                if batch:
+                    await self.dispatch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Messages claimed by a failed iteration are retried once their lease expires
+                logger.exception("Email outbox iteration failed")
+                await asyncio.sleep(error_backoff)
+                error_backoff = min(error_backoff * 2, 60.0)
+                continue
+            error_backoff = self.poll_interval
+
+            if batch:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_batch(self) -> List[dict]:
+        now = _now()
+        claimable = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now.isoformat()}},
+            {"status": "sending", "lease_expires_at": {"$lte": now.isoformat()}}
+        ]}
+        candidates = await self.db.email_outbox.find(claimable, {"_id": 0, "outbox_id": 1}) \
+            .sort("next_attempt_at", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+
+        # Re-check the filter while claiming so concurrent workers never share a message
+        claim_id = str(uuid.uuid4())
+        await self.db.email_outbox.update_many(
+            {"outbox_id": {"$in": [c["outbox_id"] for c in candidates]}, **claimable},
+            {"$set": {
+                "status": "sending",
+                "claim_id": claim_id,
+                "lease_expires_at": (now + timedelta(seconds=self.lease_seconds)).isoformat()
+            }, "$inc": {"attempts": 1}}
+        )
+        return await self.db.email_outbox.find({"claim_id": claim_id}, {"_id": 0}).to_list(self.batch_size)
+
+    async def dispatch(self, batch: List[dict]) -> None:
+        """Render and send a claimed batch, recording the outcome of each message"""
+        ready = []
+        for doc in batch:
+            try:
+                subject, html = render_email(doc["kind"], doc.get("params", {}))
+            except Exception as e:
+                # A message that cannot render will never succeed; don't retry it
+                await self._mark_failed(doc, f"render error: {str(e)}", final=True)
+                continue
+            ready.append((doc, {"from": SENDER_EMAIL, "to": [doc["to"]], "subject": subject, "html": html}))
+
+        send_batch = getattr(self.transport, "send_batch", None)
+        if send_batch is not None and len(ready) > 1:
+            size = getattr(self.transport, "max_batch_size", 100)
+            chunks = [ready[i:i + size] for i in range(0, len(ready), size)]
+            await asyncio.gather(*(self._send_chunk(chunk) for chunk in chunks))
+        else:
+            await asyncio.gather(*(self._send_one(doc, message) for doc, message in ready))
+
+    async def _send_one(self, doc: dict, message: dict) -> None:
+        async with self._semaphore:
+            try:
+                email_id = await self.transport.send(message)
+            except Exception as e:
+                await self._mark_failed(doc, str(e))
+                return
+        await self._mark_sent([doc], [email_id])
+
+    async def _send_chunk(self, chunk: list) -> None:
+        async with self._semaphore:
+            try:
+                email_ids = await self.transport.send_batch([message for _, message in chunk])
+            except Exception as e:
+                for doc, _ in chunk:
+                    await self._mark_failed(doc, str(e))
+                return
+        await self._mark_sent([doc for doc, _ in chunk], email_ids)
+
+    async def _mark_sent(self, docs: List[dict], email_ids: List[str]) -> None:
+        sent_at = _now().isoformat()
+        padded_ids = list(email_ids) + [None] * (len(docs) - len(email_ids))
+        await self.db.email_outbox.bulk_write([
+            UpdateOne(
+                {"outbox_id": doc["outbox_id"]},
+                {"$set": {"status": "sent", "sent_at": sent_at, "email_id": email_id},
+                 "$unset": {"claim_id": "", "lease_expires_at": ""}}
+            )
+            for doc, email_id in zip(docs, padded_ids)
+        ], ordered=False)
+        self.sent += len(docs)
+        logger.info(f"Email outbox sent {len(docs)} message(s)")
+
+    async def _mark_failed(self, doc: dict, error: str, final: bool = False) -> None:
+        attempts = doc.get("attempts", 1)
+        if final or attempts >= self.max_attempts:
+            update = {"status": "failed", "last_error": error, "failed_at": _now().isoformat()}
+            self.failed += 1
+            logger.error(f"Email {doc['outbox_id']} to {doc['to']} failed permanently: {error}")
+        else:
+            backoff = self.base_backoff_seconds * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            update = {
+                "status": "pending",
+                "last_error": error,
+                "next_attempt_at": (_now() + timedelta(seconds=backoff)).isoformat()
+            }
+            self.retried += 1
+            logger.warning(f"Email {doc['outbox_id']} attempt {attempts} failed, retrying in {backoff:.0f}s: {error}")
+
+        await self.db.email_outbox.update_one(
+            {"outbox_id": doc["outbox_id"]},
+            {"$set": update, "$unset": {"claim_id": "", "lease_expires_at": ""}}
+        )
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "concurrency": self.concurrency,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
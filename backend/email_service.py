@@ -1,8 +1,13 @@
 import os
 import asyncio
 import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
 import resend
 from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 
 load_dotenv()
 
@@ -12,76 +17,55 @@ SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_DIR = Path(__file__).parent / "templates" / "email"
+
+# Templates are compiled once on first use and kept by the environment
+_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    cache_size=-1
+)
+
+KNOWN_ROLES = ("ngo", "donor", "volunteer", "admin")
+
+# Role fragments never change, so render them once at import
+ROLE_CONTENT = {
+    role: Markup(_env.get_template("role_content.html").render(role=role))
+    for role in KNOWN_ROLES
+}
+
+RENDER_CACHE_SIZE = int(os.environ.get('EMAIL_RENDER_CACHE_SIZE', '1024'))
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_cached(template_name: str, params: tuple) -> str:
+    return _env.get_template(template_name).render(**dict(params))
+
+
+def render_template(template_name: str, **params) -> str:
+    """
+    Render an email template. Output depends only on the template and its
+    parameters, so repeated sends with the same parameters are served from
+    an LRU cache instead of being rendered again.
+    """
+    try:
+        return _render_cached(template_name, tuple(sorted(params.items())))
+    except TypeError:
+        # Unhashable parameters can't be cached
+        return _env.get_template(template_name).render(**params)
+
+
+def render_welcome_email(user_name: str, role: str) -> Tuple[str, str]:
+    """Render (subject, html) for the welcome email"""
+    subject = f"Welcome to SmartPlate, {user_name}!"
+    html_content = render_template("welcome.html", user_name=user_name, role=role)
+    return subject, html_content
+
+
 async def send_welcome_email(recipient_email: str, user_name: str, role: str):
     """Send welcome email to newly registered user"""
-    
-    subject = f"Welcome to SmartPlate, {user_name}!"
-    
-    # HTML email template with inline CSS
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: Arial, sans-serif; background-color: #F9F7F2;">
-        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #F9F7F2; padding: 40px 20px;">
-            <tr>
-                <td align="center">
-                    <table width="600" cellpadding="0" cellspacing="0" style="background-color: #FFFFFF; border-radius: 16px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-                        <!-- Header -->
-                        <tr>
-                            <td style="background: linear-gradient(135deg, #1A4D2E 0%, #0f3019 100%); padding: 40px; text-align: center; border-radius: 16px 16px 0 0;">
-                                <h1 style="color: #FFFFFF; margin: 0; font-size: 32px; font-weight: bold;">SmartPlate</h1>
-                                <p style="color: #FFFFFF; margin: 10px 0 0 0; font-size: 16px; opacity: 0.9;">Reducing Hunger Through Food Redistribution</p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Content -->
-                        <tr>
-                            <td style="padding: 40px;">
-                                <h2 style="color: #1F2937; margin: 0 0 20px 0; font-size: 24px;">Welcome, {user_name}! 🎉</h2>
-                                
-                                <p style="color: #4B5563; font-size: 16px; line-height: 1.6; margin: 0 0 20px 0;">
-                                    Thank you for joining SmartPlate as a <strong>{role.upper()}</strong>. Together, we're working towards achieving SDG-2: Zero Hunger.
-                                </p>
-                                
-                                <div style="background-color: #F9F7F2; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                                    <h3 style="color: #1A4D2E; margin: 0 0 15px 0; font-size: 18px;">What's Next?</h3>
-                                    {get_role_specific_content(role)}
-                                </div>
-                                
-                                <div style="background-color: #E8F5E9; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                                    <p style="color: #2E7D32; margin: 0; font-size: 14px;">
-                                        <strong>💡 Did you know?</strong> Every meal delivered through SmartPlate prevents food waste and helps someone in need.
-                                    </p>
-                                </div>
-                                
-                                <p style="color: #4B5563; font-size: 16px; line-height: 1.6; margin: 20px 0 0 0;">
-                                    If you have any questions, feel free to reach out to our support team.
-                                </p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Footer -->
-                        <tr>
-                            <td style="background-color: #F9F7F2; padding: 30px; text-align: center; border-radius: 0 0 16px 16px;">
-                                <p style="color: #9CA3AF; font-size: 14px; margin: 0 0 10px 0;">
-                                    SmartPlate - Fighting Hunger, One Meal at a Time
-                                </p>
-                                <p style="color: #9CA3AF; font-size: 12px; margin: 0;">
-                                    Aligned with UN SDG-2 (Zero Hunger) & SDG-12 (Responsible Consumption)
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    subject, html_content = render_welcome_email(user_name, role)
     
     params = {
         "from": SENDER_EMAIL,
@@ -100,96 +84,32 @@ async def send_welcome_email(recipient_email: str, user_name: str, role: str):
         return {"status": "error", "error": str(e)}
 
 
-def get_role_specific_content(role: str) -> str:
-    """Get role-specific content for welcome email"""
-    
-    if role == "ngo":
-        return """
-        <ul style="color: #4B5563; margin: 0; padding-left: 20px; line-height: 1.8;">
-            <li>Your account needs verification by our admin team</li>
-            <li>Once verified, you can create food requests</li>
-            <li>Track all your requests in the dashboard</li>
-            <li>Get real-time updates when donors respond</li>
-        </ul>
-        """
-    elif role == "donor":
-        return """
-        <ul style="color: #4B5563; margin: 0; padding-left: 20px; line-height: 1.8;">
-            <li>Browse food requests from verified NGOs</li>
-            <li>Accept requests and upload food proof photos</li>
-            <li>Choose to deliver yourself or request a volunteer</li>
-            <li>Make an impact in your local community</li>
-        </ul>
-        """
-    elif role == "volunteer":
-        return """
-        <ul style="color: #4B5563; margin: 0; padding-left: 20px; line-height: 1.8;">
-            <li>Upload your ID proof for verification</li>
-            <li>Once approved, you can accept delivery tasks</li>
-            <li>Earn reliability scores with each delivery</li>
-            <li>Help connect donors and NGOs efficiently</li>
-        </ul>
-        """
-    elif role == "admin":
-        return """
-        <ul style="color: #4B5563; margin: 0; padding-left: 20px; line-height: 1.8;">
-            <li>Access the admin dashboard</li>
-            <li>Verify NGOs and volunteers</li>
-            <li>Monitor system analytics</li>
-            <li>Manage user accounts and reports</li>
-        </ul>
-        """
-    else:
-        return """
-        <ul style="color: #4B5563; margin: 0; padding-left: 20px; line-height: 1.8;">
-            <li>Explore your dashboard</li>
-            <li>Complete your profile</li>
-            <li>Start making a difference today!</li>
-        </ul>
-        """
+def get_role_specific_content(role: str) -> Markup:
+    """Get role-specific content for welcome email (pre-rendered per role)"""
+    content = ROLE_CONTENT.get(role)
+    if content is None:
+        content = Markup(_env.get_template("role_content.html").render(role=role))
+    return content
+
+
+_env.globals["role_content"] = get_role_specific_content
+
+
+def render_verification_approved_email(user_name: str, role: str) -> Tuple[str, str]:
+    """Render (subject, html) for the verification approved email"""
+    subject = "Your SmartPlate Account Has Been Verified! 🎉"
+    html_content = render_template("verification_approved.html", user_name=user_name, role=role)
+    return subject, html_content
+
+
+def render_volunteer_verification_approved_email(user_name: str) -> Tuple[str, str]:
+    """Render (subject, html) for the volunteer ID verification email"""
+    return render_verification_approved_email(user_name, "volunteer")
 
 
 async def send_verification_approved_email(recipient_email: str, user_name: str, role: str):
     """Send email when NGO or Volunteer is verified"""
-    
-    subject = "Your SmartPlate Account Has Been Verified! 🎉"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <body style="margin: 0; padding: 0; font-family: Arial, sans-serif; background-color: #F9F7F2;">
-        <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #F9F7F2; padding: 40px 20px;">
-            <tr>
-                <td align="center">
-                    <table width="600" cellpadding="0" cellspacing="0" style="background-color: #FFFFFF; border-radius: 16px;">
-                        <tr>
-                            <td style="background: linear-gradient(135deg, #1A4D2E 0%, #0f3019 100%); padding: 40px; text-align: center; border-radius: 16px 16px 0 0;">
-                                <h1 style="color: #FFFFFF; margin: 0; font-size: 32px;">✅ Verification Complete!</h1>
-                            </td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 40px;">
-                                <h2 style="color: #1F2937; margin: 0 0 20px 0;">Great News, {user_name}!</h2>
-                                <p style="color: #4B5563; font-size: 16px; line-height: 1.6;">
-                                    Your {role.upper()} account has been verified by our admin team. You now have full access to SmartPlate!
-                                </p>
-                                <div style="background-color: #E8F5E9; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
-                                    <p style="color: #2E7D32; margin: 0; font-size: 18px; font-weight: bold;">
-                                        🚀 You're all set to start making an impact!
-                                    </p>
-                                </div>
-                                <p style="color: #4B5563; font-size: 16px; line-height: 1.6;">
-                                    Log in to your dashboard and start contributing to zero hunger today.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    subject, html_content = render_verification_approved_email(user_name, role)
     
     params = {
         "from": SENDER_EMAIL,
@@ -205,3 +125,68 @@ async def send_verification_approved_email(recipient_email: str, user_name: str,
     except Exception as e:
         logger.error(f"Failed to send verification email: {str(e)}")
         return {"status": "error", "error": str(e)}
+
+
+async def send_volunteer_verification_approved_email(recipient_email: str, user_name: str):
+    """Send email when a volunteer's ID proof is verified"""
+    return await send_verification_approved_email(recipient_email, user_name, "volunteer")
+
+
+# Renderers addressable by name, used by the email outbox
+EMAIL_RENDERERS = {
+    "welcome": render_welcome_email,
+    "verification_approved": render_verification_approved_email,
+    "volunteer_verification_approved": render_volunteer_verification_approved_email,
+}
+
+
+def render_email(kind: str, params: dict) -> Tuple[str, str]:
+    """Render (subject, html) for a named email kind"""
+    renderer = EMAIL_RENDERERS.get(kind)
+    if renderer is None:
+        raise ValueError(f"Unknown email kind: {kind}")
+    return renderer(**params)
+
+
+# Transports: how rendered messages leave the process
+class ResendTransport:
+    """Delivers through the Resend API, batching up to 100 messages per call"""
+    
+    max_batch_size = 100
+    
+    async def send(self, message: dict) -> str:
+        email = await asyncio.to_thread(resend.Emails.send, message)
+        return email.get("id")
+    
+    async def send_batch(self, messages: List[dict]) -> List[str]:
+        response = await asyncio.to_thread(resend.Batch.send, messages)
+        return [item.get("id") for item in response.get("data", [])]
+
+
+class FakeTransport:
+    """In-memory sink for tests and benchmarks; records instead of sending"""
+    
+    max_batch_size = 100
+    
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.sent: List[dict] = []
+    
+    async def send(self, message: dict) -> str:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        self.sent.append(message)
+        return f"fake-{len(self.sent)}"
+    
+    async def send_batch(self, messages: List[dict]) -> List[str]:
+        return [await self.send(message) for message in messages]
+
+
+def get_email_transport():
+    """Pick the transport from EMAIL_TRANSPORT (resend or fake)"""
+    transport = os.environ.get('EMAIL_TRANSPORT', 'resend').lower()
+    if transport == "fake":
+        return FakeTransport()
+    if transport == "resend":
+        return ResendTransport()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {transport}")
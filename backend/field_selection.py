@@ -0,0 +1,35 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def parse_fields(fields: str, allowed: Iterable[str]) -> List[str]:
+    """
+    Field names from a comma-separated fields= parameter, in order, without
+    duplicates.
+
+    Raises:
+        ValueError: empty selection or unknown names
+    """
+    allowed = set(allowed)
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not selected:
+        raise ValueError("fields must name at least one field")
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return selected
+
+
+def projection_for(fields: Iterable[str], derived: Optional[Dict[str, Tuple[str, ...]]] = None,
+                   keep: Iterable[str] = ()) -> dict:
+    """
+    Inclusion projection fetching only what fields need. derived maps
+    response fields computed from stored ones (e.g. a URL built from an id)
+    to those stored fields; keep adds fields the caller needs itself, such
+    as pagination sort keys.
+    """
+    derived = derived or {}
+    projection = {"_id": 0}
+    for name in (*fields, *keep):
+        for source in derived.get(name, (name,)):
+            projection[source] = 1
+    return projection
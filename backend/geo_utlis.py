@@ -1,5 +1,10 @@
 import math
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence, Union
+
+import numpy as np
+
+# Mean Earth radius in kilometers
+EARTH_RADIUS_KM = 6371.0
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -16,7 +21,7 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
         Distance in kilometers
     """
     # Earth's radius in kilometers
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     
     # Convert latitude and longitude from degrees to radians
     lat1_rad = math.radians(lat1)
@@ -40,6 +45,154 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return round(distance, 2)
 
 
+def to_geojson_point(lat: Optional[float], lon: Optional[float]) -> Optional[dict]:
+    """
+    Build a GeoJSON point for MongoDB 2dsphere storage
+    
+    Note: GeoJSON orders coordinates as [longitude, latitude]
+    
+    Returns:
+        GeoJSON dict, or None if either coordinate is missing
+    """
+    if lat is None or lon is None:
+        return None
+    return {"type": "Point", "coordinates": [float(lon), float(lat)]}
+
+
+def km_to_radians(distance_km: float) -> float:
+    """Convert a distance in km to radians for $centerSphere queries"""
+    return distance_km / EARTH_RADIUS_KM
+
+
+Points = Union[np.ndarray, Sequence]
+
+
+def coords_to_arrays(points: Points, lat_key: str = 'latitude',
+                     lon_key: str = 'longitude') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalise a batch of points into latitude and longitude arrays
+    
+    Args:
+        points: An (n, 2) array of [lat, lon], a list of (lat, lon) pairs,
+                or a list of dicts holding lat_key/lon_key
+        lat_key: Key name for latitude when points are dicts
+        lon_key: Key name for longitude when points are dicts
+    
+    Returns:
+        (lats, lons) float64 arrays; missing coordinates become NaN
+    """
+    if isinstance(points, np.ndarray):
+        arr = points.astype(np.float64, copy=False).reshape(-1, 2)
+        return arr[:, 0], arr[:, 1]
+    
+    n = len(points)
+    lats = np.full(n, np.nan)
+    lons = np.full(n, np.nan)
+    for i, point in enumerate(points):
+        if isinstance(point, dict):
+            lat, lon = point.get(lat_key), point.get(lon_key)
+        else:
+            lat, lon = point
+        if lat is not None and lon is not None:
+            lats[i] = lat
+            lons[i] = lon
+    return lats, lons
+
+
+def haversine_vector(lat: float, lon: float, points: Points,
+                     lat_key: str = 'latitude', lon_key: str = 'longitude') -> np.ndarray:
+    """
+    Distances from one point to many (one-to-many)
+    
+    Returns:
+        Unrounded distances in km; NaN where a point has no coordinates
+    """
+    lats, lons = coords_to_arrays(points, lat_key, lon_key)
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - math.radians(lon)
+    
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(points_a: Points, points_b: Points,
+                     lat_key: str = 'latitude', lon_key: str = 'longitude') -> np.ndarray:
+    """
+    Pairwise distances between two batches of points (many-to-many)
+    
+    Returns:
+        (len(points_a), len(points_b)) array of unrounded distances in km
+    """
+    lats_a, lons_a = coords_to_arrays(points_a, lat_key, lon_key)
+    lats_b, lons_b = coords_to_arrays(points_b, lat_key, lon_key)
+    lat1 = np.radians(lats_a)[:, None]
+    lat2 = np.radians(lats_b)[None, :]
+    dlat = lat2 - lat1
+    dlon = np.radians(lons_b)[None, :] - np.radians(lons_a)[:, None]
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_pairs(points_a: Points, points_b: Points,
+                    lat_key: str = 'latitude', lon_key: str = 'longitude') -> np.ndarray:
+    """
+    Distances between matching positions of two equal-length batches (a[i] to b[i])
+    
+    Returns:
+        Array of unrounded distances in km
+    """
+    lats_a, lons_a = coords_to_arrays(points_a, lat_key, lon_key)
+    lats_b, lons_b = coords_to_arrays(points_b, lat_key, lon_key)
+    lat1, lat2 = np.radians(lats_a), np.radians(lats_b)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons_b) - np.radians(lons_a)
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_k(lat: float, lon: float, points: Points, k: int,
+              lat_key: str = 'latitude', lon_key: str = 'longitude') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the k points closest to a target, closest first
+    
+    Uses argpartition so only the k winners are sorted. Points without
+    coordinates are never returned.
+    
+    Returns:
+        (indices, distances_km) arrays of length <= k
+    """
+    distances = haversine_vector(lat, lon, points, lat_key, lon_key)
+    valid = np.flatnonzero(~np.isnan(distances))
+    k = min(k, valid.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    
+    valid_distances = distances[valid]
+    if k < valid.size:
+        part = np.argpartition(valid_distances, k - 1)[:k]
+    else:
+        part = np.arange(valid.size)
+    order = part[np.argsort(valid_distances[part], kind='stable')]
+    return valid[order], valid_distances[order]
+
+
+def filter_within_radius(lat: float, lon: float, points: Points, radius_km: float,
+                         lat_key: str = 'latitude', lon_key: str = 'longitude') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of points within radius_km of a target, in input order
+    
+    Returns:
+        (indices, distances_km) arrays
+    """
+    distances = haversine_vector(lat, lon, points, lat_key, lon_key)
+    indices = np.flatnonzero(distances <= radius_km)
+    return indices, distances[indices]
+
+
 def get_distance_display(distance_km: float) -> str:
     """
     Convert distance to human-readable format
@@ -91,16 +244,12 @@ def sort_by_distance(items: list, target_lat: float, target_lon: float,
     Returns:
         Sorted list (closest first)
     """
-    def get_distance(item):
-        item_lat = item.get(lat_key)
-        item_lon = item.get(lon_key)
-        
-        if item_lat is None or item_lon is None:
-            return float('inf')  # Put items without location at the end
-        
-        return haversine_distance(target_lat, target_lon, item_lat, item_lon)
+    if not items:
+        return []
     
-    return sorted(items, key=get_distance)
+    distances = haversine_vector(target_lat, target_lon, items, lat_key, lon_key)
+    distances[np.isnan(distances)] = np.inf  # Put items without location at the end
+    return [items[i] for i in np.argsort(distances, kind='stable')]
 
 
 def is_within_radius(lat1: float, lon1: float, lat2: float, lon2: float, 
@@ -131,8 +280,9 @@ def find_nearest_item(items: list, target_lat: float, target_lon: float,
     if not items:
         return None
     
-    sorted_items = sort_by_distance(items, target_lat, target_lon, lat_key, lon_key)
-    return sorted_items[0] if sorted_items else None
+    indices, _ = nearest_k(target_lat, target_lon, items, 1, lat_key, lon_key)
+    # Items without location only win when nothing else is available
+    return items[indices[0]] if indices.size else items[0]
 
 
 # Example usage and test
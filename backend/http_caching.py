@@ -0,0 +1,84 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range starts past the end of the file"""
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def quote_etag(value: str) -> str:
+    return f'"{value}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison: weak, so W/"x" matches "x"; * matches anything"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _not_after(header: Optional[str], timestamp: float) -> bool:
+    """True if timestamp (to the second) is no later than the HTTP date in header"""
+    if not header:
+        return False
+    try:
+        return int(timestamp) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: float) -> bool:
+    """Whether a GET can be answered with 304. If-None-Match wins over If-Modified-Since."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    return _not_after(headers.get("if-modified-since"), last_modified)
+
+
+def parse_range(headers: Mapping[str, str], size: int, etag: str,
+                last_modified: float) -> Optional[Tuple[int, int]]:
+    """
+    The single byte range to serve, as inclusive (start, end).
+
+    None means serve the whole file: no Range header, one we don't
+    understand, several ranges, or an If-Range that no longer matches.
+
+    Raises:
+        RangeNotSatisfiable: the range starts at or past the end of the file
+    """
+    header = headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    if_range = headers.get("if-range")
+    if if_range is not None:
+        if if_range.startswith(('"', 'W/')):
+            # Ranges need a strong validator
+            if if_range != etag:
+                return None
+        elif if_range != http_date(last_modified):
+            return None
+
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if end is not None and start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, size - 1 if end is None else min(end, size - 1)
@@ -0,0 +1,37 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+def lease_holder_id() -> str:
+    """Identifies this worker process in the job_leases collection"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire_lease(db, name: str, holder: str, ttl_seconds: float) -> bool:
+    """
+    Take or renew the lease on a singleton background job.
+
+    The lease is granted if nobody holds it, it has expired, or holder
+    already has it; the expiry is pushed out by ttl_seconds. A worker that
+    dies simply stops renewing and another takes over after ttl_seconds.
+
+    Returns:
+        True if holder now owns the lease
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        lease = await db.job_leases.find_one_and_update(
+            {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lte": now.isoformat()}}]},
+            {"$set": {"holder": holder, "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The filter missed because another worker holds a live lease, and the upsert hit its _id
+        return False
+    return lease is not None and lease.get("holder") == holder
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from request_transitions import TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+# Pending requests are visible to every donor, so feed changes go to a role topic
+DONOR_FEED_TOPIC = "role:donor"
+PARTY_FIELDS = ("ngo_id", "donor_id", "volunteer_id", "co_volunteer_id")
+# Updates touching only these are bookkeeping (e.g. the urgency rescoring job)
+# and would otherwise fan out to every connected donor
+IGNORED_UPDATE_FIELDS = ("urgency_score", "version")
+
+
+def request_topics(doc: dict, statuses: Iterable[Optional[str]] = ()) -> Set[str]:
+    """Users party to a request, plus the donor feed while it is (or was) pending"""
+    topics = {doc[field] for field in PARTY_FIELDS if doc.get(field)}
+    if "pending" in statuses:
+        topics.add(DONOR_FEED_TOPIC)
+    return topics
+
+
+def request_event(event_type: str, request_id: str, changes: dict,
+                  previous_status: Optional[str] = None) -> dict:
+    """A delta clients can merge into the request they already hold"""
+    event = {"type": event_type, "request_id": request_id, "changes": changes}
+    if previous_status is not None:
+        event["previous_status"] = previous_status
+    return event
+
+
+class LiveUpdateHub:
+    """
+    In-process pub/sub keyed by topic (a user_id or a role topic).
+
+    Each subscriber gets its own bounded queue. A subscriber that falls too
+    far behind has its backlog replaced by a single resync event telling the
+    client to refetch, so one slow connection never holds up publishers.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self, topics: Iterable[str]) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, topics: Iterable[str], queue: asyncio.Queue) -> None:
+        for topic in topics:
+            queues = self._subscribers.get(topic)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[topic]
+
+    def publish(self, topics: Iterable[str], event: dict, exclude: Iterable[str] = ()) -> None:
+        """Queue event for subscribers of topics, skipping anyone subscribed to an exclude topic"""
+        # A user subscribed through several topics still gets one copy
+        targets = set()
+        for topic in topics:
+            targets.update(self._subscribers.get(topic, ()))
+        for topic in exclude:
+            targets.difference_update(self._subscribers.get(topic, ()))
+        for queue in targets:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+                self.resyncs += 1
+        self.published += 1
+
+    def resync_all(self) -> None:
+        """Tell every subscriber to refetch, e.g. after events may have been missed"""
+        self.publish(list(self._subscribers), {"type": "resync"})
+
+    def stats(self) -> dict:
+        queues = set()
+        for subscribers in self._subscribers.values():
+            queues.update(subscribers)
+        return {"topics": len(self._subscribers), "connections": len(queues),
+                "published": self.published, "resyncs": self.resyncs}
+
+
+def change_stream_pipeline(ignored_fields: Iterable[str] = IGNORED_UPDATE_FIELDS) -> list:
+    """
+    Inserts, replaces, and updates that change something besides
+    ignored_fields. Filtering server-side keeps bookkeeping writes off the
+    wire and out of the publisher entirely.
+    """
+    relevant_updates = {"$filter": {
+        "input": {"$objectToArray": "$updateDescription.updatedFields"},
+        "as": "field",
+        "cond": {"$not": [{"$in": ["$$field.k", list(ignored_fields)]}]}
+    }}
+    return [{"$match": {"$or": [
+        {"operationType": {"$in": ["insert", "replace"]}},
+        {"operationType": "update", "$expr": {"$or": [
+            {"$gt": [{"$size": relevant_updates}, 0]},
+            {"$gt": [{"$size": {"$ifNull": ["$updateDescription.removedFields", []]}}, 0]}
+        ]}}
+    ]}}]
+
+
+def publish_request_update(hub: LiveUpdateHub, doc: dict, changes: dict, left_pending: bool,
+                           event_type: str = "request.updated",
+                           previous_status: Optional[str] = None) -> None:
+    """
+    Fan out a change to the request doc (its state after the change).
+
+    Parties get the full delta. The donor feed sees pending requests in
+    full, but once a request leaves pending it only learns the new status,
+    so assignment details (who accepted, volunteers, pickup) stay with the
+    parties.
+    """
+    parties = request_topics(doc)
+    event = request_event(event_type, doc["request_id"], changes, previous_status)
+    if doc.get("status") == "pending":
+        hub.publish(parties | {DONOR_FEED_TOPIC}, event)
+        return
+    hub.publish(parties, event)
+    if left_pending:
+        left_feed = request_event("request.updated", doc["request_id"], {"status": doc.get("status")},
+                                  previous_status)
+        hub.publish({DONOR_FEED_TOPIC}, left_feed, exclude=parties)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str, separators=(',', ':'))}\n\n"
+
+
+async def sse_events(hub: LiveUpdateHub, topics: Set[str],
+                     is_disconnected: Callable[[], Awaitable[bool]],
+                     keepalive_seconds: float = 15.0) -> AsyncIterator[str]:
+    """Server-sent event stream for one connection; unsubscribes when it ends"""
+    queue = hub.subscribe(topics)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                # Comment lines keep proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(topics, queue)
+
+
+async def watch_food_requests(db, hub: LiveUpdateHub, retry_delay: float = 5.0) -> None:
+    """
+    Publish food request changes from a MongoDB change stream, so every
+    worker sees writes made by the others. Requires a replica set; runs
+    until cancelled.
+    """
+    pipeline = change_stream_pipeline()
+    resume_token = None
+    while True:
+        progressed = False
+        try:
+            async with db.food_requests.watch(pipeline, full_document="updateLookup",
+                                              resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    progressed = True
+                    doc = change.get("fullDocument")
+                    if not doc:
+                        continue
+                    doc.pop("_id", None)
+                    if change["operationType"] == "update":
+                        changes = dict(change["updateDescription"]["updatedFields"])
+                        changes.pop("_id", None)
+                        event_type = "request.updated"
+                    else:
+                        changes = doc
+                        event_type = "request.created" if change["operationType"] == "insert" else "request.updated"
+                    # The previous status is not in the event; a request that
+                    # just left pending still has to drop out of donor feeds
+                    left_pending = "status" in changes and doc.get("status") in TRANSITIONS["pending"]
+                    publish_request_update(hub, doc, changes, left_pending, event_type)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Food request change stream failed: {str(e)}")
+            await asyncio.sleep(retry_delay)
+            # A stream that fails before delivering anything could not resume
+            # (e.g. the token fell out of the oplog) and would fail the same
+            # way forever: start a fresh stream and have clients refetch
+            if resume_token is not None and not progressed:
+                resume_token = None
+                hub.resync_all()
@@ -0,0 +1,74 @@
+import base64
+import json
+from typing import List, Optional, Tuple
+
+# Sort specs are lists of (field, direction) ending in a unique tie-breaker
+SortSpec = List[Tuple[str, int]]
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque, URL-safe cursor from the sort key values of the last item"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> list:
+    """Inverse of encode_cursor; raises ValueError for anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: SortSpec, values: list) -> dict:
+    """
+    Filter matching everything strictly after the given key values.
+
+    For sort [(a, -1), (b, -1)] and values [va, vb] this builds
+    {"$or": [{a: {"$lt": va}}, {a: va, b: {"$lt": vb}}]}.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def clamp_page_size(limit: Optional[int], default: int, maximum: int) -> int:
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
+
+
+async def paginate(collection, query: dict, sort: SortSpec, projection: dict,
+                   limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of a keyset-paginated query.
+
+    Args:
+        collection: Motor collection
+        query: Base filter
+        sort: Sort spec; the last field must be unique (e.g. request_id)
+        projection: Projection; must not exclude any sort field
+        limit: Page size
+        cursor: next_cursor from the previous page, if any
+
+    Returns:
+        (items, next_cursor) where next_cursor is None on the last page
+    """
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor, len(sort)))
+        query = {"$and": [query, after]} if query else after
+
+    items = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([items[-1].get(field) for field, _ in sort])
+    return items, next_cursor
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Never go below the cost existing hashes were created with, however slow the host is
+MIN_BCRYPT_ROUNDS = 12
+MAX_BCRYPT_ROUNDS = 16
+
+# Where the deployment-wide calibrated cost is kept
+BCRYPT_SETTINGS_ID = "bcrypt_rounds"
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued"""
+
+
+def get_bcrypt_rounds(hashed_password: str) -> Optional[int]:
+    """Read the cost factor from a modular-crypt bcrypt hash ($2b$12$...)"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop in a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so a thread pool gives real
+    parallelism without the pickling overhead of a process pool. At most
+    queue_limit jobs may be in flight; beyond that PasswordHasherBusy is
+    raised so callers can shed load instead of piling up latency.
+    """
+
+    def __init__(self, max_workers: int = 2, queue_limit: int = 64, rounds: int = 12):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self.set_rounds(rounds)
+
+    def set_rounds(self, rounds: int) -> None:
+        if rounds < MIN_BCRYPT_ROUNDS:
+            logger.warning(f"bcrypt cost {rounds} is below the floor, using {MIN_BCRYPT_ROUNDS}")
+            rounds = MIN_BCRYPT_ROUNDS
+        self.rounds = rounds
+        self._context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+    def calibrate(self, target_ms: float, min_rounds: int = MIN_BCRYPT_ROUNDS,
+                  max_rounds: int = MAX_BCRYPT_ROUNDS) -> int:
+        """
+        Pick the highest bcrypt cost whose hash time stays within target_ms.
+        Blocking; run it in an executor. Each extra round doubles the cost,
+        so one timing at min_rounds is enough to extrapolate.
+        """
+        probe = CryptContext(schemes=["bcrypt"], bcrypt__rounds=min_rounds)
+        start = time.perf_counter()
+        probe.hash("calibration-probe")
+        base_ms = (time.perf_counter() - start) * 1000
+
+        rounds = min_rounds
+        while rounds < max_rounds and base_ms * (2 ** (rounds + 1 - min_rounds)) <= target_ms:
+            rounds += 1
+
+        self.set_rounds(rounds)
+        logger.info(f"bcrypt calibrated to {rounds} rounds "
+                    f"({base_ms:.1f} ms at {min_rounds} rounds, target {target_ms:.0f} ms)")
+        return rounds
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.queue_limit:
+            raise PasswordHasherBusy("Password hashing queue is full")
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self._context.verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Only ever upgrade: a hash stronger than the current cost is kept"""
+        rounds = get_bcrypt_rounds(hashed_password)
+        return rounds is None or rounds < self.rounds
+
+    async def verify_and_rehash(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if its cost is below the current one, return
+        a fresh hash to store.
+
+        Returns:
+            (is_valid, new_hash or None)
+        """
+        if not await self.verify(password, hashed_password):
+            return False, None
+        if self.needs_rehash(hashed_password):
+            return True, await self.hash(password)
+        return True, None
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+async def load_or_calibrate_rounds(db, hasher: PasswordHasher, target_ms: float) -> int:
+    """
+    Give every worker the same bcrypt cost. The first worker to start
+    calibrates and stores the result in app_settings; the rest (and later
+    restarts) reuse it, so hashes are never rehashed back and forth between
+    workers that timed a little differently.
+    """
+    stored = await db.app_settings.find_one({"_id": BCRYPT_SETTINGS_ID})
+    if stored is None:
+        loop = asyncio.get_running_loop()
+        rounds = await loop.run_in_executor(None, hasher.calibrate, target_ms)
+        # Racing workers: whichever insert lands first wins, the others adopt it
+        await db.app_settings.update_one(
+            {"_id": BCRYPT_SETTINGS_ID},
+            {"$setOnInsert": {"rounds": rounds}},
+            upsert=True
+        )
+        stored = await db.app_settings.find_one({"_id": BCRYPT_SETTINGS_ID})
+    hasher.set_rounds(int(stored["rounds"]))
+    return hasher.rounds
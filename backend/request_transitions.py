@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import ReturnDocument
+
+# Food request lifecycle, in order
+REQUEST_STATUSES = ["pending", "accepted_by_donor", "assigned_to_volunteer", "picked_up", "in_transit", "delivered", "completed"]
+
+# Legal moves from each status. Assignment may happen in the same write as
+# the donor accepting, or later once a volunteer becomes available.
+TRANSITIONS: Dict[str, tuple] = {
+    "pending": ("accepted_by_donor", "assigned_to_volunteer"),
+    "accepted_by_donor": ("assigned_to_volunteer",),
+    "assigned_to_volunteer": ("picked_up",),
+    "picked_up": ("in_transit", "delivered"),
+    "in_transit": ("delivered",),
+    "delivered": ("completed",),
+    "completed": (),
+}
+
+# Timestamp recorded alongside each status
+STATUS_TIMESTAMPS = {
+    "accepted_by_donor": "accepted_at",
+    "assigned_to_volunteer": "assigned_at",
+    "picked_up": "picked_up_at",
+    "in_transit": "in_transit_at",
+    "delivered": "delivered_at",
+    "completed": "completed_at",
+}
+
+
+class TransitionError(Exception):
+    """Base class for rejected status transitions; status_code maps to HTTP"""
+    status_code = 400
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class IllegalTransition(TransitionError):
+    """The requested status cannot follow the current one"""
+    status_code = 400
+
+
+class TransitionConflict(TransitionError):
+    """The request changed between being read and being written"""
+    status_code = 409
+
+
+class RequestNotFound(TransitionError):
+    status_code = 404
+
+
+def can_transition(from_status: Optional[str], to_status: str) -> bool:
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def sources_for(to_status: str) -> list:
+    """Every status that may move to to_status"""
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+async def transition_request(db, request_id: str, to_status: str, fields: Optional[dict] = None,
+                             from_statuses: Optional[Iterable[str]] = None,
+                             expected_version: Optional[int] = None,
+                             match: Optional[dict] = None) -> dict:
+    """
+    Move a food request to to_status in a single conditional write.
+
+    The write only matches while the request is in a status allowed to move
+    to to_status (optionally narrowed by from_statuses), at expected_version
+    when given, and satisfying any extra match conditions (e.g. the caller
+    being the assigned volunteer). fields are set in the same write, and
+    version is incremented so readers can detect intervening changes.
+
+    Returns:
+        The request as it was before the write
+
+    Raises:
+        IllegalTransition, TransitionConflict or RequestNotFound
+    """
+    if to_status not in TRANSITIONS:
+        raise IllegalTransition(f"Unknown status '{to_status}'")
+    allowed = sources_for(to_status)
+    if from_statuses is not None:
+        allowed = [status for status in allowed if status in set(from_statuses)]
+
+    query = {"request_id": request_id, "status": {"$in": allowed}, **(match or {})}
+    if expected_version is not None:
+        # Documents written before versioning have no field and count as version 0
+        query["version"] = expected_version if expected_version else {"$in": [0, None]}
+
+    update_fields = {"status": to_status, **(fields or {})}
+    timestamp_field = STATUS_TIMESTAMPS.get(to_status)
+    if timestamp_field and timestamp_field not in update_fields:
+        update_fields[timestamp_field] = datetime.now(timezone.utc).isoformat()
+
+    previous = await db.food_requests.find_one_and_update(
+        query,
+        {"$set": update_fields, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous is not None:
+        return previous
+
+    # Only the failure path pays for a second read, to say why
+    current = await db.food_requests.find_one({"request_id": request_id, **(match or {})}, {"_id": 0, "status": 1})
+    if current is None:
+        raise RequestNotFound("Request not found")
+    if current.get("status") in allowed or expected_version is not None:
+        # The caller saw a legal state, but it changed before the write landed
+        raise TransitionConflict("Request was updated by someone else, please retry")
+    raise IllegalTransition(f"Cannot move request from '{current.get('status')}' to '{to_status}'")
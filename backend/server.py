@@ -1,20 +1,20 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, validator
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, computed_field, validator
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
-from passlib.context import CryptContext
 import math
-import aiofiles
 import base64
 import asyncio
 import re
@@ -27,9 +27,35 @@ except ImportError:
     print("Warning: emergentintegrations not available. Google OAuth will be disabled.")
 
 # Import our utility modules
-from email_service import send_welcome_email, send_verification_approved_email, send_volunteer_verification_approved_email
-from validation import validate_phone, validate_email, validate_location, validate_latitude, validate_longitude, validate_password_strength
-from geo_utils import haversine_distance, sort_by_distance, get_distance_display
+from email_service import get_email_transport
+from email_outbox import EmailDispatcher, enqueue_email
+from validation import CONTENT_TYPES, SNIFF_BYTES, sniff_file_type, validate_phone, validate_email, validate_location, validate_latitude, validate_longitude, validate_password_strength
+from geo_utlis import haversine_distance, sort_by_distance, get_distance_display, to_geojson_point, km_to_radians
+from volunteer_roster import VolunteerRoster
+from user_cache import UserCache
+from password_hashing import PasswordHasher, PasswordHasherBusy, load_or_calibrate_rounds
+from audit_buffer import AuditBuffer
+from analytics_counters import (
+    read_counters, counters_to_dashboard, reconcile_counters, run_reconciliation_job, run_seed_job,
+    record_request_created, record_status_transition, record_user_registered
+)
+from request_transitions import REQUEST_STATUSES, TransitionError, can_transition, transition_request
+from batch_assignment import (
+    DEFAULT_CAPACITY, TRANSPORT_CAPACITY, capacity_score, extra_volunteer_reason,
+    run_batch_assignment, run_batch_assignment_job
+)
+from upload_pipeline import UploadRejected, stream_upload_to_disk
+from delivery_photos import PHOTO_CONTENT_TYPE, decode_photo, release_delivery_photo, store_delivery_photo
+from blob_store import blob_url, get_blob_store, put_blob, read_file, release_blob
+from http_caching import RangeNotSatisfiable, http_date, is_not_modified, parse_range, quote_etag
+from thumbnails import THUMBNAIL_CONTENT_TYPE, THUMBNAIL_ERRORS, THUMBNAIL_SOURCE_TYPES, ThumbnailCache
+from live_updates import DONOR_FEED_TOPIC, LiveUpdateHub, publish_request_update, request_event, sse_events, watch_food_requests
+from urgency_scheduler import parse_required_datetime, urgency_formula, recompute_urgency, run_urgency_job
+from db_indexes import ensure_indexes, check_indexes
+from pagination import clamp_page_size, paginate
+from field_selection import parse_fields, projection_for
+from data_export import EXPORT_FORMATS, USER_EXPORT_FIELDS, AUDIT_LOG_EXPORT_FIELDS, time_range_filter, stream_export
+from daily_stats import GRANULARITIES, record_completion, backfill_daily_stats, read_trends
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -53,14 +79,143 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'smartplate-secret-key-change-in-p
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Volunteer matching: only the nearest candidates within this radius are scored
+VOLUNTEER_SEARCH_RADIUS_KM = float(os.environ.get('VOLUNTEER_SEARCH_RADIUS_KM', '50'))
+VOLUNTEER_CANDIDATE_LIMIT = int(os.environ.get('VOLUNTEER_CANDIDATE_LIMIT', '25'))
+
+# Each worker keeps its own roster and only patches it for writes it serves itself.
+# REQUIRED when running more than one worker (needs a replica set): without it
+# workers match against stale rosters. Off by default for single-process dev setups.
+VOLUNTEER_ROSTER_CHANGE_STREAM = os.environ.get('VOLUNTEER_ROSTER_CHANGE_STREAM', 'false').lower() == 'true'
+# Worker count as exported by gunicorn/uvicorn deployments
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+volunteer_roster = VolunteerRoster()
+
+user_cache = UserCache(
+    max_size=int(os.environ.get('USER_CACHE_MAX_SIZE', '10000')),
+    ttl_seconds=float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+)
+
+# Upper bound for radius-based 2dsphere queries
+MAX_NEARBY_RADIUS_KM = 200.0
+
+# How often the analytics counters are checked against the source collections (0 disables)
+ANALYTICS_RECONCILE_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_RECONCILE_INTERVAL_SECONDS', '3600'))
+# The periodic check only reports drift unless this is set; repairs are explicit
+ANALYTICS_RECONCILE_APPLY = os.environ.get('ANALYTICS_RECONCILE_APPLY', 'false').lower() == 'true'
+
+# Server-sent request updates. With LIVE_UPDATES_CHANGE_STREAM=true (replica set
+# required) events come from a food_requests change stream, so every worker sees
+# every write; otherwise each worker publishes the transitions it performs itself.
+LIVE_UPDATES_CHANGE_STREAM = os.environ.get('LIVE_UPDATES_CHANGE_STREAM', 'false').lower() == 'true'
+LIVE_UPDATES_KEEPALIVE_SECONDS = float(os.environ.get('LIVE_UPDATES_KEEPALIVE_SECONDS', '15'))
+
+# ASSIGNMENT_MODE=greedy assigns a volunteer the moment a donor accepts;
+# ASSIGNMENT_MODE=batch leaves accepted requests for the batch optimizer.
+# The batch job also runs in greedy mode to pick up requests that found no one.
+ASSIGNMENT_MODE = os.environ.get('ASSIGNMENT_MODE', 'greedy').lower()
+BATCH_ASSIGNMENT_INTERVAL_SECONDS = float(os.environ.get('BATCH_ASSIGNMENT_INTERVAL_SECONDS', '60'))
+BATCH_ASSIGNMENT_OPTIONS = {
+    "radius_km": VOLUNTEER_SEARCH_RADIUS_KM,
+    "candidates_per_request": int(os.environ.get('BATCH_ASSIGNMENT_CANDIDATES', '50')),
+    "workload_penalty": float(os.environ.get('BATCH_ASSIGNMENT_WORKLOAD_PENALTY', '2.0')),
+    "max_active_tasks": int(os.environ.get('BATCH_ASSIGNMENT_MAX_ACTIVE_TASKS', '3')),
+}
+
+# Uploads are streamed to disk, capped at MAX_UPLOAD_MB and typed by content
+UPLOAD_ROOT = os.environ.get('UPLOAD_ROOT', '/app/uploads')
+MAX_UPLOAD_BYTES = int(float(os.environ.get('MAX_UPLOAD_MB', '20')) * 1024 * 1024)
+DOCUMENT_UPLOAD_TYPES = ["pdf", "jpg", "png"]
+# Uploaded files are kept once per distinct content (BLOB_BACKEND=local|s3)
+blob_store = get_blob_store(UPLOAD_ROOT)
+# Image ID proofs get a small JPEG preview, rendered once off the event loop
+thumbnail_cache = ThumbnailCache(
+    os.environ.get('THUMBNAIL_ROOT', os.path.join(UPLOAD_ROOT, "thumbnails")), blob_store,
+    max_workers=int(os.environ.get('THUMBNAIL_WORKERS', '2')),
+    max_size=int(os.environ.get('THUMBNAIL_MAX_SIZE', '320'))
+)
+# Served files are revalidated on every view; unchanged ones come back as 304
+FILE_CACHE_CONTROL = "private, no-cache"
+
+# Pending requests get their time-decaying urgency recomputed this often (0 disables);
+# only scores that move by at least URGENCY_CHANGE_THRESHOLD are written
+URGENCY_RECOMPUTE_INTERVAL_SECONDS = float(os.environ.get('URGENCY_RECOMPUTE_INTERVAL_SECONDS', '300'))
+URGENCY_CHANGE_THRESHOLD = float(os.environ.get('URGENCY_CHANGE_THRESHOLD', '0.05'))
+
+# List endpoints return one keyset page at a time; the next page's cursor
+# is sent in the X-Next-Cursor response header
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '1000'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+# The admin user list is read in one go by the dashboard, which does not
+# follow cursors, so it keeps the size it had before pagination
+ADMIN_USERS_PAGE_SIZE = int(os.environ.get('ADMIN_USERS_PAGE_SIZE', '10000'))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Base64 delivery photos left on requests from before the blob store are
+# never sent in lists (python delivery_photos.py --migrate moves them)
+FOOD_REQUEST_LIST_PROJECTION = {"_id": 0, "delivery_photo": 0}
+
+# Apply the db_indexes registry at startup (creation is idempotent)
+ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+
+# Documents fetched per round trip when streaming admin exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+# bcrypt runs in its own pool; BCRYPT_ROUNDS pins the cost, otherwise it is
+# calibrated once per deployment (stored in app_settings) to take roughly
+# BCRYPT_TARGET_MS per hash. Either way it never drops below 12.
+BCRYPT_ROUNDS = os.environ.get('BCRYPT_ROUNDS')
+BCRYPT_TARGET_MS = float(os.environ.get('BCRYPT_TARGET_MS', '250'))
+
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+    queue_limit=int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', '64')),
+    rounds=int(BCRYPT_ROUNDS or 12)
+)
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Emails are queued in email_outbox and sent by a background dispatcher
+EMAIL_DISPATCHER_ENABLED = os.environ.get('EMAIL_DISPATCHER_ENABLED', 'true').lower() == 'true'
+email_dispatcher = EmailDispatcher(
+    db,
+    get_email_transport(),
+    concurrency=int(os.environ.get('EMAIL_DISPATCH_CONCURRENCY', '4')),
+    max_attempts=int(os.environ.get('EMAIL_MAX_ATTEMPTS', '5'))
+)
+
+# Audit events are buffered and written in batches off the request path
+audit_buffer = AuditBuffer(
+    db.audit_logs,
+    max_queue=int(os.environ.get('AUDIT_BUFFER_SIZE', '10000')),
+    batch_size=int(os.environ.get('AUDIT_FLUSH_BATCH', '500')),
+    flush_interval=float(os.environ.get('AUDIT_FLUSH_INTERVAL_SECONDS', '1.0'))
+)
+
+live_updates = LiveUpdateHub(queue_size=int(os.environ.get('LIVE_UPDATES_QUEUE_SIZE', '100')))
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def publish_request_change(previous: dict, to_status: str, fields: dict) -> None:
+    """Push a status change to everyone party to the request"""
+    if LIVE_UPDATES_CHANGE_STREAM:
+        return
+    changes = {**fields, "status": to_status, "version": previous.get("version", 0) + 1}
+    publish_request_update(
+        live_updates, {**previous, **changes}, changes,
+        left_pending=previous.get("status") == "pending" and to_status != "pending",
+        previous_status=previous.get("status")
+    )
+
+def on_batch_assigned(previous: dict, fields: dict) -> None:
+    publish_request_change(previous, "assigned_to_volunteer", fields)
+
+async def queue_email(kind: str, recipient_email: str, params: dict):
+    await enqueue_email(db, kind, recipient_email, params)
+    email_dispatcher.wake()
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -70,19 +225,24 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await user_from_token(credentials.credentials)
+
+async def user_from_token(token: str) -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+        user = user_cache.get(user_id)
         if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
+            user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+            if user is None:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_cache.set(user_id, user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
 async def log_audit(action: str, user_id: str, details: dict):
@@ -93,7 +253,7 @@ async def log_audit(action: str, user_id: str, details: dict):
         "details": details,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    await db.audit_logs.insert_one(audit_log)
+    await audit_buffer.log(audit_log)
 
 # Pydantic Models
 class UserRegister(BaseModel):
@@ -218,8 +378,26 @@ class FoodRequestCreate(BaseModel):
     required_date: str
     required_time: str
     pickup_location: str
+    pickup_latitude: Optional[float] = None
+    pickup_longitude: Optional[float] = None
     special_instructions: Optional[str] = None
     people_count: int
+    
+    @validator('pickup_latitude')
+    def validate_pickup_lat(cls, v):
+        if v is not None:
+            is_valid, error = validate_latitude(v)
+            if not is_valid:
+                raise ValueError(error)
+        return v
+    
+    @validator('pickup_longitude')
+    def validate_pickup_lng(cls, v):
+        if v is not None:
+            is_valid, error = validate_longitude(v)
+            if not is_valid:
+                raise ValueError(error)
+        return v
 
 class FoodRequest(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -234,6 +412,9 @@ class FoodRequest(BaseModel):
     required_date: str
     required_time: str
     pickup_location: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    distance_km: Optional[float] = None
     special_instructions: Optional[str] = None
     people_count: int
     urgency_score: float
@@ -245,7 +426,64 @@ class FoodRequest(BaseModel):
     volunteer_name: Optional[str] = None
     co_volunteer_id: Optional[str] = None
     co_volunteer_name: Optional[str] = None
-    delivery_photo: Optional[str] = None
+    # Photos live in the blob store; responses carry links, never the bytes
+    delivery_photo_blob: Optional[str] = Field(default=None, exclude=True)
+    delivery_photo_thumbnail_blob: Optional[str] = Field(default=None, exclude=True)
+
+    @computed_field
+    @property
+    def delivery_photo_url(self) -> Optional[str]:
+        return delivery_photo_link(self.request_id, self.delivery_photo_blob)
+
+    @computed_field
+    @property
+    def delivery_photo_thumbnail_url(self) -> Optional[str]:
+        return delivery_photo_link(self.request_id, self.delivery_photo_thumbnail_blob, thumbnail=True)
+
+class FoodRequestSummary(BaseModel):
+    """What request cards render (view=summary)"""
+    model_config = ConfigDict(extra="ignore")
+    request_id: str
+    ngo_name: str
+    ngo_organization: str
+    food_type: str
+    food_category: str
+    quantity: int
+    quantity_unit: str
+    required_date: str
+    required_time: str
+    pickup_location: str
+    distance_km: Optional[float] = None
+    people_count: int
+    urgency_score: float
+    status: str
+    created_at: str
+    donor_name: Optional[str] = None
+    volunteer_name: Optional[str] = None
+    co_volunteer_name: Optional[str] = None
+    delivery_photo_thumbnail_blob: Optional[str] = Field(default=None, exclude=True)
+
+    @computed_field
+    @property
+    def delivery_photo_thumbnail_url(self) -> Optional[str]:
+        return delivery_photo_link(self.request_id, self.delivery_photo_thumbnail_blob, thumbnail=True)
+
+def delivery_photo_link(request_id: str, blob_key: Optional[str], thumbnail: bool = False) -> Optional[str]:
+    if not blob_key:
+        return None
+    link = f"{api_router.prefix}/requests/{request_id}/delivery-photo"
+    return f"{link}?thumbnail=true" if thumbnail else link
+
+# fields= accepts any FoodRequest response field; computed ones name what they are built from
+FOOD_REQUEST_FIELDS = [name for name, info in FoodRequest.model_fields.items() if not info.exclude] + list(FoodRequest.model_computed_fields)
+FOOD_REQUEST_DERIVED_FIELDS = {
+    "delivery_photo_url": ("request_id", "delivery_photo_blob"),
+    "delivery_photo_thumbnail_url": ("request_id", "delivery_photo_thumbnail_blob"),
+}
+FOOD_REQUEST_VIEWS = ("summary", "detail")
+FOOD_REQUEST_SUMMARY_FIELDS = list(FoodRequestSummary.model_fields)
+FOOD_REQUEST_LIST = TypeAdapter(List[FoodRequest])
+FOOD_REQUEST_SUMMARY_LIST = TypeAdapter(List[FoodRequestSummary])
 
 class DonationAccept(BaseModel):
     request_id: str
@@ -281,44 +519,119 @@ class VerificationAction(BaseModel):
 
 # Utility Functions
 def calculate_urgency_score(quantity: int, people_count: int, required_datetime_str: str, ngo_history: dict = None) -> float:
-    try:
-        required_dt = datetime.fromisoformat(required_datetime_str)
-        time_diff = (required_dt - datetime.now(timezone.utc)).total_seconds() / 3600
-        
-        time_score = max(0, min(10, 10 - (time_diff / 24) * 2))
-        quantity_score = min(10, (people_count / 100) * 10)
-        
-        history_score = 5.0
-        if ngo_history:
-            reliability = ngo_history.get('reliability_score', 5.0)
-            history_score = min(10, reliability)
-        
-        urgency = (time_score * 0.5 + quantity_score * 0.3 + history_score * 0.2)
-        return round(urgency, 2)
-    except:
+    # Naive date/times used to fail the aware subtraction and always scored 5.0
+    required_dt = parse_required_datetime(required_datetime_str)
+    if required_dt is None:
         return 5.0
+    time_diff = (required_dt - datetime.now(timezone.utc)).total_seconds() / 3600
+    reliability = ngo_history.get('reliability_score', 5.0) if ngo_history else 5.0
+    return round(float(urgency_formula(time_diff, people_count, reliability)), 2)
+
+# Applied when a request completes: bump the completion counter, then derive
+# reliability from it server-side (NGO: share of its requests completed;
+# volunteer: 5 plus 0.1 per completed task), both capped at 10
+NGO_COMPLETION_PIPELINE = [
+    {"$set": {"completed_requests": {"$add": [{"$ifNull": ["$completed_requests", 0]}, 1]}}},
+    {"$set": {"reliability_score": {"$min": [10, {"$multiply": [
+        {"$divide": ["$completed_requests", {"$max": [{"$ifNull": ["$total_requests", 1]}, 1]}]}, 10
+    ]}]}}}
+]
+VOLUNTEER_COMPLETION_PIPELINE = [
+    {"$set": {"completed_tasks": {"$add": [{"$ifNull": ["$completed_tasks", 0]}, 1]}}},
+    {"$set": {"reliability_score": {"$min": [10, {"$add": [5, {"$divide": ["$completed_tasks", 10]}]}]}}}
+]
 
 def calculate_distance(loc1: str, loc2: str) -> float:
     return abs(hash(loc1) - hash(loc2)) % 50
 
 def get_volunteer_capacity_score(transport_mode: str, distance: float, quantity: int) -> float:
-    capacity_map = {"van": 10, "car": 7, "two_wheeler": 5, "bicycle": 3, "on_foot": 2}
-    capacity = capacity_map.get(transport_mode, 5)
-    distance_penalty = min(distance / 10, 3)
-    quantity_penalty = max(0, (quantity - 50) / 20)
-    return capacity - distance_penalty - quantity_penalty
+    capacity = TRANSPORT_CAPACITY.get(transport_mode, DEFAULT_CAPACITY)
+    return float(capacity_score(capacity, distance, quantity))
 
 def should_auto_trigger_extra_volunteer(quantity: int, distance: float, transport_mode: str) -> tuple:
-    capacity_score = get_volunteer_capacity_score(transport_mode, distance, quantity)
-    if capacity_score < 2:
-        if quantity > 100:
-            return True, "heavy_load"
-        elif distance > 30:
-            return True, "long_distance"
-        else:
-            return True, "capacity_constraint"
+    if get_volunteer_capacity_score(transport_mode, distance, quantity) < 2:
+        return True, extra_volunteer_reason(quantity, distance)
     return False, None
 
+async def find_candidate_volunteers(request: dict, exclude_ids: tuple = ()) -> list:
+    """
+    Return (VolunteerRecord, distance_km) pairs worth scoring for a food request.
+    Served from the in-memory roster: requests with coordinates use the
+    spatial index, older requests without coordinates scan the roster. Until
+    the roster has loaded, the same lookups go to MongoDB instead.
+    """
+    lat, lon = request.get("latitude"), request.get("longitude")
+    has_coordinates = lat is not None and lon is not None
+    if not volunteer_roster.loaded:
+        if has_coordinates:
+            return await volunteer_roster.nearest_from_db(
+                db, lat, lon,
+                limit=VOLUNTEER_CANDIDATE_LIMIT,
+                radius_km=VOLUNTEER_SEARCH_RADIUS_KM,
+                exclude=set(exclude_ids)
+            )
+        records = await volunteer_roster.records_from_db(db, exclude=exclude_ids)
+    elif has_coordinates and len(volunteer_roster.index):
+        return volunteer_roster.nearest(
+            lat, lon,
+            limit=VOLUNTEER_CANDIDATE_LIMIT,
+            radius_km=VOLUNTEER_SEARCH_RADIUS_KM,
+            exclude=set(exclude_ids)
+        )
+    else:
+        records = [vol for vol in volunteer_roster.records() if vol.user_id not in exclude_ids]
+    
+    return [(vol, calculate_distance(vol.location, request["pickup_location"])) for vol in records]
+
+async def fetch_page(response: Response, collection, query: dict, sort: list, projection: dict,
+                     limit: Optional[int], cursor: Optional[str], default_limit: int = None,
+                     max_limit: int = None) -> list:
+    """Run a keyset-paginated query and expose the next cursor as a response header"""
+    page_size = clamp_page_size(limit, default_limit or DEFAULT_PAGE_SIZE, max_limit or MAX_PAGE_SIZE)
+    try:
+        items, next_cursor = await paginate(collection, query, sort, projection, page_size, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+async def fetch_request_page(response: Response, query: dict, sort: list, limit: Optional[int],
+                             cursor: Optional[str], fields: Optional[str], view: Optional[str]):
+    """
+    A page of food requests in the shape the client asked for. fields=
+    (comma-separated FoodRequest fields) wins over view=; the default detail
+    view is the full FoodRequest. Slimmer shapes fetch only what they emit,
+    plus the sort keys the next cursor is built from.
+    """
+    sort_keys = [field for field, _ in sort]
+    if fields:
+        try:
+            selected = parse_fields(fields, FOOD_REQUEST_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        projection = projection_for(selected, FOOD_REQUEST_DERIVED_FIELDS, sort_keys)
+        items = await fetch_page(response, db.food_requests, query, sort, projection, limit, cursor)
+        # Partial documents can't pass FoodRequest validation; they are our own writes, so skip it
+        content = FOOD_REQUEST_LIST.dump_json(
+            [FoodRequest.model_construct(**item) for item in items],
+            include={"__all__": set(selected)}
+        )
+    elif view == "summary":
+        projection = projection_for(FOOD_REQUEST_SUMMARY_FIELDS, keep=sort_keys)
+        items = await fetch_page(response, db.food_requests, query, sort, projection, limit, cursor)
+        content = FOOD_REQUEST_SUMMARY_LIST.dump_json(FOOD_REQUEST_SUMMARY_LIST.validate_python(items))
+    elif view is None or view == "detail":
+        return await fetch_page(response, db.food_requests, query, sort, FOOD_REQUEST_LIST_PROJECTION, limit, cursor)
+    else:
+        raise HTTPException(status_code=400, detail=f"view must be one of {', '.join(FOOD_REQUEST_VIEWS)}")
+    
+    # A returned Response skips response_model and the injected response's headers
+    headers = {}
+    if NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    return Response(content=content, media_type="application/json", headers=headers)
+
 # Google OAuth Endpoints
 @api_router.get("/auth/google/login")
 async def google_login():
@@ -399,10 +712,12 @@ async def google_callback(callback_data: GoogleCallbackData):
             user_doc["total_donations"] = 0
         
         await db.users.insert_one(user_doc)
+        volunteer_roster.upsert_from_doc(user_doc)
+        await record_user_registered(db, callback_data.role)
         await log_audit("USER_REGISTERED_GOOGLE", user_id, {"role": callback_data.role, "email": email})
         
         # Send welcome email
-        await send_welcome_email(email, name, callback_data.role)
+        await queue_email("welcome", email, {"user_name": name, "role": callback_data.role})
         
         token = create_access_token({"sub": user_id, "role": callback_data.role})
         user_response = {k: v for k, v in user_doc.items() if k not in ["password", "_id"]}
@@ -420,7 +735,7 @@ async def register(user_data: UserRegister):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_id = str(uuid.uuid4())
-    hashed_pwd = hash_password(user_data.password)
+    hashed_pwd = await hash_password(user_data.password)
     
     user_doc = {
         "user_id": user_id,
@@ -430,9 +745,15 @@ async def register(user_data: UserRegister):
         "role": user_data.role,
         "location": user_data.location,
         "phone": user_data.phone,
+        "latitude": user_data.latitude,
+        "longitude": user_data.longitude,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
+    geo = to_geojson_point(user_data.latitude, user_data.longitude)
+    if geo:
+        user_doc["geo"] = geo
+    
     if user_data.role == "volunteer" and user_data.transport_mode:
         user_doc["transport_mode"] = user_data.transport_mode
         user_doc["reliability_score"] = 5.0
@@ -453,10 +774,16 @@ async def register(user_data: UserRegister):
         user_doc["donor_type"] = user_data.donor_type
         user_doc["total_donations"] = 0
     
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same email
+        raise HTTPException(status_code=400, detail="Email already registered")
+    volunteer_roster.upsert_from_doc(user_doc)
+    await record_user_registered(db, user_data.role)
     
     # Send welcome email
-    await send_welcome_email(user_data.email, user_data.name, user_data.role)
+    await queue_email("welcome", user_data.email, {"user_name": user_data.name, "role": user_data.role})
     
     await log_audit("USER_REGISTERED", user_id, {"role": user_data.role, "email": user_data.email})
     
@@ -467,9 +794,18 @@ async def register(user_data: UserRegister):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    is_valid, new_hash = await password_hasher.verify_and_rehash(credentials.password, user["password"])
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        await db.users.update_one({"user_id": user["user_id"]}, {"$set": {"password": new_hash}})
+        user_cache.invalidate(user["user_id"])
+    
     token = create_access_token({"sub": user["user_id"], "role": user["role"]})
     user.pop("password")
     return {"token": token, "user": user}
@@ -484,21 +820,25 @@ async def upload_verification_document(file: UploadFile = File(...), current_use
     if current_user["role"] != "ngo":
         raise HTTPException(status_code=403, detail="Only NGOs can upload verification documents")
     
-    file_id = str(uuid.uuid4())
-    file_ext = file.filename.split('.')[-1]
-    file_path = f"/app/uploads/{file_id}.{file_ext}"
-    
-    os.makedirs("/app/uploads", exist_ok=True)
-    
-    content = await file.read()
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    stored = await stream_upload_to_disk(file, blob_store.staging_dir, DOCUMENT_UPLOAD_TYPES, MAX_UPLOAD_BYTES)
+    file_id = stored.file_id
+    blob_key = await put_blob(db, blob_store, stored)
     
     await db.users.update_one(
         {"user_id": current_user["user_id"]},
-        {"$push": {"verification_documents": {"file_id": file_id, "filename": file.filename, "uploaded_at": datetime.now(timezone.utc).isoformat()}}}
+        {"$push": {"verification_documents": {
+            "file_id": file_id,
+            "blob": blob_key,
+            "filename": file.filename,
+            "content_type": stored.content_type,
+            "size": stored.size,
+            "sha256": stored.sha256,
+            "uploaded_at": datetime.now(timezone.utc).isoformat()
+        }}}
     )
     
+    user_cache.invalidate(current_user["user_id"])
+    
     await log_audit("VERIFICATION_DOC_UPLOADED", current_user["user_id"], {"filename": file.filename})
     
     return {"message": "Document uploaded successfully", "file_id": file_id}
@@ -525,6 +865,11 @@ async def create_food_request(request_data: FoodRequestCreate, current_user: dic
         ngo_history
     )
     
+    # Fall back to the NGO's registered coordinates when no pickup point is given
+    pickup_lat, pickup_lon = request_data.pickup_latitude, request_data.pickup_longitude
+    if pickup_lat is None or pickup_lon is None:
+        pickup_lat, pickup_lon = current_user.get("latitude"), current_user.get("longitude")
+    
     request_id = str(uuid.uuid4())
     request_doc = {
         "request_id": request_id,
@@ -538,10 +883,13 @@ async def create_food_request(request_data: FoodRequestCreate, current_user: dic
         "required_date": request_data.required_date,
         "required_time": request_data.required_time,
         "pickup_location": request_data.pickup_location,
+        "latitude": pickup_lat,
+        "longitude": pickup_lon,
         "special_instructions": request_data.special_instructions,
         "people_count": request_data.people_count,
         "urgency_score": urgency_score,
         "status": "pending",
+        "version": 0,
         "created_at": datetime.now(timezone.utc).isoformat(),
         "donor_id": None,
         "donor_name": None,
@@ -549,11 +897,24 @@ async def create_food_request(request_data: FoodRequestCreate, current_user: dic
         "volunteer_name": None,
         "co_volunteer_id": None,
         "co_volunteer_name": None,
-        "delivery_photo": None
+        "delivery_photo_blob": None,
+        "delivery_photo_thumbnail_blob": None
     }
     
+    pickup_geo = to_geojson_point(pickup_lat, pickup_lon)
+    if pickup_geo:
+        request_doc["pickup_geo"] = pickup_geo
+    
     await db.food_requests.insert_one(request_doc)
+    request_doc.pop("_id", None)
+    if not LIVE_UPDATES_CHANGE_STREAM:
+        live_updates.publish(
+            {current_user["user_id"], DONOR_FEED_TOPIC},
+            request_event("request.created", request_id, request_doc)
+        )
+    await record_request_created(db)
     await db.users.update_one({"user_id": current_user["user_id"]}, {"$inc": {"total_requests": 1}})
+    user_cache.invalidate(current_user["user_id"])
     await log_audit("FOOD_REQUEST_CREATED", current_user["user_id"], {"request_id": request_id, "people_count": request_data.people_count})
     
     logger.info(f"New food request created: {request_id}")
@@ -561,62 +922,60 @@ async def create_food_request(request_data: FoodRequestCreate, current_user: dic
     return FoodRequest(**request_doc)
 
 @api_router.get("/ngo/requests", response_model=List[FoodRequest])
-async def get_ngo_requests(current_user: dict = Depends(get_current_user)):
+async def get_ngo_requests(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                           fields: Optional[str] = None, view: Optional[str] = None,
+                           current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "ngo":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    requests = await db.food_requests.find({"ngo_id": current_user["user_id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return requests
+    return await fetch_request_page(
+        response,
+        {"ngo_id": current_user["user_id"]},
+        [("created_at", -1), ("request_id", -1)],
+        limit, cursor, fields, view
+    )
 
 @api_router.post("/ngo/confirm-receipt")
 async def confirm_receipt(data: ConfirmReceipt, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "ngo":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    request = await db.food_requests.find_one({"request_id": data.request_id, "ngo_id": current_user["user_id"]})
-    if not request:
-        raise HTTPException(status_code=404, detail="Request not found")
-    
-    update_data = {
-        "status": "completed",
-        "completed_at": datetime.now(timezone.utc).isoformat()
-    }
-    
+    update_data = {}
     if data.rating:
         update_data["ngo_rating"] = data.rating
         update_data["ngo_feedback"] = data.feedback
     
-    await db.food_requests.update_one(
-        {"request_id": data.request_id},
-        {"$set": update_data}
+    # Round trip 1: the status change, which also returns the request
+    request = await transition_request(
+        db, data.request_id, "completed", update_data,
+        match={"ngo_id": current_user["user_id"]}
     )
-    
-    await db.users.update_one({"user_id": current_user["user_id"]}, {"$inc": {"completed_requests": 1}})
-    
-    if request.get("volunteer_id"):
-        await db.users.update_one(
-            {"user_id": request["volunteer_id"]},
-            {"$inc": {"completed_tasks": 1}}
-        )
-        
-        volunteer = await db.users.find_one({"user_id": request["volunteer_id"]}, {"_id": 0})
+    publish_request_change(request, "completed", update_data)
+    
+    # Round trip 2: everything else at once. Reliability is recomputed by
+    # pipeline updates from the incremented counters, one write per user.
+    writes = [
+        db.users.update_one({"user_id": current_user["user_id"]}, NGO_COMPLETION_PIPELINE),
+        record_status_transition(db, request.get("status"), "completed", request.get("people_count", 0))
+    ]
+    if request.get("created_at"):
+        writes.append(record_completion(db, request["created_at"], request.get("people_count", 0)))
+    volunteer_id = request.get("volunteer_id")
+    if volunteer_id:
+        writes.append(db.users.find_one_and_update(
+            {"user_id": volunteer_id},
+            VOLUNTEER_COMPLETION_PIPELINE,
+            projection={"_id": 0, "reliability_score": 1},
+            return_document=ReturnDocument.AFTER
+        ))
+    results = await asyncio.gather(*writes)
+    
+    if volunteer_id:
+        volunteer = results[-1]
         if volunteer:
-            completed = volunteer.get("completed_tasks", 0) + 1
-            new_reliability = min(10, 5 + (completed / 10))
-            await db.users.update_one(
-                {"user_id": request["volunteer_id"]},
-                {"$set": {"reliability_score": new_reliability}}
-            )
-    
-    ngo_user = await db.users.find_one({"user_id": current_user["user_id"]}, {"_id": 0})
-    if ngo_user:
-        total = ngo_user.get("total_requests", 1)
-        completed = ngo_user.get("completed_requests", 0) + 1
-        new_reliability = min(10, (completed / total) * 10)
-        await db.users.update_one(
-            {"user_id": current_user["user_id"]},
-            {"$set": {"reliability_score": new_reliability}}
-        )
+            volunteer_roster.update_reliability(volunteer_id, volunteer["reliability_score"])
+        user_cache.invalidate(volunteer_id)
+    user_cache.invalidate(current_user["user_id"])
     
     await log_audit("RECEIPT_CONFIRMED", current_user["user_id"], {"request_id": data.request_id})
     logger.info(f"Receipt confirmed for request: {data.request_id}")
@@ -625,89 +984,138 @@ async def confirm_receipt(data: ConfirmReceipt, current_user: dict = Depends(get
 
 # Donor Endpoints
 @api_router.get("/donor/requests", response_model=List[FoodRequest])
-async def get_available_requests(current_user: dict = Depends(get_current_user)):
+async def get_available_requests(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                                 fields: Optional[str] = None, view: Optional[str] = None,
+                                 current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "donor":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    requests = await db.food_requests.find({"status": "pending"}, {"_id": 0}).sort("urgency_score", -1).to_list(1000)
-    return requests
+    return await fetch_request_page(
+        response,
+        {"status": "pending"},
+        [("urgency_score", -1), ("request_id", -1)],
+        limit, cursor, fields, view
+    )
+
+@api_router.get("/donor/requests/nearby", response_model=List[FoodRequest])
+async def get_nearby_requests(latitude: float, longitude: float, radius_km: float = 10.0, sort: str = "distance",
+                              limit: int = 100, current_user: dict = Depends(get_current_user)):
+    """Pending requests within radius_km of a point, nearest or most urgent first"""
+    if current_user["role"] != "donor":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    for is_valid, error in (validate_latitude(latitude), validate_longitude(longitude)):
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error)
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM}")
+    limit = max(1, min(limit, 1000))
+    
+    if sort == "distance":
+        pipeline = [
+            {"$geoNear": {
+                "near": to_geojson_point(latitude, longitude),
+                "key": "pickup_geo",
+                "distanceField": "distance_km",
+                "distanceMultiplier": 0.001,
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": {"status": "pending"}
+            }},
+            {"$limit": limit},
+            {"$project": FOOD_REQUEST_LIST_PROJECTION}
+        ]
+        return await db.food_requests.aggregate(pipeline).to_list(limit)
+    
+    if sort == "urgency":
+        return await db.food_requests.find(
+            {"status": "pending", "pickup_geo": {"$geoWithin": {
+                "$centerSphere": [[longitude, latitude], km_to_radians(radius_km)]
+            }}},
+            FOOD_REQUEST_LIST_PROJECTION
+        ).sort("urgency_score", -1).to_list(limit)
+    
+    raise HTTPException(status_code=400, detail="sort must be 'distance' or 'urgency'")
 
 @api_router.post("/donor/accept")
 async def accept_donation(data: DonationAccept, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "donor":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    request = await db.food_requests.find_one({"request_id": data.request_id})
+    request = await db.food_requests.find_one({"request_id": data.request_id}, {"_id": 0})
     if not request:
         raise HTTPException(status_code=404, detail="Request not found")
     if request["status"] != "pending":
         raise HTTPException(status_code=400, detail="Request already accepted")
     
-    await db.food_requests.update_one(
-        {"request_id": data.request_id},
-        {"$set": {
-            "status": "accepted_by_donor",
-            "donor_id": current_user["user_id"],
-            "donor_name": current_user["name"],
-            "availability_time": data.availability_time,
-            "food_condition": data.food_condition,
-            "accepted_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    await db.users.update_one({"user_id": current_user["user_id"]}, {"$inc": {"total_donations": 1}})
+    now = datetime.now(timezone.utc).isoformat()
+    update_data = {
+        "donor_id": current_user["user_id"],
+        "donor_name": current_user["name"],
+        "availability_time": data.availability_time,
+        "food_condition": data.food_condition,
+        "accepted_at": now
+    }
+    final_status = "accepted_by_donor"
     
-    # Only assign to verified volunteers
-    volunteers = await db.users.find({"role": "volunteer", "verification_status": "verified"}, {"_id": 0}).to_list(1000)
-    if volunteers:
+    # Only assign to verified volunteers near the pickup point. The choice is
+    # made from the roster, so it folds into the same write as the accept.
+    candidates = await find_candidate_volunteers(request) if ASSIGNMENT_MODE == "greedy" else []
+    if candidates:
         best_volunteer = None
+        best_distance = 0.0
         best_score = -1
         
-        for vol in volunteers:
-            distance = calculate_distance(vol["location"], request["pickup_location"])
+        for vol, distance in candidates:
             capacity_score = get_volunteer_capacity_score(
-                vol.get("transport_mode", "on_foot"),
+                vol.transport_mode,
                 distance,
                 request["quantity"]
             )
-            reliability = vol.get("reliability_score", 5.0)
+            reliability = vol.reliability_score
             
             score = capacity_score + (reliability / 2) - (distance / 10)
             if score > best_score:
                 best_score = score
                 best_volunteer = vol
+                best_distance = distance
         
         if best_volunteer:
-            await db.food_requests.update_one(
-                {"request_id": data.request_id},
-                {"$set": {
-                    "status": "assigned_to_volunteer",
-                    "volunteer_id": best_volunteer["user_id"],
-                    "volunteer_name": best_volunteer["name"],
-                    "assigned_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
+            update_data.update({
+                "volunteer_id": best_volunteer.user_id,
+                "volunteer_name": best_volunteer.name,
+                "assigned_at": now
+            })
+            final_status = "assigned_to_volunteer"
             
-            distance = calculate_distance(best_volunteer["location"], request["pickup_location"])
             should_trigger, reason = should_auto_trigger_extra_volunteer(
                 request["quantity"],
-                distance,
-                best_volunteer.get("transport_mode", "on_foot")
+                best_distance,
+                best_volunteer.transport_mode
             )
             
             if should_trigger:
-                other_volunteers = [v for v in volunteers if v["user_id"] != best_volunteer["user_id"]]
+                other_volunteers = [v for v, _ in candidates if v.user_id != best_volunteer.user_id]
                 if other_volunteers:
-                    co_vol = max(other_volunteers, key=lambda v: v.get("reliability_score", 5.0))
-                    await db.food_requests.update_one(
-                        {"request_id": data.request_id},
-                        {"$set": {
-                            "co_volunteer_id": co_vol["user_id"],
-                            "co_volunteer_name": co_vol["name"],
-                            "extra_volunteer_reason": reason,
-                            "auto_triggered": True
-                        }}
-                    )
+                    co_vol = max(other_volunteers, key=lambda v: v.reliability_score)
+                    update_data.update({
+                        "co_volunteer_id": co_vol.user_id,
+                        "co_volunteer_name": co_vol.name,
+                        "extra_volunteer_reason": reason,
+                        "auto_triggered": True
+                    })
+    
+    # Conditional on the request still being pending at the version we read,
+    # so when two donors race exactly one write lands and the other gets a 409
+    previous = await transition_request(
+        db, data.request_id, final_status, update_data,
+        from_statuses=["pending"], expected_version=request.get("version", 0)
+    )
+    publish_request_change(previous, final_status, update_data)
+    
+    await db.users.update_one({"user_id": current_user["user_id"]}, {"$inc": {"total_donations": 1}})
+    user_cache.invalidate(current_user["user_id"])
+    await record_status_transition(db, "pending", final_status)
     
     await log_audit("DONATION_ACCEPTED", current_user["user_id"], {"request_id": data.request_id})
     logger.info(f"Donation accepted for request: {data.request_id}")
@@ -715,12 +1123,18 @@ async def accept_donation(data: DonationAccept, current_user: dict = Depends(get
     return {"message": "Donation accepted successfully"}
 
 @api_router.get("/donor/my-donations", response_model=List[FoodRequest])
-async def get_my_donations(current_user: dict = Depends(get_current_user)):
+async def get_my_donations(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                           fields: Optional[str] = None, view: Optional[str] = None,
+                           current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "donor":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    donations = await db.food_requests.find({"donor_id": current_user["user_id"]}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return donations
+    return await fetch_request_page(
+        response,
+        {"donor_id": current_user["user_id"]},
+        [("created_at", -1), ("request_id", -1)],
+        limit, cursor, fields, view
+    )
 
 # Volunteer Endpoints
 @api_router.post("/volunteer/upload-id")
@@ -729,42 +1143,43 @@ async def upload_volunteer_id(file: UploadFile = File(...), current_user: dict =
     if current_user["role"] != "volunteer":
         raise HTTPException(status_code=403, detail="Only volunteers can upload ID proof")
     
-    # Validate file type
-    allowed_extensions = ['jpg', 'jpeg', 'png', 'pdf']
-    file_ext = file.filename.split('.')[-1].lower()
-    if file_ext not in allowed_extensions:
-        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}")
-    
-    # Create directory if it doesn't exist
-    upload_dir = "/app/uploads/volunteer_ids"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    file_path = f"{upload_dir}/{file_id}.{file_ext}"
-    
-    # Save file
-    content = await file.read()
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    # Type comes from the file's content; the reference ends in the real type
+    stored = await stream_upload_to_disk(file, blob_store.staging_dir, DOCUMENT_UPLOAD_TYPES, MAX_UPLOAD_BYTES)
+    file_id = stored.file_id
+    blob_key = await put_blob(db, blob_store, stored)
     
     # Update user record
-    await db.users.update_one(
+    previous = await db.users.find_one_and_update(
         {"user_id": current_user["user_id"]},
         {"$set": {
-            "id_proof_url": file_path,
+            "id_proof_url": blob_url(blob_key, stored.file_type),
+            "id_proof_blob": blob_key,
             "id_proof_filename": file.filename,
+            "id_proof_content_type": stored.content_type,
+            "id_proof_size": stored.size,
+            "id_proof_sha256": stored.sha256,
             "id_proof_uploaded_at": datetime.now(timezone.utc).isoformat(),
             "verification_status": "pending"
-        }}
+        }},
+        projection={"_id": 0, "id_proof_blob": 1}
     )
+    # The replaced proof no longer needs its content
+    await release_blob(db, (previous or {}).get("id_proof_blob"))
+    if stored.file_type in THUMBNAIL_SOURCE_TYPES:
+        # Ready before an admin opens the verification queue
+        thumbnail_cache.prefetch(blob_key)
+    # Re-uploading sends the volunteer back to pending, so stop matching them
+    volunteer_roster.remove(current_user["user_id"])
+    user_cache.invalidate(current_user["user_id"])
     
     await log_audit("VOLUNTEER_ID_UPLOADED", current_user["user_id"], {"filename": file.filename})
     
     return {"message": "ID proof uploaded successfully. Awaiting admin verification.", "file_id": file_id}
 
 @api_router.get("/volunteer/tasks", response_model=List[FoodRequest])
-async def get_volunteer_tasks(current_user: dict = Depends(get_current_user)):
+async def get_volunteer_tasks(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                              fields: Optional[str] = None, view: Optional[str] = None,
+                              current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "volunteer":
         raise HTTPException(status_code=403, detail="Access denied")
     
@@ -772,23 +1187,16 @@ async def get_volunteer_tasks(current_user: dict = Depends(get_current_user)):
     if current_user.get("verification_status") != "verified":
         raise HTTPException(status_code=403, detail="Only verified volunteers can view tasks. Please upload your ID proof and wait for admin approval.")
     
-    available_tasks = await db.food_requests.find(
+    # Assigned or in-progress tasks as lead volunteer, plus every co-volunteer task
+    return await fetch_request_page(
+        response,
         {"$or": [
-            {"status": "assigned_to_volunteer", "volunteer_id": current_user["user_id"]},
+            {"volunteer_id": current_user["user_id"], "status": {"$in": ["assigned_to_volunteer", "picked_up", "in_transit"]}},
             {"co_volunteer_id": current_user["user_id"]}
         ]},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    in_progress = await db.food_requests.find(
-        {"$or": [
-            {"volunteer_id": current_user["user_id"], "status": {"$in": ["picked_up", "in_transit"]}},
-            {"co_volunteer_id": current_user["user_id"], "status": {"$in": ["picked_up", "in_transit"]}}
-        ]},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    return available_tasks + in_progress
+        [("created_at", -1), ("request_id", -1)],
+        limit, cursor, fields, view
+    )
 
 @api_router.post("/volunteer/update-status")
 async def update_delivery_status(data: DeliveryStatusUpdate, current_user: dict = Depends(get_current_user)):
@@ -799,92 +1207,242 @@ async def update_delivery_status(data: DeliveryStatusUpdate, current_user: dict
     if current_user.get("verification_status") != "verified":
         raise HTTPException(status_code=403, detail="Only verified volunteers can update delivery status.")
     
-    request = await db.food_requests.find_one({"request_id": data.request_id})
+    request = await db.food_requests.find_one({"request_id": data.request_id}, {"_id": 0})
     if not request:
         raise HTTPException(status_code=404, detail="Request not found")
     
-    update_data = {"status": data.status}
-    
-    if data.status == "picked_up":
-        update_data["picked_up_at"] = datetime.now(timezone.utc).isoformat()
-    elif data.status == "in_transit":
-        update_data["in_transit_at"] = datetime.now(timezone.utc).isoformat()
-    elif data.status == "delivered":
-        update_data["delivered_at"] = datetime.now(timezone.utc).isoformat()
-        if data.delivery_photo:
-            update_data["delivery_photo"] = data.delivery_photo
-    
-    if data.extra_volunteer_required and not request.get("co_volunteer_id"):
-        volunteers = await db.users.find(
-            {"role": "volunteer", "user_id": {"$ne": current_user["user_id"]}, "verification_status": "verified"},
-            {"_id": 0}
-        ).to_list(1000)
-        
-        if volunteers:
-            best_co_volunteer = None
-            best_score = -1
+    volunteer_match = {"$or": [{"volunteer_id": current_user["user_id"]}, {"co_volunteer_id": current_user["user_id"]}]}
+    if current_user["user_id"] not in (request.get("volunteer_id"), request.get("co_volunteer_id")):
+        raise HTTPException(status_code=403, detail="This task is not assigned to you")
+    if not can_transition(request.get("status"), data.status):
+        raise HTTPException(status_code=400, detail=f"Cannot move request from '{request.get('status')}' to '{data.status}'")
+    
+    update_data = {}
+    if data.status == "delivered" and data.delivery_photo:
+        # Stored as a compact JPEG and thumbnail; the request only keeps references
+        update_data.update(await store_delivery_photo(
+            db, blob_store, data.delivery_photo, thumbnail_cache.run, MAX_UPLOAD_BYTES
+        ))
+    
+    # Until the transition lands the photo references are ours; any failure
+    # (including a cancelled request) must hand them back
+    try:
+        if data.extra_volunteer_required and not request.get("co_volunteer_id"):
+            candidates = await find_candidate_volunteers(request, exclude_ids=(current_user["user_id"],))
             
-            for vol in volunteers:
-                distance = calculate_distance(vol["location"], request["pickup_location"])
-                reliability = vol.get("reliability_score", 5.0)
-                score = reliability - (distance / 10)
+            if candidates:
+                best_co_volunteer = None
+                best_score = -1
                 
-                if score > best_score:
-                    best_score = score
-                    best_co_volunteer = vol
-            
-            if best_co_volunteer:
-                update_data["co_volunteer_id"] = best_co_volunteer["user_id"]
-                update_data["co_volunteer_name"] = best_co_volunteer["name"]
-                update_data["extra_volunteer_reason"] = data.extra_volunteer_reason
-    
-    await db.food_requests.update_one({"request_id": data.request_id}, {"$set": update_data})
+                for vol, distance in candidates:
+                    reliability = vol.reliability_score
+                    score = reliability - (distance / 10)
+                    
+                    if score > best_score:
+                        best_score = score
+                        best_co_volunteer = vol
+                
+                if best_co_volunteer:
+                    update_data["co_volunteer_id"] = best_co_volunteer.user_id
+                    update_data["co_volunteer_name"] = best_co_volunteer.name
+                    update_data["extra_volunteer_reason"] = data.extra_volunteer_reason
+        
+        # The co-volunteer pick is based on what we read, so require that version
+        previous = await transition_request(
+            db, data.request_id, data.status, update_data,
+            from_statuses=[request["status"]], expected_version=request.get("version", 0),
+            match=volunteer_match
+        )
+    except BaseException:
+        await release_delivery_photo(db, update_data)
+        raise
+    publish_request_change(previous, data.status, update_data)
+    await record_status_transition(db, request.get("status"), data.status)
     await log_audit("DELIVERY_STATUS_UPDATED", current_user["user_id"], {"request_id": data.request_id, "status": data.status})
     logger.info(f"Delivery status updated for request: {data.request_id} to {data.status}")
     
     return {"message": "Status updated successfully"}
 
+@api_router.get("/requests/{request_id}/nearby-volunteers")
+async def get_nearby_volunteers(request_id: str, radius_km: float = 10.0, limit: int = 20,
+                                current_user: dict = Depends(get_current_user)):
+    """Verified volunteers closest to a request's pickup point"""
+    request = await db.food_requests.find_one({"request_id": request_id}, {"_id": 0})
+    if not request:
+        raise HTTPException(status_code=404, detail="Request not found")
+    
+    is_party = current_user["user_id"] in (request.get("ngo_id"), request.get("donor_id"))
+    if current_user["role"] != "admin" and not is_party:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not request.get("pickup_geo"):
+        raise HTTPException(status_code=400, detail="Request has no pickup coordinates")
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM}")
+    limit = max(1, min(limit, 100))
+    
+    pipeline = [
+        {"$geoNear": {
+            "near": request["pickup_geo"],
+            "key": "geo",
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+            "query": {"role": "volunteer", "verification_status": "verified"}
+        }},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0, "user_id": 1, "name": 1, "transport_mode": 1,
+            "reliability_score": 1, "distance_km": 1
+        }}
+    ]
+    volunteers = await db.users.aggregate(pipeline).to_list(limit)
+    return volunteers
+
+@api_router.get("/requests/{request_id}/delivery-photo")
+async def get_delivery_photo(request_id: str, request: Request, thumbnail: bool = False,
+                             current_user: dict = Depends(get_current_user)):
+    """Proof-of-delivery photo, or with thumbnail=true its small preview"""
+    food_request = await db.food_requests.find_one(
+        {"request_id": request_id},
+        {"_id": 0, "ngo_id": 1, "donor_id": 1, "volunteer_id": 1, "co_volunteer_id": 1,
+         "delivery_photo_blob": 1, "delivery_photo_thumbnail_blob": 1}
+    )
+    if not food_request:
+        raise HTTPException(status_code=404, detail="Request not found")
+    
+    parties = (food_request.get("ngo_id"), food_request.get("donor_id"),
+               food_request.get("volunteer_id"), food_request.get("co_volunteer_id"))
+    if current_user["role"] != "admin" and current_user["user_id"] not in parties:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    blob_key = food_request.get("delivery_photo_thumbnail_blob" if thumbnail else "delivery_photo_blob")
+    if not blob_key:
+        # Not yet migrated: the base64 photo is still on the request, served as is
+        legacy = await db.food_requests.find_one({"request_id": request_id}, {"_id": 0, "delivery_photo": 1})
+        if not legacy or not legacy.get("delivery_photo"):
+            raise HTTPException(status_code=404, detail="No delivery photo")
+        raw = decode_photo(legacy["delivery_photo"], MAX_UPLOAD_BYTES)
+        media_type = CONTENT_TYPES.get(sniff_file_type(raw[:SNIFF_BYTES]), "application/octet-stream")
+        return Response(content=raw, media_type=media_type, headers={"Cache-Control": FILE_CACHE_CONTROL})
+    
+    stat = await blob_store.stat(blob_key)
+    if stat is None:
+        raise HTTPException(status_code=404, detail="No delivery photo")
+    size, last_modified = stat
+    return conditional_file_response(
+        request, quote_etag(blob_key), last_modified, size, PHOTO_CONTENT_TYPE,
+        lambda start, end: blob_store.read(blob_key, start, end)
+    )
+
 # Admin Endpoints
 @api_router.get("/admin/pending-verifications")
-async def get_pending_verifications(current_user: dict = Depends(get_current_user)):
+async def get_pending_verifications(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                                    current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    pending_ngos = await db.users.find(
+    return await fetch_page(
+        response, db.users,
         {"role": "ngo", "verification_status": "pending"},
-        {"_id": 0, "password": 0}
-    ).to_list(1000)
-    
-    return pending_ngos
+        [("created_at", 1), ("user_id", 1)],
+        {"_id": 0, "password": 0}, limit, cursor
+    )
 
 @api_router.get("/admin/pending-volunteers")
-async def get_pending_volunteers(current_user: dict = Depends(get_current_user)):
-    """Get all volunteers pending verification"""
+async def get_pending_volunteers(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                                 current_user: dict = Depends(get_current_user)):
+    """Get volunteers pending verification, oldest first"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    pending_volunteers = await db.users.find(
+    return await fetch_page(
+        response, db.users,
         {"role": "volunteer", "verification_status": "pending"},
-        {"_id": 0, "password": 0}
-    ).to_list(1000)
-    
-    return pending_volunteers
+        [("created_at", 1), ("user_id", 1)],
+        {"_id": 0, "password": 0}, limit, cursor
+    )
+
+def conditional_file_response(request: Request, etag: str, last_modified: float, size: int,
+                              content_type: str, read) -> Response:
+    """
+    Serve file content, answering revalidations with 304 and a single byte
+    range with 206. read(start, end) yields bytes start..end inclusive
+    (end=None reads to the end).
+    """
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": FILE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    try:
+        byte_range = parse_range(request.headers, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read(0, None), media_type=content_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(read(start, end), status_code=206, media_type=content_type, headers=headers)
+
+def local_file_response(request: Request, path: str, content_type: str, etag: Optional[str] = None) -> Response:
+    st = os.stat(path)
+    return conditional_file_response(
+        request, etag or quote_etag(f"{int(st.st_mtime)}-{st.st_size}"), st.st_mtime, st.st_size,
+        content_type, lambda start, end: read_file(path, start, end)
+    )
 
 @api_router.get("/admin/volunteer-id/{user_id}")
-async def get_volunteer_id_proof(user_id: str, current_user: dict = Depends(get_current_user)):
-    """Get volunteer ID proof file"""
+async def get_volunteer_id_proof(user_id: str, request: Request, thumbnail: bool = False,
+                                 current_user: dict = Depends(get_current_user)):
+    """Get volunteer ID proof file, or with thumbnail=true a small JPEG preview of an image proof"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    volunteer = await db.users.find_one({"user_id": user_id, "role": "volunteer"}, {"_id": 0})
+    volunteer = await db.users.find_one(
+        {"user_id": user_id, "role": "volunteer"},
+        {"_id": 0, "id_proof_url": 1, "id_proof_blob": 1, "id_proof_content_type": 1}
+    )
     if not volunteer:
         raise HTTPException(status_code=404, detail="Volunteer not found")
     
-    id_proof_path = volunteer.get("id_proof_url")
-    if not id_proof_path or not os.path.exists(id_proof_path):
+    id_proof_url = volunteer.get("id_proof_url")
+    blob_key = volunteer.get("id_proof_blob")
+    content_type = volunteer.get("id_proof_content_type", "application/octet-stream")
+    if not blob_key:
+        # Proofs uploaded before the blob store hold a file path; they have no previews
+        if not id_proof_url or not os.path.exists(id_proof_url):
+            raise HTTPException(status_code=404, detail="ID proof not found")
+        return local_file_response(request, id_proof_url, content_type)
+    
+    stat = await blob_store.stat(blob_key)
+    if stat is None:
         raise HTTPException(status_code=404, detail="ID proof not found")
     
-    return FileResponse(id_proof_path)
+    if thumbnail:
+        if id_proof_url.rsplit(".", 1)[-1] not in THUMBNAIL_SOURCE_TYPES:
+            raise HTTPException(status_code=404, detail="No preview available for this file type")
+        try:
+            thumbnail_path = await thumbnail_cache.get(blob_key)
+        except THUMBNAIL_ERRORS as e:
+            logger.warning(f"Thumbnail for {blob_key} failed: {str(e)}")
+            raise HTTPException(status_code=422, detail="ID proof could not be previewed")
+        return local_file_response(request, thumbnail_path, THUMBNAIL_CONTENT_TYPE,
+                                   etag=quote_etag(f"{blob_key}-thumb{thumbnail_cache.max_size}"))
+    
+    # Blobs never change, so the content hash is a strong validator
+    size, last_modified = stat
+    return conditional_file_response(
+        request, quote_etag(blob_key), last_modified, size, content_type,
+        lambda start, end: blob_store.read(blob_key, start, end)
+    )
 
 @api_router.post("/admin/verify-ngo")
 async def verify_ngo(data: VerificationAction, current_user: dict = Depends(get_current_user)):
@@ -903,16 +1461,16 @@ async def verify_ngo(data: VerificationAction, current_user: dict = Depends(get_
             "verified_by": current_user["user_id"]
         }}
     )
+    user_cache.invalidate(data.user_id)
     
     # Send approval email if verified
     if data.action == "verified":
         ngo_user = await db.users.find_one({"user_id": data.user_id}, {"_id": 0})
         if ngo_user:
-            await send_verification_approved_email(
-                ngo_user.get("email"),
-                ngo_user.get("name"),
-                ngo_user.get("organization", "")
-            )
+            await queue_email("verification_approved", ngo_user.get("email"), {
+                "user_name": ngo_user.get("name"),
+                "role": ngo_user.get("organization", "")
+            })
     
     await log_audit("NGO_VERIFICATION", current_user["user_id"], {"ngo_user_id": data.user_id, "action": data.action})
     logger.info(f"NGO verification: {data.user_id} - {data.action}")
@@ -937,15 +1495,19 @@ async def verify_volunteer(data: VerificationAction, current_user: dict = Depend
             "verified_by": current_user["user_id"]
         }}
     )
+    user_cache.invalidate(data.user_id)
+    
+    if data.action != "verified":
+        volunteer_roster.remove(data.user_id)
     
     # Send approval email if verified
     if data.action == "verified":
         volunteer_user = await db.users.find_one({"user_id": data.user_id}, {"_id": 0})
         if volunteer_user:
-            await send_volunteer_verification_approved_email(
-                volunteer_user.get("email"),
-                volunteer_user.get("name")
-            )
+            volunteer_roster.upsert_from_doc(volunteer_user)
+            await queue_email("volunteer_verification_approved", volunteer_user.get("email"), {
+                "user_name": volunteer_user.get("name")
+            })
     
     await log_audit("VOLUNTEER_VERIFICATION", current_user["user_id"], {"volunteer_user_id": data.user_id, "action": data.action})
     logger.info(f"Volunteer verification: {data.user_id} - {data.action}")
@@ -953,68 +1515,195 @@ async def verify_volunteer(data: VerificationAction, current_user: dict = Depend
     return {"message": f"Volunteer {data.action} successfully"}
 
 @api_router.get("/admin/users")
-async def get_all_users(current_user: dict = Depends(get_current_user)):
+async def get_all_users(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None,
+                        current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(10000)
-    return users
+    return await fetch_page(
+        response, db.users, {},
+        [("created_at", -1), ("user_id", -1)],
+        {"_id": 0, "password": 0}, limit, cursor,
+        default_limit=ADMIN_USERS_PAGE_SIZE, max_limit=ADMIN_USERS_PAGE_SIZE
+    )
 
 @api_router.get("/admin/audit-logs")
-async def get_audit_logs(current_user: dict = Depends(get_current_user), limit: int = 100):
+async def get_audit_logs(response: Response, cursor: Optional[str] = None, limit: int = 100,
+                         current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    logs = await db.audit_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    return logs
+    return await fetch_page(
+        response, db.audit_logs, {},
+        [("timestamp", -1), ("log_id", -1)],
+        {"_id": 0}, limit, cursor
+    )
 
-# Analytics Endpoints
-@api_router.get("/analytics/dashboard")
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    total_requests = await db.food_requests.count_documents({})
-    completed_requests = await db.food_requests.count_documents({"status": "completed"})
-    
-    completed_list = await db.food_requests.find({"status": "completed"}, {"_id": 0}).to_list(10000)
-    total_people_fed = sum(req.get("people_count", 0) for req in completed_list)
+def export_response(collection, query: dict, sort: list, projection: dict,
+                    export_format: str, fields: list, name: str) -> StreamingResponse:
+    """Stream a query as NDJSON or CSV straight from a batched Motor cursor"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    cursor = collection.find(query, projection).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+    filename = f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{export_format}"
+    return StreamingResponse(
+        stream_export(cursor, export_format, fields),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/admin/export/users")
+async def export_users(
+    format: str = "ndjson",
+    role: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Export users (never passwords), optionally filtered by role and created_at range"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    ngo_count = await db.users.count_documents({"role": "ngo"})
-    donor_count = await db.users.count_documents({"role": "donor"})
-    volunteer_count = await db.users.count_documents({"role": "volunteer"})
+    try:
+        query = time_range_filter("created_at", date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be ISO dates or timestamps")
+    if role:
+        query["role"] = role
+    
+    response = export_response(
+        db.users, query, [("created_at", -1), ("user_id", -1)],
+        {"_id": 0, "password": 0}, format, USER_EXPORT_FIELDS, "users"
+    )
+    await log_audit("USERS_EXPORTED", current_user["user_id"], {"format": format, "role": role, "from": date_from, "to": date_to})
+    return response
+
+@api_router.get("/admin/export/audit-logs")
+async def export_audit_logs(
+    format: str = "ndjson",
+    action: Optional[str] = None,
+    user_id: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Export audit logs, optionally filtered by action, user and timestamp range"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    success_rate = (completed_requests / total_requests * 100) if total_requests > 0 else 0
+    try:
+        query = time_range_filter("timestamp", date_from, date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be ISO dates or timestamps")
+    if action:
+        query["action"] = action
+    if user_id:
+        query["user_id"] = user_id
+    
+    response = export_response(
+        db.audit_logs, query, [("timestamp", -1), ("log_id", -1)],
+        {"_id": 0}, format, AUDIT_LOG_EXPORT_FIELDS, "audit-logs"
+    )
+    await log_audit("AUDIT_LOG_EXPORTED", current_user["user_id"], {
+        "format": format, "action": action, "user_id": user_id, "from": date_from, "to": date_to
+    })
+    return response
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: dict = Depends(get_current_user)):
+    """Missing, unexpected and unused indexes compared with the registry"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    status_distribution = {}
-    for status in ["pending", "accepted_by_donor", "assigned_to_volunteer", "picked_up", "in_transit", "delivered", "completed"]:
-        count = await db.food_requests.count_documents({"status": status})
-        status_distribution[status] = count
+    return await check_indexes(db)
+
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
     return {
-        "total_requests": total_requests,
-        "completed_requests": completed_requests,
-        "total_people_fed": total_people_fed,
-        "ngo_count": ngo_count,
-        "donor_count": donor_count,
-        "volunteer_count": volunteer_count,
-        "success_rate": round(success_rate, 2),
-        "status_distribution": status_distribution
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_dispatcher": email_dispatcher.stats(),
+        "audit_buffer": audit_buffer.stats(),
+        "volunteer_roster": {"size": len(volunteer_roster), "indexed": len(volunteer_roster.index)},
+        "live_updates": live_updates.stats(),
+        "thumbnails": thumbnail_cache.stats()
     }
 
-@api_router.get("/analytics/trends")
-async def get_trends(current_user: dict = Depends(get_current_user)):
-    requests = await db.food_requests.find({"status": "completed"}, {"_id": 0}).sort("created_at", 1).to_list(10000)
+# Live Updates
+@api_router.get("/live/updates")
+async def stream_live_updates(request: Request, token: str):
+    """
+    Server-sent events for the caller's food requests (and, for donors, the
+    pending feed). The token is a query parameter because EventSource cannot
+    set an Authorization header.
+    """
+    current_user = await user_from_token(token)
+    topics = {current_user["user_id"]}
+    if current_user["role"] == "donor":
+        topics.add(DONOR_FEED_TOPIC)
+    
+    return StreamingResponse(
+        sse_events(live_updates, topics, request.is_disconnected, LIVE_UPDATES_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Analytics Endpoints
+@api_router.get("/analytics/dashboard")
+async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
+    # Seeded at startup (run_seed_job); until then this shows only recent activity
+    counters = await read_counters(db) or {}
+    return counters_to_dashboard(counters, REQUEST_STATUSES)
+
+@api_router.post("/admin/analytics/reconcile")
+async def reconcile_analytics(dry_run: bool = False, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    trends = {}
-    for req in requests:
-        try:
-            date_str = req["created_at"][:10]
-            if date_str not in trends:
-                trends[date_str] = {"date": date_str, "requests": 0, "people_fed": 0}
-            trends[date_str]["requests"] += 1
-            trends[date_str]["people_fed"] += req.get("people_count", 0)
-        except:
-            pass
+    return await reconcile_counters(db, apply=not dry_run)
+
+@api_router.post("/admin/assignments/run")
+async def run_assignments(dry_run: bool = False, current_user: dict = Depends(get_current_user)):
+    """Run the batch volunteer assignment now; dry_run returns the plan without writing"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    report = await run_batch_assignment(
+        db, volunteer_roster, dry_run=dry_run, on_assigned=on_batch_assigned,
+        find_candidates=find_candidate_volunteers, **BATCH_ASSIGNMENT_OPTIONS
+    )
+    if not dry_run:
+        await log_audit("BATCH_ASSIGNMENT_RUN", current_user["user_id"], {"assigned": report["assigned"]})
+    return report
+
+@api_router.post("/admin/urgency/recompute")
+async def recompute_urgency_scores(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    return {"trends": list(trends.values())}
+    return await recompute_urgency(db, URGENCY_CHANGE_THRESHOLD)
+
+@api_router.get("/analytics/trends")
+async def get_trends(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    granularity: str = "day",
+    current_user: dict = Depends(get_current_user)
+):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    for value in (date_from, date_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="from/to must be dates in YYYY-MM-DD format")
+    
+    trends = await read_trends(db, date_from, date_to, granularity)
+    return {"trends": trends}
 
 # Root Endpoints
 @app.get("/")
@@ -1056,11 +1745,132 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(UploadRejected)
+async def upload_rejected_handler(request, exc: UploadRejected):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+@app.exception_handler(TransitionError)
+async def transition_error_handler(request, exc: TransitionError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+@app.on_event("startup")
+async def startup_calibrate_bcrypt():
+    if BCRYPT_ROUNDS:
+        return
+    try:
+        await load_or_calibrate_rounds(db, password_hasher, BCRYPT_TARGET_MS)
+    except Exception as e:
+        # The default cost is still safe; it just isn't tuned to this host
+        logger.error(f"Failed to load bcrypt cost, keeping {password_hasher.rounds}: {str(e)}")
+
+@app.on_event("startup")
+async def startup_indexes():
+    if not ENSURE_INDEXES_ON_STARTUP:
+        return
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Failed to ensure indexes: {str(e)}")
+
+@app.on_event("startup")
+async def startup_load_caches():
+    try:
+        await volunteer_roster.load(db)
+    except Exception as e:
+        # Matching queries MongoDB directly until a retry succeeds
+        logger.error(f"Failed to load volunteer roster: {str(e)}")
+        app.state.roster_loader = asyncio.create_task(volunteer_roster.load_until_ready(db))
+    
+    if WEB_CONCURRENCY > 1 and not VOLUNTEER_ROSTER_CHANGE_STREAM:
+        logger.warning(f"Running {WEB_CONCURRENCY} workers without VOLUNTEER_ROSTER_CHANGE_STREAM; "
+                       "volunteer rosters will drift between workers")
+    if VOLUNTEER_ROSTER_CHANGE_STREAM:
+        app.state.roster_watcher = asyncio.create_task(volunteer_roster.watch(db))
+
+@app.on_event("startup")
+async def startup_live_updates():
+    if LIVE_UPDATES_CHANGE_STREAM:
+        app.state.request_watcher = asyncio.create_task(watch_food_requests(db, live_updates))
+
+@app.on_event("startup")
+async def startup_audit_buffer():
+    audit_buffer.start()
+
+@app.on_event("startup")
+async def startup_analytics_reconciliation():
+    app.state.analytics_seeder = asyncio.create_task(run_seed_job(db))
+    if ANALYTICS_RECONCILE_INTERVAL_SECONDS > 0:
+        app.state.analytics_reconciler = asyncio.create_task(
+            run_reconciliation_job(db, ANALYTICS_RECONCILE_INTERVAL_SECONDS, apply=ANALYTICS_RECONCILE_APPLY)
+        )
+
+@app.on_event("startup")
+async def startup_urgency_scheduler():
+    if URGENCY_RECOMPUTE_INTERVAL_SECONDS > 0:
+        app.state.urgency_scheduler = asyncio.create_task(
+            run_urgency_job(db, URGENCY_RECOMPUTE_INTERVAL_SECONDS, URGENCY_CHANGE_THRESHOLD)
+        )
+
+@app.on_event("startup")
+async def startup_batch_assignment():
+    if BATCH_ASSIGNMENT_INTERVAL_SECONDS > 0:
+        app.state.batch_assigner = asyncio.create_task(run_batch_assignment_job(
+            db, volunteer_roster, BATCH_ASSIGNMENT_INTERVAL_SECONDS,
+            on_assigned=on_batch_assigned, find_candidates=find_candidate_volunteers, **BATCH_ASSIGNMENT_OPTIONS
+        ))
+
+@app.on_event("startup")
+async def startup_daily_stats():
+    try:
+        if not await db.daily_stats.find_one({}, {"_id": 1}):
+            await backfill_daily_stats(db)
+    except Exception as e:
+        logger.error(f"Failed to backfill daily_stats: {str(e)}")
+
+@app.on_event("startup")
+async def startup_email_dispatcher():
+    if EMAIL_DISPATCHER_ENABLED:
+        email_dispatcher.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    roster_watcher = getattr(app.state, "roster_watcher", None)
+    if roster_watcher:
+        roster_watcher.cancel()
+    roster_loader = getattr(app.state, "roster_loader", None)
+    if roster_loader:
+        roster_loader.cancel()
+    analytics_reconciler = getattr(app.state, "analytics_reconciler", None)
+    if analytics_reconciler:
+        analytics_reconciler.cancel()
+    analytics_seeder = getattr(app.state, "analytics_seeder", None)
+    if analytics_seeder:
+        analytics_seeder.cancel()
+    request_watcher = getattr(app.state, "request_watcher", None)
+    if request_watcher:
+        request_watcher.cancel()
+    batch_assigner = getattr(app.state, "batch_assigner", None)
+    if batch_assigner:
+        batch_assigner.cancel()
+    urgency_scheduler = getattr(app.state, "urgency_scheduler", None)
+    if urgency_scheduler:
+        urgency_scheduler.cancel()
+    password_hasher.shutdown()
+    thumbnail_cache.shutdown()
+    await email_dispatcher.stop()
+    await audit_buffer.stop()
     client.close()
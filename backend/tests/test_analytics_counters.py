@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+import analytics_counters
+from analytics_counters import counters_to_dashboard, read_counters, reconcile_counters, record_status_transition
+
+
+class FakeCounters:
+    """Just enough of a Motor collection for the counter shards"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query):
+        docs = list(self.docs.values())
+
+        class Cursor:
+            async def to_list(self, length):
+                return docs
+        return Cursor()
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        for path, value in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for key in parents:
+                target = target.setdefault(key, {})
+            target[leaf] = target.get(leaf, 0) + value
+
+
+class FakeSettings:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"], **update.get("$setOnInsert", {})})
+
+
+class FakeDb:
+    def __init__(self):
+        self.analytics_counters = FakeCounters()
+        self.app_settings = FakeSettings()
+
+
+_real_sleep = asyncio.sleep
+
+
+async def fake_sleep(seconds):
+    """Skips reconcile's settle delay"""
+    await _real_sleep(0)
+
+
+def test_transitions_move_requests_between_buckets():
+    async def scenario():
+        db = FakeDb()
+        await analytics_counters.record_request_created(db)
+        await record_status_transition(db, "pending", "accepted_by_donor")
+        await record_status_transition(db, "delivered", "completed", people_count=12)
+        await record_status_transition(db, "completed", "completed", people_count=12)
+        return await read_counters(db)
+
+    counters = asyncio.run(scenario())
+    assert counters["requests_total"] == 1
+    assert counters["status.pending"] == 0
+    assert counters["status.accepted_by_donor"] == 1
+    assert counters["status.delivered"] == -1
+    assert counters["people_fed"] == 12
+
+
+def test_read_counters_without_shards():
+    assert asyncio.run(read_counters(FakeDb())) is None
+
+
+def test_counters_to_dashboard():
+    dashboard = counters_to_dashboard(
+        {"requests_total": 4, "status.completed": 1, "status.pending": 3, "people_fed": 20, "users.ngo": 2},
+        ["pending", "completed", "delivered"]
+    )
+    assert dashboard["success_rate"] == 25.0
+    assert dashboard["ngo_count"] == 2 and dashboard["volunteer_count"] == 0
+    assert dashboard["status_distribution"] == {"pending": 3, "completed": 1, "delivered": 0}
+
+
+def test_reconcile_applies_stable_drift(monkeypatch):
+    async def source(db):
+        return {"requests_total": 3, "status.pending": 3}
+    monkeypatch.setattr(analytics_counters, "aggregate_source_counters", source)
+
+    async def scenario():
+        db = FakeDb()
+        await analytics_counters.record_request_created(db)
+        report = await reconcile_counters(db, settle_seconds=0)
+        return report, await read_counters(db)
+
+    report, counters = asyncio.run(scenario())
+    assert report == {"drift": {"requests_total": 2, "status.pending": 2}, "applied": True, "stable": True}
+    assert counters == {"requests_total": 3, "status.pending": 3}
+
+
+def test_reconcile_skips_while_counters_move(monkeypatch):
+    async def source(db):
+        # An increment lands during every aggregation
+        await analytics_counters.record_request_created(db)
+        return {"requests_total": 100}
+    monkeypatch.setattr(analytics_counters, "aggregate_source_counters", source)
+
+    async def scenario():
+        db = FakeDb()
+        report = await reconcile_counters(db, settle_seconds=0, attempts=2)
+        return report, await read_counters(db)
+
+    report, counters = asyncio.run(scenario())
+    assert report["stable"] is False and report["applied"] is False
+    assert counters["requests_total"] == 2
+
+
+def test_seed_counters_folds_in_existing_data_once(monkeypatch):
+    calls = []
+
+    async def source(db):
+        calls.append(1)
+        return {"requests_total": 5, "status.pending": 5, "users.ngo": 2}
+
+    async def lease(db, name, holder, ttl_seconds):
+        return True
+    monkeypatch.setattr(analytics_counters, "aggregate_source_counters", source)
+    monkeypatch.setattr(analytics_counters, "acquire_lease", lease)
+    monkeypatch.setattr(analytics_counters.asyncio, "sleep", fake_sleep)
+
+    async def scenario():
+        db = FakeDb()
+        # Activity before the first seeding already created a shard
+        await analytics_counters.record_user_registered(db, "ngo")
+        assert await analytics_counters.seed_counters(db, "worker-1")
+        assert await analytics_counters.seed_counters(db, "worker-2")
+        return await read_counters(db)
+
+    assert asyncio.run(scenario()) == {"requests_total": 5, "status.pending": 5, "users.ngo": 2}
+    assert len(calls) == 1
+
+
+def test_seed_counters_waits_for_the_lease(monkeypatch):
+    async def lease(db, name, holder, ttl_seconds):
+        return False
+    monkeypatch.setattr(analytics_counters, "acquire_lease", lease)
+
+    db = FakeDb()
+    assert not asyncio.run(analytics_counters.seed_counters(db, "worker-2"))
+    assert db.app_settings.docs == {}
+
+
+def test_reconciliation_job_only_runs_on_the_lease_holder(monkeypatch):
+    runs = []
+    leases = iter([False, True])
+
+    async def fake_acquire_lease(db, name, holder, ttl_seconds):
+        assert name == "analytics_reconciliation"
+        return next(leases)
+
+    async def fake_reconcile(db, apply=False):
+        runs.append(apply)
+
+    sleeps = []
+
+    async def counting_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(analytics_counters, "acquire_lease", fake_acquire_lease)
+    monkeypatch.setattr(analytics_counters, "reconcile_counters", fake_reconcile)
+    monkeypatch.setattr(analytics_counters.asyncio, "sleep", counting_sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(analytics_counters.run_reconciliation_job(FakeDb(), 60, apply=True))
+    assert runs == [True]
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import audit_buffer
+from audit_buffer import DUPLICATE_KEY_ERROR, AuditBuffer
+
+_real_sleep = asyncio.sleep
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def fake_sleep(seconds):
+        await _real_sleep(0)
+    monkeypatch.setattr(audit_buffer.asyncio, "sleep", fake_sleep)
+
+
+class FakeAuditLogs:
+    """
+    insert_many with MongoDB's unordered semantics. failures is a list of
+    callables, one per call, that decide what a call does beyond inserting.
+    """
+
+    def __init__(self, failures=()):
+        self.docs = {}
+        self.calls = 0
+        self.failures = list(failures)
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = doc
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "network":
+            # Everything landed but the acknowledgement was lost
+            for doc in docs:
+                self.docs.setdefault(doc["_id"], doc)
+            raise AutoReconnect("connection reset")
+        if failure == "down":
+            raise AutoReconnect("no primary")
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": DUPLICATE_KEY_ERROR})
+            elif failure == "partial" and index % 2:
+                errors.append({"index": index, "code": 91})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def events(n):
+    return [{"action": "test", "n": i} for i in range(n)]
+
+
+def run_buffer(collection, batch, **options):
+    async def scenario():
+        buffer = AuditBuffer(collection, **options)
+        buffer.start()
+        for event in batch:
+            await buffer.log(event)
+        await buffer.stop()
+        return buffer
+    return asyncio.run(scenario())
+
+
+def test_stop_flushes_queued_events():
+    collection = FakeAuditLogs()
+    buffer = run_buffer(collection, events(7), batch_size=3, flush_interval=60)
+    assert sorted(doc["n"] for doc in collection.docs.values()) == list(range(7))
+    assert buffer.stats()["flushed"] == 7
+    assert buffer.stats()["dropped"] == 0
+
+
+def test_partial_failure_retries_only_the_missing_events():
+    collection = FakeAuditLogs(failures=["partial"])
+    buffer = run_buffer(collection, events(6), batch_size=10)
+    assert sorted(doc["n"] for doc in collection.docs.values()) == list(range(6))
+    assert collection.calls == 2
+    assert buffer.flushed == 6
+
+
+def test_lost_acknowledgement_does_not_duplicate_events():
+    collection = FakeAuditLogs(failures=["network"])
+    buffer = run_buffer(collection, events(4), batch_size=10)
+    assert len(collection.docs) == 4
+    assert collection.calls == 2
+    assert buffer.flushed == 4
+    assert buffer.dropped == 0
+
+
+def test_events_are_dropped_after_max_retries():
+    collection = FakeAuditLogs(failures=["partial", "down", "down"])
+    buffer = run_buffer(collection, events(4), batch_size=10, max_retries=3)
+    assert len(collection.docs) == 2
+    assert buffer.flushed == 2
+    assert buffer.dropped == 2
+
+
+def test_unstarted_buffer_writes_through():
+    collection = FakeAuditLogs()
+    buffer = AuditBuffer(collection)
+    asyncio.run(buffer.log({"action": "test"}))
+    assert len(collection.docs) == 1
+    assert collection.calls == 0
+
+
+def test_background_flusher_writes_full_batches():
+    collection = FakeAuditLogs()
+
+    async def scenario():
+        buffer = AuditBuffer(collection, batch_size=2, flush_interval=60)
+        buffer.start()
+        for event in events(4):
+            await buffer.log(event)
+        for _ in range(10):
+            await _real_sleep(0)
+        written = len(collection.docs)
+        await buffer.stop()
+        return written, buffer
+
+    written, buffer = asyncio.run(scenario())
+    assert written == 4
+    assert buffer.flushes == 2
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import batch_assignment
+import job_leases
+from batch_assignment import plan_assignments, plan_without_coordinates, run_batch_assignment
+from job_leases import acquire_lease
+from volunteer_roster import VolunteerRecord
+
+
+def volunteer(user_id, lat=None, lon=None, transport_mode="car", reliability_score=5.0):
+    return VolunteerRecord(user_id, user_id.title(), location="Pune", latitude=lat, longitude=lon,
+                           transport_mode=transport_mode, reliability_score=reliability_score)
+
+
+def request(request_id, lat=None, lon=None, quantity=10):
+    return {"request_id": request_id, "latitude": lat, "longitude": lon, "quantity": quantity,
+            "pickup_location": "Pune", "version": 2}
+
+
+def test_plan_assignments_takes_nearest_free_volunteer():
+    plan = plan_assignments(
+        [request("r1", 18.52, 73.85)],
+        [volunteer("far", 18.70, 73.85), volunteer("near", 18.53, 73.85), volunteer("busy", 18.52, 73.85)],
+        {"busy": 3}
+    )
+    assert [(entry["request_id"], entry["volunteer_id"], entry["version"]) for entry in plan] == [("r1", "near", 2)]
+
+
+def test_plan_assignments_gives_each_volunteer_one_request():
+    plan = plan_assignments(
+        [request("r1", 18.52, 73.85), request("r2", 18.52, 73.86)],
+        [volunteer("v1", 18.52, 73.85)],
+        {}
+    )
+    assert len(plan) == 1
+
+
+def test_plan_assignments_adds_co_volunteer_for_heavy_loads():
+    plan = plan_assignments(
+        [request("r1", 18.52, 73.85, quantity=150)],
+        [volunteer("lead", 18.52, 73.85, transport_mode="on_foot"), volunteer("helper", 18.53, 73.85)],
+        {}
+    )
+    assert len(plan) == 1
+    assert {plan[0]["volunteer_id"], plan[0]["co_volunteer_id"]} == {"lead", "helper"}
+    assert plan[0]["extra_volunteer_reason"] == "heavy_load"
+
+
+def test_plan_assignments_skips_entries_without_coordinates():
+    plan = plan_assignments([request("r1")], [volunteer("v1", 18.52, 73.85)], {})
+    assert plan == []
+    plan = plan_assignments([request("r1", 18.52, 73.85)], [volunteer("v1")], {})
+    assert plan == []
+
+
+def roster_scan(candidates):
+    """find_candidates over a fixed (volunteer, distance) list"""
+    async def find_candidates(req, exclude_ids=()):
+        return [(vol, distance) for vol, distance in candidates if vol.user_id not in exclude_ids]
+    return find_candidates
+
+
+def test_plan_without_coordinates_scores_roster_candidates():
+    find_candidates = roster_scan([(volunteer("far"), 25.0), (volunteer("near"), 2.0), (volunteer("busy"), 0.5)])
+    taken = {"planned"}
+    plan = asyncio.run(plan_without_coordinates(
+        [request("r1"), request("r2"), request("r3")], find_candidates, {"busy": 3}, taken
+    ))
+    assert [(entry["request_id"], entry["volunteer_id"]) for entry in plan] == [("r1", "near"), ("r2", "far")]
+    assert plan[0]["distance_km"] == 2.0
+    assert taken == {"planned", "near", "far"}
+
+
+def test_plan_without_coordinates_does_not_reuse_taken_volunteers():
+    find_candidates = roster_scan([(volunteer("v1"), 1.0)])
+    plan = asyncio.run(plan_without_coordinates([request("r1")], find_candidates, {}, {"v1"}))
+    assert plan == []
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeRequests:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([doc for doc in self.docs if doc.get("status") == query["status"]])
+
+
+class FakeRoster:
+    def __init__(self, records):
+        self._records = records
+
+    def records(self):
+        return iter(self._records)
+
+
+async def no_workload(db):
+    return {}
+
+
+def test_run_batch_assignment_routes_unlocated_requests_through_fallback(monkeypatch):
+    monkeypatch.setattr(batch_assignment, "active_workload", no_workload)
+    db = type("FakeDb", (), {})()
+    db.food_requests = FakeRequests([
+        {**request("located", 18.52, 73.85), "status": "accepted_by_donor"},
+        {**request("legacy"), "status": "accepted_by_donor"},
+    ])
+    near = volunteer("near", 18.52, 73.85)
+    roster = FakeRoster([near, volunteer("unplaced")])
+    find_candidates = roster_scan([(near, 0.0), (volunteer("unplaced"), 3.0)])
+
+    report = asyncio.run(run_batch_assignment(db, roster, dry_run=True, find_candidates=find_candidates))
+
+    assert {entry["request_id"]: entry["volunteer_id"] for entry in report["plan"]} == {
+        "located": "near", "legacy": "unplaced"
+    }
+    assert report["without_coordinates"] == 1
+    assert report["volunteers_without_coordinates"] == 1
+
+    report = asyncio.run(run_batch_assignment(db, roster, dry_run=True))
+    assert [entry["request_id"] for entry in report["plan"]] == ["located"]
+    assert report["without_coordinates"] == 1
+
+
+class FakeLeases:
+    """Just enough of find_one_and_update for acquire_lease's filter"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+        elif not any(doc.get("holder") == clause["holder"] if "holder" in clause
+                     else doc["expires_at"] <= clause["expires_at"]["$lte"] for clause in query["$or"]):
+            raise DuplicateKeyError("duplicate key")
+        doc.update(update["$set"])
+        return dict(doc)
+
+
+@pytest.fixture
+def lease_db():
+    db = type("FakeDb", (), {})()
+    db.job_leases = FakeLeases()
+    return db
+
+
+def test_lease_is_exclusive_until_it_expires(lease_db):
+    async def scenario():
+        first = await acquire_lease(lease_db, "batch_assignment", "worker-a", 60)
+        second = await acquire_lease(lease_db, "batch_assignment", "worker-b", 60)
+        renewed = await acquire_lease(lease_db, "batch_assignment", "worker-a", 60)
+        other_job = await acquire_lease(lease_db, "urgency_scheduler", "worker-b", 60)
+        return first, second, renewed, other_job
+
+    assert asyncio.run(scenario()) == (True, False, True, True)
+
+
+def test_expired_lease_is_taken_over(lease_db):
+    async def scenario():
+        await acquire_lease(lease_db, "batch_assignment", "worker-a", -1)
+        return await acquire_lease(lease_db, "batch_assignment", "worker-b", 60)
+
+    assert asyncio.run(scenario()) is True
+    assert lease_db.job_leases.docs["batch_assignment"]["holder"] == "worker-b"
+
+
+def test_lease_holder_ids_are_unique():
+    assert job_leases.lease_holder_id() != job_leases.lease_holder_id()
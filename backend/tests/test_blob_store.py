@@ -0,0 +1,176 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from blob_store import LocalBlobStore, collect_garbage, put_blob, release_blob
+from upload_pipeline import stage_bytes
+
+
+def matches(doc, query):
+    """The subset of MongoDB query syntax the stores under test use"""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$lte" and (value is None or value > operand):
+                return False
+            if op == "$gt" and (value is None or value <= operand):
+                return False
+            if op == "$in" and value not in operand:
+                return False
+    return True
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeBlobs:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if isinstance(update, list):
+            # release_blob's pipeline: refs - 1, released_at once unreferenced
+            if doc is None or not matches(doc, query):
+                return UpdateResult(0)
+            doc["refs"] -= 1
+            if doc["refs"] <= 0:
+                doc["released_at"] = update[0]["$set"]["released_at"]["$cond"][1]
+            return UpdateResult(1)
+        if doc is None:
+            if not upsert:
+                return UpdateResult(0)
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+        elif not matches(doc, query):
+            if upsert:
+                raise DuplicateKeyError("duplicate key")
+            return UpdateResult(0)
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        return UpdateResult(1)
+
+    def find(self, query, projection=None):
+        docs = [dict(doc) for doc in self.docs.values() if matches(doc, query)]
+
+        async def iterate():
+            for doc in docs:
+                yield doc
+        return iterate()
+
+    async def delete_one(self, query):
+        if query["_id"] in self.docs and matches(self.docs[query["_id"]], query):
+            del self.docs[query["_id"]]
+
+
+class FakeDb:
+    def __init__(self):
+        self.blobs = FakeBlobs()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(str(tmp_path / "blobs"))
+
+
+def stage(store, data=b"delivery photo"):
+    return asyncio.run(stage_bytes(data, store.staging_dir, "jpg"))
+
+
+def test_same_content_is_stored_once_and_counted(store):
+    db = FakeDb()
+    first, second = stage(store), stage(store)
+    key = asyncio.run(put_blob(db, store, first))
+    assert asyncio.run(put_blob(db, store, second)) == key
+
+    assert db.blobs.docs[key]["refs"] == 2
+    assert os.path.exists(store.local_path(key))
+    assert not os.path.exists(first.path) and not os.path.exists(second.path)
+
+
+def test_unreferenced_blobs_are_collected_after_grace(store):
+    db = FakeDb()
+    kept = asyncio.run(put_blob(db, store, stage(store, b"kept")))
+    key = asyncio.run(put_blob(db, store, stage(store)))
+    asyncio.run(release_blob(db, key))
+    asyncio.run(release_blob(db, key))
+    assert db.blobs.docs[key]["refs"] == 0
+
+    assert asyncio.run(collect_garbage(db, store, grace_seconds=3600)) == 0
+    deleted = []
+
+    async def on_delete(blob_key):
+        deleted.append(blob_key)
+
+    assert asyncio.run(collect_garbage(db, store, grace_seconds=-1, on_delete=on_delete)) == 1
+    assert deleted == [key]
+    assert key not in db.blobs.docs
+    assert not os.path.exists(store.local_path(key))
+    assert os.path.exists(store.local_path(kept))
+
+
+def test_stale_tombstone_is_taken_over(store):
+    db = FakeDb()
+    key = asyncio.run(put_blob(db, store, stage(store)))
+    long_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    db.blobs.docs[key].update(refs=0, state="deleting", deleting_at=long_ago, released_at=long_ago)
+
+    asyncio.run(put_blob(db, store, stage(store)))
+
+    doc = db.blobs.docs[key]
+    assert doc["refs"] == 1
+    assert "state" not in doc and "released_at" not in doc
+
+
+def test_put_blob_waits_for_a_live_collector(store):
+    db = FakeDb()
+    key = asyncio.run(put_blob(db, store, stage(store)))
+    db.blobs.docs[key].update(refs=0, state="deleting", deleting_at=datetime.now(timezone.utc).isoformat())
+    staged = stage(store)
+
+    async def scenario():
+        async def finish_collecting():
+            await asyncio.sleep(0.05)
+            await store.delete(key)
+            await db.blobs.delete_one({"_id": key, "state": "deleting"})
+
+        collector = asyncio.create_task(finish_collecting())
+        await put_blob(db, store, staged, retry_delay=0.01)
+        await collector
+
+    asyncio.run(scenario())
+    assert db.blobs.docs[key]["refs"] == 1
+    assert os.path.exists(store.local_path(key))
+
+
+def test_failed_store_gives_back_its_reference(store, monkeypatch):
+    db = FakeDb()
+    staged = stage(store)
+
+    async def broken_put_file(key, source_path, content_type):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "put_file", broken_put_file)
+    with pytest.raises(OSError):
+        asyncio.run(put_blob(db, store, staged))
+
+    assert db.blobs.docs[staged.sha256]["refs"] == 0
+    assert "released_at" in db.blobs.docs[staged.sha256]
+    assert not os.path.exists(staged.path)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from daily_stats import bucket_for, read_trends, record_completion
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeDailyStats:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], **update.get("$setOnInsert", {})})
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+
+    def find(self, query):
+        bounds = query.get("_id", {})
+        return FakeCursor([
+            dict(doc) for day, doc in self.docs.items()
+            if day >= bounds.get("$gte", day) and day <= bounds.get("$lte", day)
+        ])
+
+
+class FakeDb:
+    def __init__(self):
+        self.daily_stats = FakeDailyStats()
+
+
+@pytest.mark.parametrize("granularity, expected", [
+    ("day", "2026-03-04"),
+    ("week", "2026-03-02"),
+    ("month", "2026-03"),
+])
+def test_bucket_for(granularity, expected):
+    assert bucket_for("2026-03-04", granularity) == expected
+
+
+def test_completions_roll_up_by_creation_day():
+    db = FakeDb()
+
+    async def scenario():
+        await record_completion(db, "2026-03-02T09:00:00+00:00", 10)
+        await record_completion(db, "2026-03-02T18:30:00+00:00", None)
+        await record_completion(db, "2026-03-04T08:00:00+00:00", 5)
+
+    asyncio.run(scenario())
+    assert db.daily_stats.docs["2026-03-02"] == {"_id": "2026-03-02", "date": "2026-03-02",
+                                                 "requests": 2, "people_fed": 10}
+    assert db.daily_stats.docs["2026-03-04"]["requests"] == 1
+
+
+def test_read_trends_buckets_and_bounds():
+    db = FakeDb()
+    db.daily_stats.docs = {
+        "2026-02-27": {"_id": "2026-02-27", "requests": 1, "people_fed": 4},
+        "2026-03-02": {"_id": "2026-03-02", "requests": 2, "people_fed": 10},
+        "2026-03-04": {"_id": "2026-03-04", "requests": 1, "people_fed": 5},
+        "garbage": {"_id": "garbage", "requests": 9, "people_fed": 9},
+    }
+
+    assert asyncio.run(read_trends(db, granularity="week")) == [
+        {"date": "2026-02-23", "requests": 1, "people_fed": 4},
+        {"date": "2026-03-02", "requests": 3, "people_fed": 15},
+    ]
+    assert asyncio.run(read_trends(db, date_from="2026-03-01", date_to="2026-03-03")) == [
+        {"date": "2026-03-02", "requests": 2, "people_fed": 10},
+    ]
+    assert asyncio.run(read_trends(db, date_to="2026-03-31", granularity="month")) == [
+        {"date": "2026-02", "requests": 1, "people_fed": 4},
+        {"date": "2026-03", "requests": 3, "people_fed": 15},
+    ]
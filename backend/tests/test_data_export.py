@@ -0,0 +1,66 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+from data_export import stream_csv, stream_export, stream_ndjson, time_range_filter
+
+
+async def documents(docs):
+    for doc in docs:
+        yield doc
+
+
+def collect(stream):
+    async def read():
+        return [chunk async for chunk in stream]
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("date_from, date_to, expected", [
+    (None, None, {}),
+    ("2026-03-01", None, {"created_at": {"$gte": "2026-03-01"}}),
+    (None, "2026-03-31", {"created_at": {"$lt": "2026-04-01"}}),
+    ("2026-03-01", "2026-03-31T12:00:00+00:00",
+     {"created_at": {"$gte": "2026-03-01", "$lte": "2026-03-31T12:00:00+00:00"}}),
+])
+def test_time_range_filter(date_from, date_to, expected):
+    assert time_range_filter("created_at", date_from, date_to) == expected
+
+
+def test_ndjson_chunks_one_document_per_line():
+    docs = [{"n": i, "details": {"ok": True}} for i in range(5)]
+    chunks = collect(stream_ndjson(documents(docs), chunk_rows=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines] == docs
+
+
+def test_csv_has_header_and_flattens_values():
+    docs = [
+        {"log_id": "l1", "action": "login", "details": {"ip": "10.0.0.1"}, "extra": "ignored"},
+        {"log_id": "l2", "action": None},
+        {"log_id": "l3", "action": "logout, forced"},
+    ]
+    chunks = collect(stream_csv(documents(docs), ["log_id", "action", "details"], chunk_rows=2))
+    assert len(chunks) == 2
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows == [
+        ["log_id", "action", "details"],
+        ["l1", "login", '{"ip":"10.0.0.1"}'],
+        ["l2", "", ""],
+        ["l3", "logout, forced", ""],
+    ]
+
+
+def test_empty_exports():
+    assert collect(stream_ndjson(documents([]))) == []
+    assert collect(stream_csv(documents([]), ["a", "b"])) == [b"a,b\r\n"]
+
+
+def test_stream_export_picks_the_format():
+    docs = [{"a": 1}]
+    assert collect(stream_export(documents(docs), "csv", ["a"])) == [b"a\r\n1\r\n"]
+    assert collect(stream_export(documents(docs), "ndjson", ["a"])) == [b'{"a":1}\n']
@@ -0,0 +1,35 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from delivery_photos import decode_photo, encode_photo
+from upload_pipeline import UploadRejected
+
+
+def test_decode_photo_plain_and_data_url():
+    encoded = base64.b64encode(b"photo bytes").decode()
+    assert decode_photo(encoded, 1024) == b"photo bytes"
+    assert decode_photo(f"data:image/jpeg;base64,{encoded}", 1024) == b"photo bytes"
+
+
+@pytest.mark.parametrize("data, status_code", [
+    ("not base64!", 400),
+    ("", 400),
+    (base64.b64encode(b"x" * 2048).decode(), 413),
+])
+def test_decode_photo_rejects(data, status_code):
+    with pytest.raises(UploadRejected) as rejected:
+        decode_photo(data, 1024)
+    assert rejected.value.status_code == status_code
+
+
+def test_encode_photo_bounds_size():
+    raw = io.BytesIO()
+    Image.new("RGBA", (3000, 1500), "red").save(raw, "PNG")
+    photo, thumbnail = encode_photo(raw.getvalue(), max_size=800, thumbnail_size=100)
+    with Image.open(io.BytesIO(photo)) as img:
+        assert img.format == "JPEG" and img.size == (800, 400)
+    with Image.open(io.BytesIO(thumbnail)) as img:
+        assert img.format == "JPEG" and img.size == (100, 50)
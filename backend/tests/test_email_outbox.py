@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from email_outbox import EmailDispatcher, enqueue_email
+from email_service import FakeTransport
+from tests.test_blob_store import matches
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def update_many(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                self._apply(doc, update)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                self._apply(doc, update)
+                return
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            await self.update_one(op._filter, op._doc)
+
+    def by_id(self, outbox_id):
+        return next(doc for doc in self.docs if doc["outbox_id"] == outbox_id)
+
+
+class FakeDb:
+    def __init__(self):
+        self.email_outbox = FakeOutbox()
+
+
+class FailingTransport:
+    async def send(self, message):
+        raise ConnectionError("smtp down")
+
+
+def welcome(db, to="a@example.com"):
+    return asyncio.run(enqueue_email(db, "welcome", to, {"user_name": "Asha", "role": "ngo"}))
+
+
+def test_claims_are_exclusive():
+    db = FakeDb()
+    ids = {welcome(db, f"{n}@example.com") for n in range(3)}
+    first = EmailDispatcher(db, FakeTransport())
+    second = EmailDispatcher(db, FakeTransport())
+
+    claimed = asyncio.run(first._claim_batch())
+    assert {doc["outbox_id"] for doc in claimed} == ids
+    assert all(doc["status"] == "sending" and doc["attempts"] == 1 for doc in claimed)
+    assert asyncio.run(second._claim_batch()) == []
+
+
+def test_expired_lease_is_claimed_again():
+    db = FakeDb()
+    outbox_id = welcome(db)
+    asyncio.run(EmailDispatcher(db, FakeTransport(), lease_seconds=-1)._claim_batch())
+
+    claimed = asyncio.run(EmailDispatcher(db, FakeTransport())._claim_batch())
+    assert [doc["outbox_id"] for doc in claimed] == [outbox_id]
+    assert claimed[0]["attempts"] == 2
+
+
+def test_backed_off_messages_wait():
+    db = FakeDb()
+    outbox_id = welcome(db)
+    later = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+    db.email_outbox.by_id(outbox_id)["next_attempt_at"] = later
+    assert asyncio.run(EmailDispatcher(db, FakeTransport())._claim_batch()) == []
+
+
+def test_sent_messages_are_recorded():
+    db = FakeDb()
+    ids = [welcome(db, f"{n}@example.com") for n in range(2)]
+    transport = FakeTransport()
+    dispatcher = EmailDispatcher(db, transport)
+
+    asyncio.run(dispatcher.dispatch(asyncio.run(dispatcher._claim_batch())))
+
+    assert len(transport.sent) == 2
+    for outbox_id in ids:
+        doc = db.email_outbox.by_id(outbox_id)
+        assert doc["status"] == "sent" and doc["email_id"].startswith("fake-")
+        assert "claim_id" not in doc and "lease_expires_at" not in doc
+    assert dispatcher.sent == 2
+
+
+def test_failures_back_off_exponentially_then_give_up():
+    db = FakeDb()
+    outbox_id = welcome(db)
+    dispatcher = EmailDispatcher(db, FailingTransport(), max_attempts=3, base_backoff_seconds=10)
+    doc = db.email_outbox.by_id(outbox_id)
+
+    for attempts, backoff in [(1, 10), (2, 20)]:
+        before = datetime.now(timezone.utc)
+        doc["next_attempt_at"] = before.isoformat()
+        asyncio.run(dispatcher.dispatch(asyncio.run(dispatcher._claim_batch())))
+        assert doc["status"] == "pending" and doc["attempts"] == attempts
+        delay = (datetime.fromisoformat(doc["next_attempt_at"]) - before).total_seconds()
+        assert backoff * 0.8 <= delay <= backoff * 1.2 + 1
+        assert "claim_id" not in doc
+
+    doc["next_attempt_at"] = datetime.now(timezone.utc).isoformat()
+    asyncio.run(dispatcher.dispatch(asyncio.run(dispatcher._claim_batch())))
+    assert doc["status"] == "failed"
+    assert (dispatcher.retried, dispatcher.failed) == (2, 1)
+
+
+def test_unrenderable_messages_fail_without_retry():
+    db = FakeDb()
+    outbox_id = asyncio.run(enqueue_email(db, "no_such_kind", "a@example.com", {}))
+    dispatcher = EmailDispatcher(db, FakeTransport())
+    asyncio.run(dispatcher.dispatch(asyncio.run(dispatcher._claim_batch())))
+    doc = db.email_outbox.by_id(outbox_id)
+    assert doc["status"] == "failed" and doc["attempts"] == 1
+    assert doc["last_error"].startswith("render error")
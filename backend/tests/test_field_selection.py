@@ -0,0 +1,24 @@
+import pytest
+
+from field_selection import parse_fields, projection_for
+
+ALLOWED = ("request_id", "status", "urgency_score", "delivery_photo_url")
+
+
+def test_parse_fields_keeps_order_and_drops_duplicates():
+    assert parse_fields(" status, request_id,status,,", ALLOWED) == ["status", "request_id"]
+
+
+@pytest.mark.parametrize("fields", ["", " , ", "status,password_hash"])
+def test_parse_fields_rejects(fields):
+    with pytest.raises(ValueError):
+        parse_fields(fields, ALLOWED)
+
+
+def test_projection_for_derived_and_kept_fields():
+    projection = projection_for(
+        ["status", "delivery_photo_url"],
+        derived={"delivery_photo_url": ("request_id", "delivery_photo_blob")},
+        keep=["created_at"]
+    )
+    assert projection == {"_id": 0, "status": 1, "request_id": 1, "delivery_photo_blob": 1, "created_at": 1}
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pytest
+
+from geo_utlis import (coords_to_arrays, filter_within_radius, find_nearest_item, haversine_distance,
+                       haversine_matrix, haversine_pairs, haversine_vector, nearest_k, sort_by_distance)
+
+DELHI = (28.6139, 77.2090)
+MUMBAI = (19.0760, 72.8777)
+PUNE = (18.5204, 73.8567)
+
+rng = np.random.default_rng(7)
+POINTS = np.column_stack([rng.uniform(8, 35, 40), rng.uniform(68, 97, 40)])
+
+
+def scalar(a, b):
+    return haversine_distance(a[0], a[1], b[0], b[1])
+
+
+def test_haversine_distance_known_value():
+    assert scalar(DELHI, MUMBAI) == pytest.approx(1153, abs=5)
+    assert scalar(DELHI, DELHI) == 0
+
+
+def test_coords_to_arrays_accepts_every_shape():
+    as_array = coords_to_arrays(np.array([DELHI, MUMBAI]))
+    as_pairs = coords_to_arrays([DELHI, MUMBAI])
+    as_dicts = coords_to_arrays([{"lat": DELHI[0], "lon": DELHI[1]}, {"lat": MUMBAI[0], "lon": MUMBAI[1]}],
+                                "lat", "lon")
+    for lats, lons in (as_array, as_pairs, as_dicts):
+        assert lats.tolist() == [DELHI[0], MUMBAI[0]]
+        assert lons.tolist() == [DELHI[1], MUMBAI[1]]
+
+    lats, lons = coords_to_arrays([{"latitude": 1.0}, (None, 2.0)])
+    assert np.isnan(lats).all() and np.isnan(lons).all()
+
+
+def test_vector_kernels_match_the_scalar_formula():
+    points = [tuple(p) for p in POINTS]
+    expected_vector = [scalar(DELHI, p) for p in points]
+    assert np.round(haversine_vector(*DELHI, POINTS), 2).tolist() == pytest.approx(expected_vector, abs=0.011)
+
+    matrix = haversine_matrix(POINTS[:5], POINTS)
+    assert matrix.shape == (5, 40)
+    for i in range(5):
+        assert np.round(matrix[i], 2).tolist() == pytest.approx([scalar(points[i], p) for p in points], abs=0.011)
+
+    pairs = haversine_pairs(POINTS[:20], POINTS[20:])
+    assert np.round(pairs, 2).tolist() == pytest.approx(
+        [scalar(a, b) for a, b in zip(points[:20], points[20:])], abs=0.011
+    )
+
+
+def test_missing_coordinates_are_nan():
+    distances = haversine_vector(*DELHI, [{"latitude": None, "longitude": None}, {"latitude": 1, "longitude": 1}])
+    assert math.isnan(distances[0]) and not math.isnan(distances[1])
+
+
+@pytest.mark.parametrize("k", [1, 5, 40, 100])
+def test_nearest_k_matches_a_full_sort(k):
+    indices, distances = nearest_k(*PUNE, POINTS, k)
+    full = haversine_vector(*PUNE, POINTS)
+    expected = np.argsort(full, kind="stable")[:k]
+    assert indices.tolist() == expected.tolist()
+    assert distances.tolist() == full[expected].tolist()
+
+
+def test_nearest_k_skips_points_without_coordinates():
+    points = [{"latitude": None, "longitude": None}, {"latitude": PUNE[0], "longitude": PUNE[1]}]
+    indices, _ = nearest_k(*PUNE, points, 2)
+    assert indices.tolist() == [1]
+    assert nearest_k(*PUNE, points[:1], 3)[0].size == 0
+
+
+def test_filter_within_radius_keeps_input_order():
+    indices, distances = filter_within_radius(*PUNE, [MUMBAI, DELHI, PUNE], 200)
+    assert indices.tolist() == [0, 2]
+    assert (distances <= 200).all()
+
+
+def test_sort_by_distance_puts_unlocated_items_last():
+    items = [
+        {"name": "nowhere"},
+        {"name": "delhi", "latitude": DELHI[0], "longitude": DELHI[1]},
+        {"name": "mumbai", "latitude": MUMBAI[0], "longitude": MUMBAI[1]},
+    ]
+    assert [item["name"] for item in sort_by_distance(items, *PUNE)] == ["mumbai", "delhi", "nowhere"]
+    assert find_nearest_item(items, *PUNE)["name"] == "mumbai"
+    assert find_nearest_item(items[:1], *PUNE)["name"] == "nowhere"
+    assert find_nearest_item([], *PUNE) is None
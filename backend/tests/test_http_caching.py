@@ -0,0 +1,56 @@
+import pytest
+
+from http_caching import RangeNotSatisfiable, http_date, is_not_modified, parse_range, quote_etag
+
+ETAG = quote_etag("abc")
+MODIFIED = 1_700_000_000.0
+
+
+def test_if_none_match():
+    assert is_not_modified({"if-none-match": ETAG}, ETAG, MODIFIED)
+    assert is_not_modified({"if-none-match": f'"other", W/{ETAG}'}, ETAG, MODIFIED)
+    assert is_not_modified({"if-none-match": "*"}, ETAG, MODIFIED)
+    assert not is_not_modified({"if-none-match": '"other"'}, ETAG, MODIFIED)
+
+
+def test_if_modified_since():
+    assert is_not_modified({"if-modified-since": http_date(MODIFIED)}, ETAG, MODIFIED)
+    assert not is_not_modified({"if-modified-since": http_date(MODIFIED - 60)}, ETAG, MODIFIED)
+    assert not is_not_modified({"if-modified-since": "yesterday"}, ETAG, MODIFIED)
+    assert not is_not_modified({}, ETAG, MODIFIED)
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    headers = {"if-none-match": '"other"', "if-modified-since": http_date(MODIFIED)}
+    assert not is_not_modified(headers, ETAG, MODIFIED)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+])
+def test_parse_range(header, expected):
+    assert parse_range({"range": header}, 1000, ETAG, MODIFIED) == expected
+
+
+@pytest.mark.parametrize("header", [None, "items=0-1", "bytes=0-1,5-6", "bytes=5", "bytes=9-3", "bytes=a-b"])
+def test_parse_range_serves_whole_file(header):
+    headers = {"range": header} if header else {}
+    assert parse_range(headers, 1000, ETAG, MODIFIED) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range({"range": header}, 1000, ETAG, MODIFIED)
+
+
+def test_if_range():
+    assert parse_range({"range": "bytes=0-9", "if-range": ETAG}, 1000, ETAG, MODIFIED) == (0, 9)
+    assert parse_range({"range": "bytes=0-9", "if-range": http_date(MODIFIED)}, 1000, ETAG, MODIFIED) == (0, 9)
+    assert parse_range({"range": "bytes=0-9", "if-range": '"stale"'}, 1000, ETAG, MODIFIED) is None
+    # Weak validators never allow a partial response
+    assert parse_range({"range": "bytes=0-9", "if-range": f"W/{ETAG}"}, 1000, ETAG, MODIFIED) is None
@@ -0,0 +1,119 @@
+import asyncio
+
+from live_updates import (DONOR_FEED_TOPIC, LiveUpdateHub, format_sse, publish_request_update, sse_events,
+                          watch_food_requests)
+from tests.test_volunteer_roster import FakeStream
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_publish_deduplicates_and_excludes():
+    hub = LiveUpdateHub()
+    both = hub.subscribe(["ngo-1", DONOR_FEED_TOPIC])
+    feed_only = hub.subscribe([DONOR_FEED_TOPIC])
+    hub.publish(["ngo-1", DONOR_FEED_TOPIC], {"type": "a"})
+    hub.publish([DONOR_FEED_TOPIC], {"type": "b"}, exclude=["ngo-1"])
+    assert drain(both) == [{"type": "a"}]
+    assert drain(feed_only) == [{"type": "a"}, {"type": "b"}]
+
+
+def test_slow_subscriber_gets_resync():
+    hub = LiveUpdateHub(queue_size=2)
+    queue = hub.subscribe(["u"])
+    for i in range(3):
+        hub.publish(["u"], {"type": "x", "i": i})
+    assert drain(queue) == [{"type": "resync"}]
+    assert hub.stats()["resyncs"] == 1
+
+    hub.unsubscribe(["u"], queue)
+    assert hub.stats()["topics"] == 0
+
+
+def test_leaving_pending_sends_donor_feed_only_the_status():
+    hub = LiveUpdateHub()
+    ngo = hub.subscribe(["ngo-1"])
+    donor = hub.subscribe(["donor-1", DONOR_FEED_TOPIC])
+    other_donor = hub.subscribe(["donor-2", DONOR_FEED_TOPIC])
+    changes = {"status": "accepted_by_donor", "donor_id": "donor-1", "donor_name": "D", "version": 1}
+    doc = {"request_id": "r1", "ngo_id": "ngo-1", **changes}
+
+    publish_request_update(hub, doc, changes, left_pending=True, previous_status="pending")
+
+    full = {"type": "request.updated", "request_id": "r1", "changes": changes, "previous_status": "pending"}
+    assert drain(ngo) == [full]
+    assert drain(donor) == [full]
+    assert drain(other_donor) == [{"type": "request.updated", "request_id": "r1",
+                                   "changes": {"status": "accepted_by_donor"}, "previous_status": "pending"}]
+
+
+def test_pending_and_assigned_changes():
+    hub = LiveUpdateHub()
+    feed = hub.subscribe([DONOR_FEED_TOPIC])
+    volunteer = hub.subscribe(["vol-1"])
+
+    publish_request_update(hub, {"request_id": "r1", "ngo_id": "n", "status": "pending"},
+                           {"quantity": 5}, left_pending=False)
+    assert [event["changes"] for event in drain(feed)] == [{"quantity": 5}]
+
+    changes = {"status": "picked_up", "volunteer_id": "vol-1"}
+    publish_request_update(hub, {"request_id": "r1", "ngo_id": "n", **changes}, changes, left_pending=False)
+    assert drain(feed) == []
+    assert [event["changes"] for event in drain(volunteer)] == [changes]
+
+
+def test_sse_events_stream_and_unsubscribe():
+    async def scenario():
+        hub = LiveUpdateHub()
+        disconnected = asyncio.Event()
+
+        async def is_disconnected():
+            return disconnected.is_set()
+
+        stream = sse_events(hub, {"u"}, is_disconnected, keepalive_seconds=0.01)
+        assert await stream.__anext__() == ": connected\n\n"
+        hub.publish(["u"], {"type": "request.updated", "request_id": "r1"})
+        first = await stream.__anext__()
+        assert await stream.__anext__() == ": keepalive\n\n"
+        disconnected.set()
+        remaining = [chunk async for chunk in stream]
+        return first, remaining, hub.stats()
+
+    first, remaining, stats = asyncio.run(scenario())
+    assert first == format_sse({"type": "request.updated", "request_id": "r1"})
+    assert first.startswith("event: request.updated\ndata: ")
+    assert remaining == []
+    assert stats["connections"] == 0
+
+
+def test_watch_drops_a_token_that_cannot_resume():
+    change = {"_id": "token-1", "operationType": "insert",
+              "fullDocument": {"request_id": "r1", "ngo_id": "ngo-1", "status": "pending"}}
+    streams = [([change], ConnectionError("reset")), (None, RuntimeError("ChangeStreamHistoryLost"))]
+    resumed_from = []
+
+    class FakeRequests:
+        def watch(self, pipeline, full_document=None, resume_after=None):
+            resumed_from.append(resume_after)
+            if not streams:
+                raise asyncio.CancelledError()
+            changes, error = streams.pop(0)
+            if changes is None:
+                raise error
+            return FakeStream(changes, error)
+
+    class FakeDb:
+        food_requests = FakeRequests()
+
+    hub = LiveUpdateHub()
+    ngo = hub.subscribe(["ngo-1"])
+    try:
+        asyncio.run(watch_food_requests(FakeDb(), hub, retry_delay=0))
+    except asyncio.CancelledError:
+        pass
+    assert resumed_from == [None, "token-1", None]
+    assert [event["type"] for event in drain(ngo)] == ["request.created", "resync"]
@@ -0,0 +1,35 @@
+import pytest
+
+from pagination import clamp_page_size, decode_cursor, encode_cursor, keyset_filter
+
+
+def test_cursor_round_trip():
+    values = ["2024-05-01T10:00:00+00:00", 4.5, "req-1"]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 3) == values
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor({"a": 1}), encode_cursor([1, 2])])
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+
+
+def test_keyset_filter_descending():
+    assert keyset_filter([("created_at", -1), ("request_id", -1)], ["t", "r"]) == {"$or": [
+        {"created_at": {"$lt": "t"}},
+        {"created_at": "t", "request_id": {"$lt": "r"}},
+    ]}
+
+
+def test_keyset_filter_mixed_directions():
+    assert keyset_filter([("urgency_score", -1), ("request_id", 1)], [7.5, "r"]) == {"$or": [
+        {"urgency_score": {"$lt": 7.5}},
+        {"urgency_score": 7.5, "request_id": {"$gt": "r"}},
+    ]}
+
+
+@pytest.mark.parametrize("limit, expected", [(None, 50), (0, 1), (-3, 1), (20, 20), (500, 200)])
+def test_clamp_page_size(limit, expected):
+    assert clamp_page_size(limit, 50, 200) == expected
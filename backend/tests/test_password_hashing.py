@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from password_hashing import (BCRYPT_SETTINGS_ID, MIN_BCRYPT_ROUNDS, PasswordHasher, PasswordHasherBusy,
+                              get_bcrypt_rounds, load_or_calibrate_rounds)
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(max_workers=1)
+    yield hasher
+    hasher.shutdown()
+
+
+class FakeSettings:
+    def __init__(self, docs=None):
+        self.docs = docs or {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"], **update["$setOnInsert"]})
+
+
+class FakeDb:
+    def __init__(self, docs=None):
+        self.app_settings = FakeSettings(docs)
+
+
+@pytest.mark.parametrize("hashed, rounds", [
+    ("$2b$12$abcdefghijklmnopqrstuv", 12),
+    ("$2b$14$abcdefghijklmnopqrstuv", 14),
+    ("plain", None),
+    (None, None),
+])
+def test_get_bcrypt_rounds(hashed, rounds):
+    assert get_bcrypt_rounds(hashed) == rounds
+
+
+def test_rounds_never_go_below_the_floor(hasher):
+    hasher.set_rounds(4)
+    assert hasher.rounds == MIN_BCRYPT_ROUNDS
+
+
+def test_needs_rehash_only_upgrades(hasher):
+    hasher.set_rounds(13)
+    assert hasher.needs_rehash("$2b$12$abcdefghijklmnopqrstuv")
+    assert not hasher.needs_rehash("$2b$13$abcdefghijklmnopqrstuv")
+    assert not hasher.needs_rehash("$2b$14$abcdefghijklmnopqrstuv")
+    assert hasher.needs_rehash("not a hash")
+
+
+def test_verify_and_rehash(hasher):
+    async def scenario():
+        hashed = await hasher.hash("s3cret")
+        wrong = await hasher.verify_and_rehash("guess", hashed)
+        current = await hasher.verify_and_rehash("s3cret", hashed)
+        hasher.set_rounds(13)
+        upgraded = await hasher.verify_and_rehash("s3cret", hashed)
+        return hashed, wrong, current, upgraded
+
+    hashed, wrong, current, upgraded = asyncio.run(scenario())
+    assert get_bcrypt_rounds(hashed) == 12
+    assert wrong == (False, None)
+    assert current == (True, None)
+    assert upgraded[0] is True and get_bcrypt_rounds(upgraded[1]) == 13
+
+
+def test_full_queue_sheds_load():
+    hasher = PasswordHasher(queue_limit=0)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            asyncio.run(hasher.hash("s3cret"))
+    finally:
+        hasher.shutdown()
+
+
+def test_calibrate_stays_within_bounds(hasher):
+    assert hasher.calibrate(target_ms=0) == MIN_BCRYPT_ROUNDS
+    assert hasher.calibrate(target_ms=float("inf"), max_rounds=14) == 14
+    assert hasher.rounds == 14
+
+
+def test_stored_rounds_are_shared(hasher, monkeypatch):
+    monkeypatch.setattr(hasher, "calibrate", lambda target_ms: pytest.fail("calibrated again"))
+    db = FakeDb({BCRYPT_SETTINGS_ID: {"_id": BCRYPT_SETTINGS_ID, "rounds": 13}})
+    assert asyncio.run(load_or_calibrate_rounds(db, hasher, target_ms=250)) == 13
+
+
+def test_first_worker_calibrates_and_stores(hasher, monkeypatch):
+    monkeypatch.setattr(hasher, "calibrate", lambda target_ms: 14)
+    db = FakeDb()
+    assert asyncio.run(load_or_calibrate_rounds(db, hasher, target_ms=250)) == 14
+    assert db.app_settings.docs[BCRYPT_SETTINGS_ID]["rounds"] == 14
@@ -0,0 +1,28 @@
+from request_transitions import REQUEST_STATUSES, STATUS_TIMESTAMPS, TRANSITIONS, can_transition, sources_for
+
+
+def test_every_status_has_transitions():
+    assert set(TRANSITIONS) == set(REQUEST_STATUSES)
+    for targets in TRANSITIONS.values():
+        assert set(targets) <= set(REQUEST_STATUSES)
+
+
+def test_transitions_only_move_forward():
+    for from_status, targets in TRANSITIONS.items():
+        for to_status in targets:
+            assert REQUEST_STATUSES.index(to_status) > REQUEST_STATUSES.index(from_status)
+
+
+def test_every_status_but_pending_is_reachable_and_timestamped():
+    for status in REQUEST_STATUSES[1:]:
+        assert sources_for(status)
+        assert status in STATUS_TIMESTAMPS
+    assert sources_for("pending") == []
+
+
+def test_can_transition():
+    assert can_transition("pending", "assigned_to_volunteer")
+    assert can_transition("picked_up", "delivered")
+    assert not can_transition("pending", "delivered")
+    assert not can_transition("completed", "pending")
+    assert not can_transition(None, "accepted_by_donor")
@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pytest
+
+from upload_pipeline import UploadRejected, stream_upload_to_disk
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+JPEG = b"\xff\xd8\xff" + b"\x00" * 100
+
+
+class FakeUpload:
+    """Minimal UploadFile: async read(size) over bytes"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    async def read(self, size: int) -> bytes:
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def store(tmp_path, data, allowed=("png", "jpg"), max_bytes=1024, chunk_size=3):
+    return asyncio.run(stream_upload_to_disk(FakeUpload(data), str(tmp_path), allowed, max_bytes,
+                                             chunk_size=chunk_size))
+
+
+def test_type_comes_from_content(tmp_path):
+    # Small chunks: the signature spans several reads
+    stored = store(tmp_path, PNG)
+    assert stored.file_type == "png"
+    assert stored.content_type == "image/png"
+    assert stored.size == len(PNG)
+    assert stored.path.endswith(".png")
+    with open(stored.path, "rb") as f:
+        assert f.read() == PNG
+    assert os.listdir(tmp_path) == [os.path.basename(stored.path)]
+
+
+def test_short_file_is_still_sniffed(tmp_path):
+    assert store(tmp_path, b"\xff\xd8\xff", chunk_size=1024).file_type == "jpg"
+
+
+@pytest.mark.parametrize("data, allowed, status_code", [
+    (b"", ("png",), 400),
+    (JPEG, ("png",), 415),
+    (b"GIF89a" + b"\x00" * 10, ("png", "jpg"), 415),
+    (PNG * 20, ("png",), 413),
+])
+def test_rejected_uploads_leave_nothing_behind(tmp_path, data, allowed, status_code):
+    with pytest.raises(UploadRejected) as rejected:
+        store(tmp_path, data, allowed=allowed)
+    assert rejected.value.status_code == status_code
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import urgency_scheduler
+from urgency_scheduler import parse_required_datetime, recompute_urgency, urgency_formula, urgency_scores
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def pending(request_id, hours_ahead, people_count=50, ngo_id="ngo-1", urgency_score=None):
+    due = NOW + timedelta(hours=hours_ahead)
+    doc = {"request_id": request_id, "ngo_id": ngo_id, "people_count": people_count,
+           "required_date": due.date().isoformat(), "required_time": due.time().isoformat("minutes"),
+           "status": "pending"}
+    if urgency_score is not None:
+        doc["urgency_score"] = urgency_score
+    return doc
+
+
+class AsyncCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeRequests:
+    def __init__(self, docs):
+        self.docs = docs
+        self.writes = []
+
+    def find(self, query, projection=None):
+        return AsyncCursor([doc for doc in self.docs if doc["status"] == query["status"]])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+        return type("Result", (), {"modified_count": len(operations)})()
+
+
+class FakeUsers:
+    def __init__(self, reliability):
+        self.reliability = reliability
+
+    def find(self, query, projection=None):
+        return AsyncCursor([{"user_id": user_id, "reliability_score": score}
+                            for user_id, score in self.reliability.items()
+                            if user_id in query["user_id"]["$in"]])
+
+
+class FakeDb:
+    def __init__(self, requests, reliability=None):
+        self.food_requests = FakeRequests(requests)
+        self.users = FakeUsers(reliability or {})
+
+
+def test_parse_required_datetime():
+    assert parse_required_datetime("2026-03-01T12:00") == NOW
+    assert parse_required_datetime("2026-03-01T13:00+01:00") == NOW
+    assert parse_required_datetime("soon") is None
+    assert parse_required_datetime(None) is None
+
+
+def test_urgency_formula_weights():
+    assert urgency_formula(0, 100, 10) == pytest.approx(10)
+    assert urgency_formula(24 * 5, 0, 0) == pytest.approx(0)
+    # Overdue requests stay at full time pressure
+    assert urgency_formula(-48, 50, 5) == pytest.approx(5 + 1.5 + 1)
+
+
+def test_urgency_scores_keeps_neutral_score_for_bad_deadlines():
+    docs = [pending("r1", 0, people_count=100), {"request_id": "r2", "required_date": "later", "people_count": 10}]
+    scores = urgency_scores(docs, {"ngo-1": 10}, NOW)
+    assert scores.tolist() == [10.0, 5.0]
+
+
+def test_recompute_writes_only_changed_scores():
+    db = FakeDb([
+        pending("fresh", 0, people_count=100, urgency_score=10.0),
+        pending("stale", 0, people_count=100, urgency_score=6.0),
+        pending("new", 48, people_count=100),
+        {**pending("done", 0), "status": "completed"},
+    ], reliability={"ngo-1": 10})
+
+    result = asyncio.run(recompute_urgency(db, threshold=0.05, batch_size=2, now=NOW))
+
+    assert result == {"scanned": 3, "updated": 2}
+    written = {op._filter["request_id"]: op._doc["$set"]["urgency_score"]
+               for batch in db.food_requests.writes for op in batch}
+    assert written == {"stale": 10.0, "new": 8.0}
+    assert all(op._filter["status"] == "pending" for batch in db.food_requests.writes for op in batch)
+
+
+def test_recompute_uses_default_reliability_for_unknown_ngos():
+    db = FakeDb([pending("r1", 0, people_count=100, ngo_id="gone")])
+    asyncio.run(recompute_urgency(db, now=NOW))
+    [[op]] = db.food_requests.writes
+    assert op._doc["$set"]["urgency_score"] == 9.0
+
+
+def test_urgency_job_only_runs_on_the_lease_holder(monkeypatch):
+    runs = []
+    leases = iter([False, True])
+
+    async def fake_acquire_lease(db, name, holder, ttl_seconds):
+        assert name == "urgency_scheduler"
+        return next(leases)
+
+    async def fake_recompute(db, threshold):
+        runs.append(threshold)
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(urgency_scheduler, "acquire_lease", fake_acquire_lease)
+    monkeypatch.setattr(urgency_scheduler, "recompute_urgency", fake_recompute)
+    monkeypatch.setattr(urgency_scheduler.asyncio, "sleep", fake_sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(urgency_scheduler.run_urgency_job(object(), 60, threshold=0.1))
+    assert runs == [0.1]
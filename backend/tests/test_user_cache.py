@@ -0,0 +1,65 @@
+import user_cache
+from user_cache import UserCache
+
+
+def test_hit_returns_a_copy():
+    cache = UserCache()
+    user = {"user_id": "u1", "role": "ngo"}
+    cache.set("u1", user)
+    user["role"] = "admin"
+
+    cached = cache.get("u1")
+    assert cached == {"user_id": "u1", "role": "ngo"}
+    cached["role"] = "admin"
+    assert cache.get("u1")["role"] == "ngo"
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_cache.time, "monotonic", lambda: now[0])
+    cache = UserCache(ttl_seconds=60)
+    cache.set("u1", {"user_id": "u1"})
+
+    now[0] += 59
+    assert cache.get("u1") is not None
+    now[0] += 2
+    assert cache.get("u1") is None
+    assert len(cache) == 0
+    assert cache.misses == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = UserCache(max_size=2)
+    cache.set("u1", {})
+    cache.set("u2", {})
+    cache.get("u1")
+    cache.set("u3", {})
+
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None and cache.get("u3") is not None
+    assert cache.evictions == 1
+
+
+def test_invalidate_counts_only_cached_users():
+    cache = UserCache()
+    cache.set("u1", {})
+    cache.invalidate("u1", "u2", None)
+    assert cache.get("u1") is None
+    assert cache.invalidations == 1
+
+
+def test_zero_size_disables_caching():
+    cache = UserCache(max_size=0)
+    cache.set("u1", {})
+    assert cache.get("u1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_stats_hit_rate():
+    cache = UserCache()
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.set("u1", {})
+    cache.get("u1")
+    cache.get("u2")
+    assert cache.stats()["hit_rate"] == 0.5
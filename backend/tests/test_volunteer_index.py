@@ -0,0 +1,46 @@
+import random
+
+from geo_utlis import haversine_distance
+from volunteer_index import VolunteerSpatialIndex
+
+PUNE = (18.5204, 73.8567)
+
+
+def brute_force(points, lat, lon, limit, radius_km, exclude=()):
+    # Distances, not ids: haversine_distance rounds, so nearby volunteers can tie
+    distances = sorted(
+        haversine_distance(lat, lon, v_lat, v_lon)
+        for user_id, (v_lat, v_lon) in points.items() if user_id not in exclude
+    )
+    return [distance for distance in distances if distance <= radius_km][:limit]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    points = {f"v{i}": (PUNE[0] + rng.uniform(-0.5, 0.5), PUNE[1] + rng.uniform(-0.5, 0.5))
+              for i in range(300)}
+    index = VolunteerSpatialIndex()
+    for user_id, (lat, lon) in points.items():
+        index.upsert(user_id, lat, lon)
+
+    for limit, radius_km in [(1, 50), (10, 5), (25, 20), (500, 100)]:
+        result = index.nearest(*PUNE, limit=limit, radius_km=radius_km)
+        assert [distance for _, distance in result] == brute_force(points, *PUNE, limit, radius_km)
+
+    excluded = {user_id for user_id, _ in index.nearest(*PUNE, limit=5)}
+    result = index.nearest(*PUNE, limit=5, exclude=excluded)
+    assert not excluded & {user_id for user_id, _ in result}
+    assert [distance for _, distance in result] == brute_force(points, *PUNE, 5, 50, excluded)
+
+
+def test_upsert_moves_and_remove_drops():
+    index = VolunteerSpatialIndex()
+    index.upsert("a", *PUNE)
+    index.upsert("a", PUNE[0] + 1, PUNE[1])
+    assert len(index) == 1
+    assert index.nearest(*PUNE, radius_km=10) == []
+
+    index.remove("a")
+    index.remove("missing")
+    assert "a" not in index
+    assert index.nearest(*PUNE) == []
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from volunteer_roster import VolunteerRoster
+
+
+def volunteer(user_id, **fields):
+    return {"_id": f"oid-{user_id}", "user_id": user_id, "name": user_id, "role": "volunteer",
+            "verification_status": "verified", **fields}
+
+
+class FakeStream:
+    def __init__(self, changes, error):
+        self.changes = changes
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.changes:
+            change = self.changes.pop(0)
+            self.resume_token = change["_id"]
+            return change
+        raise self.error
+
+
+class FakeUsers:
+    """find() for loads; watch() plays back scripted (changes, error) streams"""
+
+    def __init__(self, docs, streams):
+        self.docs = docs
+        self.streams = streams
+        self.resumed_from = []
+        self.loads = 0
+
+    def find(self, query, projection):
+        self.loads += 1
+        docs = list(self.docs)
+
+        async def gen():
+            for doc in docs:
+                yield doc
+        return gen()
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resumed_from.append(resume_after)
+        if not self.streams:
+            raise asyncio.CancelledError()
+        changes, error = self.streams.pop(0)
+        if changes is None:
+            raise error
+        return FakeStream(changes, error)
+
+
+class FakeDb:
+    def __init__(self, users):
+        self.users = users
+
+
+def test_upsert_from_doc_tracks_verification():
+    roster = VolunteerRoster()
+    roster.upsert_from_doc(volunteer("v1", latitude=18.5, longitude=73.8))
+    assert "v1" in roster and len(roster.index) == 1
+
+    roster.upsert_from_doc({"user_id": "v1", "role": "volunteer", "verification_status": "pending"})
+    assert "v1" not in roster and len(roster.index) == 0
+
+
+def test_watch_resumes_after_a_mid_stream_failure_and_reloads_when_resume_fails():
+    change = {"_id": "token-1", "operationType": "insert", "fullDocument": volunteer("v2")}
+    users = FakeUsers([volunteer("v1")], [
+        ([change], ConnectionError("connection reset")),
+        # Resuming from token-1 is rejected: its history left the oplog
+        (None, RuntimeError("ChangeStreamHistoryLost")),
+        ([], ConnectionError("connection reset")),
+    ])
+    roster = VolunteerRoster()
+
+    async def scenario():
+        await roster.load(FakeDb(users))
+        with pytest.raises(asyncio.CancelledError):
+            await roster.watch(FakeDb(users), retry_delay=0)
+
+    asyncio.run(scenario())
+    # Resumed once with the token, then gave it up and reloaded
+    assert users.resumed_from == [None, "token-1", None, None]
+    assert users.loads >= 2
+    assert roster.loaded
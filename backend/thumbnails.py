@@ -0,0 +1,139 @@
+import asyncio
+import glob
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import aiofiles
+from PIL import Image, ImageOps
+
+from blob_store import remove_if_exists, shard_path
+
+logger = logging.getLogger(__name__)
+
+# Upload types Pillow can preview; PDFs are shown by the browser's viewer instead
+THUMBNAIL_SOURCE_TYPES = ("jpg", "png")
+THUMBNAIL_CONTENT_TYPE = "image/jpeg"
+# Raised for sources Pillow cannot (or will not) decode
+THUMBNAIL_ERRORS = (OSError, Image.DecompressionBombError)
+
+
+def render_thumbnail(source_path: str, dest_path: str, max_size: int, quality: int) -> None:
+    """Write a JPEG no larger than max_size on either side. Blocking."""
+    with Image.open(source_path) as img:
+        # Lets JPEG decode straight at a reduced scale instead of full resolution
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        # A unique name per render, so concurrent renders (e.g. from two
+        # workers) never write into each other's partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                img.save(out, "JPEG", quality=quality, optimize=True)
+            os.replace(temp_path, dest_path)
+        except BaseException:
+            remove_if_exists(temp_path)
+            raise
+
+
+class ThumbnailCache:
+    """
+    Thumbnails of image blobs, rendered once in a small thread pool and
+    cached on disk, so later views are a plain file read.
+
+    Pillow releases the GIL while decoding and resizing, so threads run in
+    parallel with the event loop. Concurrent requests for the same blob wait
+    on a single render.
+    """
+
+    def __init__(self, root: str, store, max_workers: int = 2, max_size: int = 320, quality: int = 70):
+        self.root = root
+        self.store = store
+        self.max_size = max_size
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        self.rendered = 0
+        self.failed = 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, f"{shard_path(key)}-{self.max_size}.jpg")
+
+    async def get(self, key: str) -> str:
+        """Path of the blob's thumbnail, rendering it first if needed"""
+        path = self.path_for(key)
+        if await asyncio.to_thread(os.path.exists, path):
+            return path
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._render(key, path))
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # One caller giving up must not cancel the render for the others
+        return await asyncio.shield(future)
+
+    def prefetch(self, key: str) -> None:
+        """Render in the background, e.g. right after an upload"""
+        task = asyncio.ensure_future(self.get(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._prefetch_done)
+
+    def _prefetch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Thumbnail prefetch failed: {task.exception()}")
+
+    async def _render(self, key: str, path: str) -> str:
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        source_path = self.store.local_path(key)
+        temp_source: Optional[str] = None
+        try:
+            if source_path is None:
+                # Object stores: Pillow needs a seekable local file
+                fd, temp_source = await asyncio.to_thread(
+                    tempfile.mkstemp, dir=os.path.dirname(path), suffix=".src"
+                )
+                os.close(fd)
+                async with aiofiles.open(temp_source, "wb") as out:
+                    async for chunk in self.store.read(key):
+                        await out.write(chunk)
+                source_path = temp_source
+
+            await self.run(render_thumbnail, source_path, path, self.max_size, self.quality)
+            self.rendered += 1
+            return path
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            if temp_source:
+                await asyncio.to_thread(remove_if_exists, temp_source)
+
+    async def discard(self, key: str) -> None:
+        """Delete the blob's thumbnails, at any size; pass as collect_garbage(on_delete=...)"""
+        pattern = os.path.join(self.root, f"{glob.escape(shard_path(key))}-*.jpg")
+
+        def remove_all():
+            for path in glob.glob(pattern):
+                remove_if_exists(path)
+
+        await asyncio.to_thread(remove_all)
+
+    async def run(self, func, *args):
+        """Run other blocking image work on the same bounded pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def stats(self) -> dict:
+        return {"rendered": self.rendered, "failed": self.failed, "pending": len(self._pending)}
+
+    def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from typing import Iterable, Optional
+
+import aiofiles
+
+from validation import CONTENT_TYPES, SNIFF_BYTES, sniff_file_type
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload failed validation; status_code maps to HTTP"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class StoredUpload:
+    """Where an accepted upload ended up and what it contains"""
+
+    __slots__ = ("file_id", "path", "file_type", "content_type", "size", "sha256")
+
+    def __init__(self, file_id: str, path: str, file_type: str, size: int, sha256: str):
+        self.file_id = file_id
+        self.path = path
+        self.file_type = file_type
+        self.content_type = CONTENT_TYPES.get(file_type, "application/octet-stream")
+        self.size = size
+        self.sha256 = sha256
+
+
+async def stream_upload_to_disk(upload, dest_dir: str, allowed_types: Iterable[str],
+                                max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                                file_id: Optional[str] = None) -> StoredUpload:
+    """
+    Copy an upload to dest_dir chunk by chunk.
+
+    The type is taken from the file's leading bytes, not its name. The size
+    cap is enforced as data arrives and the SHA-256 is computed on the way
+    through. Data goes to a temporary file in dest_dir, which is renamed to
+    <file_id>.<type> only once everything checks out, so readers never see
+    a partial file and rejected uploads leave nothing behind.
+
+    Args:
+        upload: Object with an async read(size) method, e.g. UploadFile
+        dest_dir: Final directory (created if missing)
+        allowed_types: Accepted types as returned by sniff_file_type
+        max_bytes: Largest accepted size
+
+    Raises:
+        UploadRejected: 400 empty, 413 too large, 415 type not allowed
+    """
+    allowed = set(allowed_types)
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    os.close(fd)
+
+    hasher = hashlib.sha256()
+    size = 0
+    file_type = None
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            head = b""
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"File size exceeds {max_bytes // (1024 * 1024)}MB limit", 413)
+
+                if file_type is None:
+                    head = (head + chunk)[:SNIFF_BYTES]
+                    if len(head) >= SNIFF_BYTES:
+                        file_type = _check_type(head, allowed)
+
+                hasher.update(chunk)
+                await out.write(chunk)
+
+        if size == 0:
+            raise UploadRejected("No file provided")
+        if file_type is None:
+            # Shorter than the longest signature
+            file_type = _check_type(head, allowed)
+
+        file_id = file_id or str(uuid.uuid4())
+        final_path = os.path.join(dest_dir, f"{file_id}.{file_type}")
+        os.replace(temp_path, final_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return StoredUpload(file_id, final_path, file_type, size, hasher.hexdigest())
+
+
+def _check_type(head: bytes, allowed: set) -> str:
+    file_type = sniff_file_type(head)
+    if file_type not in allowed:
+        raise UploadRejected(f"Invalid file type. Allowed: {', '.join(sorted(allowed))}", 415)
+    return file_type
+
+
+async def stage_bytes(data: bytes, dest_dir: str, file_type: str) -> StoredUpload:
+    """Stage generated content (e.g. a re-encoded image) as if it had been uploaded"""
+    os.makedirs(dest_dir, exist_ok=True)
+    file_id = str(uuid.uuid4())
+    path = os.path.join(dest_dir, f"{file_id}.{file_type}")
+    async with aiofiles.open(path, "wb") as out:
+        await out.write(data)
+    return StoredUpload(file_id, path, file_type, len(data), hashlib.sha256(data).hexdigest())
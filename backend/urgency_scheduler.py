@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from job_leases import acquire_lease, lease_holder_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELIABILITY = 5.0
+
+URGENCY_PROJECTION = {
+    "_id": 0, "request_id": 1, "ngo_id": 1, "people_count": 1,
+    "required_date": 1, "required_time": 1, "urgency_score": 1
+}
+
+
+def parse_required_datetime(required_datetime_str: str) -> Optional[datetime]:
+    """Parse a required date/time; times without an offset are taken as UTC"""
+    try:
+        required_dt = datetime.fromisoformat(required_datetime_str)
+    except (TypeError, ValueError):
+        return None
+    if required_dt.tzinfo is None:
+        required_dt = required_dt.replace(tzinfo=timezone.utc)
+    return required_dt
+
+
+def urgency_formula(hours_remaining, people_count, reliability):
+    """
+    Urgency on a 0-10 scale; works on scalars or NumPy arrays.
+
+    Half the weight comes from time pressure (10 when due now, falling by 2
+    per day remaining), 30% from the number of people served and 20% from
+    the NGO's reliability score.
+    """
+    time_score = np.clip(10 - (hours_remaining / 24) * 2, 0, 10)
+    quantity_score = np.minimum(10, (people_count / 100) * 10)
+    history_score = np.minimum(10, reliability)
+    return time_score * 0.5 + quantity_score * 0.3 + history_score * 0.2
+
+
+def urgency_scores(docs: List[dict], reliability_by_ngo: Dict[str, float], now: datetime) -> np.ndarray:
+    """Urgency for a batch of requests, rounded like calculate_urgency_score"""
+    due = np.empty(len(docs))
+    people = np.empty(len(docs))
+    reliability = np.empty(len(docs))
+    for i, doc in enumerate(docs):
+        required_dt = parse_required_datetime(f"{doc.get('required_date')}T{doc.get('required_time')}")
+        due[i] = required_dt.timestamp() if required_dt else np.nan
+        people[i] = doc.get("people_count") or 0
+        reliability[i] = reliability_by_ngo.get(doc.get("ngo_id"), DEFAULT_RELIABILITY)
+
+    hours_remaining = (due - now.timestamp()) / 3600
+    scores = urgency_formula(hours_remaining, people, reliability)
+    # Unparseable deadlines keep the neutral score used at creation time
+    return np.round(np.where(np.isnan(scores), 5.0, scores), 2)
+
+
+async def _ngo_reliability(db, ngo_ids: set) -> Dict[str, float]:
+    cursor = db.users.find({"user_id": {"$in": list(ngo_ids)}}, {"_id": 0, "user_id": 1, "reliability_score": 1})
+    return {user["user_id"]: user.get("reliability_score", DEFAULT_RELIABILITY) async for user in cursor}
+
+
+async def recompute_urgency(db, threshold: float = 0.05, batch_size: int = 2000,
+                            now: Optional[datetime] = None) -> dict:
+    """
+    Recompute urgency_score for every pending request.
+
+    Requests are processed batch_size at a time. Only scores that moved by at
+    least threshold are written back, with an unordered bulk_write whose
+    filter also requires the request to still be pending.
+
+    Returns:
+        {"scanned": n, "updated": n}
+    """
+    now = now or datetime.now(timezone.utc)
+    reliability_by_ngo: Dict[str, float] = {}
+    scanned = updated = 0
+
+    async def process(docs: List[dict]) -> int:
+        missing = {doc.get("ngo_id") for doc in docs} - reliability_by_ngo.keys() - {None}
+        if missing:
+            reliability_by_ngo.update(await _ngo_reliability(db, missing))
+
+        scores = urgency_scores(docs, reliability_by_ngo, now)
+        current = np.array([doc.get("urgency_score", np.nan) for doc in docs], dtype=float)
+        changed = np.flatnonzero(np.isnan(current) | (np.abs(scores - current) >= threshold))
+        if not len(changed):
+            return 0
+
+        result = await db.food_requests.bulk_write([
+            UpdateOne(
+                {"request_id": docs[i]["request_id"], "status": "pending"},
+                {"$set": {"urgency_score": float(scores[i])}}
+            )
+            for i in changed
+        ], ordered=False)
+        return result.modified_count
+
+    batch = []
+    async for doc in db.food_requests.find({"status": "pending"}, URGENCY_PROJECTION).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            updated += await process(batch)
+            scanned += len(batch)
+            batch = []
+    if batch:
+        updated += await process(batch)
+        scanned += len(batch)
+
+    logger.info(f"Urgency recompute: {updated} of {scanned} pending requests updated")
+    return {"scanned": scanned, "updated": updated}
+
+
+async def run_urgency_job(db, interval_seconds: float, threshold: float = 0.05) -> None:
+    """
+    Recompute urgency scores every interval_seconds; runs until cancelled.
+    Only the worker holding the job lease recomputes.
+    """
+    holder = lease_holder_id()
+    while True:
+        try:
+            if await acquire_lease(db, "urgency_scheduler", holder, interval_seconds * 3):
+                await recompute_urgency(db, threshold)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Urgency recompute failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
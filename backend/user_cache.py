@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class UserCache:
+    """
+    Bounded LRU cache of user documents with a per-entry TTL.
+
+    Used by get_current_user to skip the users lookup on every authenticated
+    request. Any code path that mutates a user document must call
+    invalidate(); the TTL only bounds staleness for writes made by other
+    workers.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Hand out a copy so callers can't mutate the cached document
+        return dict(user)
+
+    def set(self, user_id: str, user: dict) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *user_ids: str) -> None:
+        for user_id in user_ids:
+            if user_id and self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
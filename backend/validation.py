@@ -1,5 +1,5 @@
 import re
-from typing import Tuple
+from typing import Optional, Tuple
 
 def validate_phone(phone: str) -> Tuple[bool, str]:
     """
@@ -94,11 +94,35 @@ def validate_required_field(value: str, field_name: str) -> Tuple[bool, str]:
     return True, ""
 
 
+# Leading bytes of each accepted upload type, mapped to the extension it is stored with
+FILE_SIGNATURES = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+]
+
+# Bytes needed to recognise any type in FILE_SIGNATURES
+SNIFF_BYTES = max(len(signature) for signature, _ in FILE_SIGNATURES)
+
+CONTENT_TYPES = {"pdf": "application/pdf", "png": "image/png", "jpg": "image/jpeg"}
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """
+    Identify a file from its first bytes
+    Returns the canonical extension (pdf, png, jpg) or None if unrecognised
+    """
+    for signature, file_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return file_type
+    return None
+
+
 def validate_file_upload(file_content: bytes, allowed_extensions: list, max_size_mb: int = 5) -> Tuple[bool, str]:
     """
     Validate file uploads
     - Check file size
-    - Check file type by extension
+    - Check file type from its content (jpeg counts as jpg)
     """
     if not file_content:
         return False, "No file provided"
@@ -108,6 +132,11 @@ def validate_file_upload(file_content: bytes, allowed_extensions: list, max_size
     if file_size_mb > max_size_mb:
         return False, f"File size exceeds {max_size_mb}MB limit"
     
+    file_type = sniff_file_type(file_content[:SNIFF_BYTES])
+    allowed = {"jpg" if ext.lower() == "jpeg" else ext.lower() for ext in allowed_extensions}
+    if file_type not in allowed:
+        return False, f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
+    
     return True, ""
 
 
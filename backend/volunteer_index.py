@@ -0,0 +1,117 @@
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from geo_utlis import haversine_distance
+
+# Size of one grid cell in decimal degrees (~5.5 km of latitude)
+DEFAULT_CELL_DEG = 0.05
+
+# Kilometres per degree of latitude
+KM_PER_DEG = 111.195
+
+
+class VolunteerSpatialIndex:
+    """
+    Uniform lat/lon grid over volunteer positions.
+
+    Volunteers are bucketed by grid cell; a nearest-neighbour query scans
+    rings of cells outward from the target cell and stops as soon as no
+    unvisited cell can hold a closer volunteer, or the radius is exhausted.
+    """
+
+    def __init__(self, cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        self._positions: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._positions
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def upsert(self, user_id: str, lat: float, lon: float) -> None:
+        """Add a volunteer, or move it if it is already indexed"""
+        self.remove(user_id)
+        cell = self._cell_of(lat, lon)
+        self._cells.setdefault(cell, {})[user_id] = (lat, lon)
+        self._positions[user_id] = cell
+
+    def remove(self, user_id: str) -> None:
+        """Drop a volunteer from the index (no-op if absent)"""
+        cell = self._positions.pop(user_id, None)
+        if cell is None:
+            return
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(user_id, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._positions.clear()
+
+    def nearest(self, lat: float, lon: float, limit: int = 10, radius_km: float = 50.0,
+                exclude: Optional[set] = None) -> List[Tuple[str, float]]:
+        """
+        Find the nearest volunteers to a point
+
+        Args:
+            lat, lon: Target coordinates
+            limit: Maximum number of volunteers to return
+            radius_km: Search radius in kilometres
+            exclude: Optional set of user_ids to skip
+
+        Returns:
+            List of (user_id, distance_km) tuples, closest first
+        """
+        if limit <= 0 or not self._positions:
+            return []
+
+        # A ring of cells k steps away is at least k * step_km from the target
+        lat_step_km = self.cell_deg * KM_PER_DEG
+        lon_step_km = lat_step_km * max(math.cos(math.radians(lat)), 0.01)
+        step_km = min(lat_step_km, lon_step_km)
+        max_ring = int(math.ceil(radius_km / step_km))
+
+        center_lat, center_lon = self._cell_of(lat, lon)
+        best: List[Tuple[float, str]] = []  # max-heap of (-distance, user_id)
+
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(center_lat, center_lon, ring):
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                for user_id, (v_lat, v_lon) in bucket.items():
+                    if exclude and user_id in exclude:
+                        continue
+                    distance = haversine_distance(lat, lon, v_lat, v_lon)
+                    if distance > radius_km:
+                        continue
+                    if len(best) < limit:
+                        heapq.heappush(best, (-distance, user_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, user_id))
+
+            # Everything closer than ring * step_km has now been visited
+            if len(best) == limit and -best[0][0] <= ring * step_km:
+                break
+
+        return sorted(((user_id, -neg) for neg, user_id in best), key=lambda item: item[1])
+
+    @staticmethod
+    def _ring_cells(center_lat: int, center_lon: int, ring: int):
+        if ring == 0:
+            yield (center_lat, center_lon)
+            return
+        for d_lon in range(-ring, ring + 1):
+            yield (center_lat - ring, center_lon + d_lon)
+            yield (center_lat + ring, center_lon + d_lon)
+        for d_lat in range(-ring + 1, ring):
+            yield (center_lat + d_lat, center_lon - ring)
+            yield (center_lat + d_lat, center_lon + ring)
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from volunteer_index import VolunteerSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+# Only the fields the volunteer scorer reads are pulled from MongoDB
+ROSTER_PROJECTION = {
+    "_id": 1,
+    "user_id": 1,
+    "name": 1,
+    "role": 1,
+    "verification_status": 1,
+    "location": 1,
+    "latitude": 1,
+    "longitude": 1,
+    "transport_mode": 1,
+    "reliability_score": 1,
+}
+
+VERIFIED_VOLUNTEER_QUERY = {"role": "volunteer", "verification_status": "verified"}
+
+
+class VolunteerRecord:
+    """Compact, read-only-by-convention view of a verified volunteer"""
+
+    __slots__ = ("user_id", "name", "location", "latitude", "longitude",
+                 "transport_mode", "reliability_score")
+
+    def __init__(self, user_id: str, name: str, location: str = "",
+                 latitude: Optional[float] = None, longitude: Optional[float] = None,
+                 transport_mode: Optional[str] = None, reliability_score: float = 5.0):
+        self.user_id = user_id
+        self.name = name
+        self.location = location
+        self.latitude = latitude
+        self.longitude = longitude
+        self.transport_mode = transport_mode or "on_foot"
+        self.reliability_score = reliability_score
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "VolunteerRecord":
+        return cls(
+            user_id=doc["user_id"],
+            name=doc.get("name", ""),
+            location=doc.get("location") or "",
+            latitude=doc.get("latitude"),
+            longitude=doc.get("longitude"),
+            transport_mode=doc.get("transport_mode"),
+            reliability_score=doc.get("reliability_score", 5.0),
+        )
+
+    @property
+    def has_coordinates(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+
+def is_verified_volunteer(doc: dict) -> bool:
+    return doc.get("role") == "volunteer" and doc.get("verification_status") == "verified"
+
+
+class VolunteerRoster:
+    """
+    Process-local roster of verified volunteers plus their spatial index.
+
+    The roster is loaded once at startup and then patched in place by the
+    endpoints that change a volunteer (registration, verification, ID
+    re-upload, reliability updates). When several workers run, watch() can
+    follow a MongoDB change stream so every worker sees the same roster.
+    """
+
+    def __init__(self, index: Optional[VolunteerSpatialIndex] = None):
+        self.index = index or VolunteerSpatialIndex()
+        self._records: Dict[str, VolunteerRecord] = {}
+        # Change stream deletes only carry _id, so remember which user it was
+        self._object_ids: Dict[object, str] = {}
+        # False until a load() completes; callers query MongoDB instead meanwhile
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._records
+
+    def get(self, user_id: str) -> Optional[VolunteerRecord]:
+        return self._records.get(user_id)
+
+    def records(self) -> Iterable[VolunteerRecord]:
+        return self._records.values()
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._object_ids.clear()
+        self.index.clear()
+
+    def upsert_from_doc(self, doc: dict) -> None:
+        """Add, refresh or drop a volunteer based on a (partial) user document"""
+        user_id = doc.get("user_id")
+        if not user_id:
+            return
+        if not is_verified_volunteer(doc):
+            self.remove(user_id)
+            return
+
+        record = VolunteerRecord.from_doc(doc)
+        self._records[user_id] = record
+        if doc.get("_id") is not None:
+            self._object_ids[doc["_id"]] = user_id
+        if record.has_coordinates:
+            self.index.upsert(user_id, record.latitude, record.longitude)
+        else:
+            self.index.remove(user_id)
+
+    def remove(self, user_id: str) -> None:
+        self._records.pop(user_id, None)
+        self.index.remove(user_id)
+
+    def update_reliability(self, user_id: str, reliability_score: float) -> None:
+        record = self._records.get(user_id)
+        if record is not None:
+            record.reliability_score = reliability_score
+
+    def nearest(self, lat: float, lon: float, limit: int, radius_km: float,
+                exclude: Optional[set] = None) -> List[Tuple[VolunteerRecord, float]]:
+        """Nearest verified volunteers as (record, distance_km) pairs"""
+        nearest = self.index.nearest(lat, lon, limit=limit, radius_km=radius_km, exclude=exclude)
+        return [(self._records[user_id], distance) for user_id, distance in nearest
+                if user_id in self._records]
+
+    async def load(self, db) -> None:
+        """Replace the roster with the current verified volunteers"""
+        self.loaded = False
+        self.clear()
+        async for doc in db.users.find(VERIFIED_VOLUNTEER_QUERY, ROSTER_PROJECTION):
+            self.upsert_from_doc(doc)
+        self.loaded = True
+        logger.info(f"Volunteer roster loaded with {len(self)} volunteers "
+                    f"({len(self.index)} with coordinates)")
+
+    async def load_until_ready(self, db, retry_delay: float = 5.0, max_delay: float = 60.0) -> None:
+        """Retry load() with backoff until it succeeds, e.g. after a failed startup load"""
+        delay = retry_delay
+        while not self.loaded:
+            try:
+                await self.load(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Volunteer roster load failed, retrying in {delay:.0f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+    async def watch(self, db, retry_delay: float = 5.0) -> None:
+        """
+        Follow users changes so the roster stays consistent across workers.
+        Requires a replica set; runs until cancelled.
+        """
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        resume_token = None
+        while True:
+            progressed = False
+            try:
+                async with db.users.watch(pipeline, full_document="updateLookup",
+                                          resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        progressed = True
+                        self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Volunteer roster change stream failed: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                # A stream that fails before delivering anything could not
+                # resume (e.g. the token fell out of the oplog) and would fail
+                # the same way forever: drop the token and reload instead.
+                # Without a token, changes may have been missed anyway.
+                if resume_token is None or not progressed:
+                    resume_token = None
+                    self.loaded = False
+                    await self.load_until_ready(db, retry_delay)
+
+    async def nearest_from_db(self, db, lat: float, lon: float, limit: int, radius_km: float,
+                              exclude: Optional[set] = None) -> List[Tuple[VolunteerRecord, float]]:
+        """
+        Same result as nearest(), answered by a $geoNear query on users. Used
+        while the roster is not loaded so matching never sees an empty roster.
+        """
+        query = dict(VERIFIED_VOLUNTEER_QUERY)
+        if exclude:
+            query["user_id"] = {"$nin": list(exclude)}
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [lon, lat]},
+                "key": "geo",
+                "distanceField": "distance_km",
+                "distanceMultiplier": 0.001,
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": query
+            }},
+            {"$limit": limit},
+            {"$project": {**ROSTER_PROJECTION, "distance_km": 1}}
+        ]
+        docs = await db.users.aggregate(pipeline).to_list(limit)
+        return [(VolunteerRecord.from_doc(doc), doc["distance_km"]) for doc in docs]
+
+    async def records_from_db(self, db, exclude: Iterable[str] = ()) -> List[VolunteerRecord]:
+        """Every verified volunteer straight from MongoDB, for use while not loaded"""
+        query = dict(VERIFIED_VOLUNTEER_QUERY, user_id={"$nin": list(exclude)})
+        return [VolunteerRecord.from_doc(doc)
+                async for doc in db.users.find(query, ROSTER_PROJECTION)]
+
+    def _apply_change(self, change: dict) -> None:
+        if change["operationType"] == "delete":
+            user_id = self._object_ids.pop(change["documentKey"]["_id"], None)
+            if user_id:
+                self.remove(user_id)
+            return
+
+        doc = change.get("fullDocument")
+        if doc:
+            self.upsert_from_doc(doc)
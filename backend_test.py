@@ -49,6 +49,17 @@ class SmartPlateAPITester:
         except json.JSONDecodeError:
             return False, {"error": "Invalid JSON response"}, response.status_code
 
+    def raw_get(self, endpoint, token=None, headers=None):
+        """GET returning the raw response, for checks on headers and status codes"""
+        request_headers = dict(headers or {})
+        if token:
+            request_headers['Authorization'] = f'Bearer {token}'
+        try:
+            return requests.get(f"{self.api_url}/{endpoint}", headers=request_headers, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"   Request error: {str(e)}")
+            return None
+
     def test_user_registration(self):
         """Test user registration for all roles"""
         print("\n🔍 Testing User Registration...")
@@ -322,6 +333,105 @@ class SmartPlateAPITester:
         else:
             self.log_test("NGO Confirm Receipt", False, f"Status: {status}, Response: {response}")
 
+    def test_request_pagination(self):
+        """Test cursor pagination on request lists"""
+        print("\n🔍 Testing Request List Pagination...")
+        
+        if 'ngo' not in self.tokens:
+            self.log_test("Request List Pagination", False, "No NGO token available")
+            return
+
+        token = self.tokens['ngo']
+        first = self.raw_get('ngo/requests?limit=1', token)
+        if first is None or first.status_code != 200:
+            self.log_test("Request List Pagination", False, "First page failed")
+            return
+        cursor = first.headers.get('X-Next-Cursor')
+        if not cursor:
+            # Only one request so far: a single page and no cursor
+            self.log_test("Request List Pagination", len(first.json()) <= 1, "Cursor missing with more items")
+            return
+        second = self.raw_get(f'ngo/requests?limit=1&cursor={cursor}', token)
+        first_ids = {item["request_id"] for item in first.json()}
+        if second is not None and second.status_code == 200 and \
+                not first_ids & {item["request_id"] for item in second.json()}:
+            self.log_test("Request List Pagination", True)
+        else:
+            self.log_test("Request List Pagination", False, "Second page failed or repeated items")
+
+    def test_admin_exports_require_admin(self):
+        """Test that data exports are admin-only"""
+        print("\n🔍 Testing Admin Exports...")
+        
+        if 'ngo' not in self.tokens:
+            self.log_test("Admin Exports", False, "No NGO token available")
+            return
+
+        for endpoint in ('admin/export/users', 'admin/export/audit-logs'):
+            response = self.raw_get(endpoint, self.tokens['ngo'])
+            self.log_test(f"Export {endpoint} forbidden for NGO", response is not None and response.status_code == 403,
+                          f"Status: {response.status_code if response is not None else None}")
+
+    def test_delivery_photo(self):
+        """Test delivery photo serving: 404 without a photo, otherwise 304/206/416"""
+        print("\n🔍 Testing Delivery Photo...")
+        
+        if 'ngo' not in self.tokens or 'request_id' not in self.test_data:
+            self.log_test("Delivery Photo", False, "No NGO token or request ID available")
+            return
+
+        token = self.tokens['ngo']
+        endpoint = f"requests/{self.test_data['request_id']}/delivery-photo"
+        response = self.raw_get(endpoint, token)
+        if response is None:
+            self.log_test("Delivery Photo", False, "Request failed")
+            return
+        if response.status_code == 404:
+            self.log_test("Delivery Photo (none yet)", True)
+            return
+        etag = response.headers.get('ETag')
+        if response.status_code != 200 or not etag:
+            self.log_test("Delivery Photo", False, f"Status: {response.status_code}")
+            return
+        self.log_test("Delivery Photo", True)
+
+        cached = self.raw_get(endpoint, token, {'If-None-Match': etag})
+        self.log_test("Delivery Photo 304", cached is not None and cached.status_code == 304,
+                      f"Status: {cached.status_code if cached is not None else None}")
+
+        partial = self.raw_get(endpoint, token, {'Range': 'bytes=0-9'})
+        self.log_test("Delivery Photo 206", partial is not None and partial.status_code == 206 and
+                      len(partial.content) == 10, f"Status: {partial.status_code if partial is not None else None}")
+
+        unsatisfiable = self.raw_get(endpoint, token, {'Range': f'bytes={len(response.content)}-'})
+        self.log_test("Delivery Photo 416", unsatisfiable is not None and unsatisfiable.status_code == 416,
+                      f"Status: {unsatisfiable.status_code if unsatisfiable is not None else None}")
+
+    def test_request_list_shapes(self):
+        """Test fields=/view= selection on request lists"""
+        print("\n🔍 Testing Request List Shapes...")
+        
+        if 'ngo' not in self.tokens:
+            self.log_test("Request List Shapes", False, "No NGO token available")
+            return
+
+        token = self.tokens['ngo']
+        response = self.raw_get('ngo/requests?fields=request_id,status', token)
+        if response is not None and response.status_code == 200 and \
+                all(set(item) == {"request_id", "status"} for item in response.json()):
+            self.log_test("Request List fields=", True)
+        else:
+            self.log_test("Request List fields=", False, f"Response: {response.text if response is not None else None}")
+
+        response = self.raw_get('ngo/requests?view=summary', token)
+        self.log_test("Request List view=summary", response is not None and response.status_code == 200,
+                      f"Status: {response.status_code if response is not None else None}")
+
+        for query in ('view=bogus', 'fields=password'):
+            response = self.raw_get(f'ngo/requests?{query}', token)
+            self.log_test(f"Request List rejects {query}", response is not None and response.status_code == 400,
+                          f"Status: {response.status_code if response is not None else None}")
+
     def run_all_tests(self):
         """Run all API tests"""
         print("🚀 Starting SmartPlate API Testing...")
@@ -352,6 +462,12 @@ class SmartPlateAPITester:
         # Test end-to-end flow
         self.test_ngo_confirm_receipt()
         
+        # Test list endpoints, file serving and exports
+        self.test_request_pagination()
+        self.test_admin_exports_require_admin()
+        self.test_delivery_photo()
+        self.test_request_list_shapes()
+        
         # Print summary
         print(f"\n📊 Test Summary:")
         print(f"✅ Tests Passed: {self.tests_passed}/{self.tests_run}")